@@ -0,0 +1,122 @@
+import os
+import asyncio
+from collections import deque
+
+from backend.metrics import metrics
+
+# === Admission control settings (per process) ===
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "10"))
+
+
+class Overloaded(RuntimeError):
+    # Raised instead of queueing work the server can't get to in time
+    def __init__(self, stage: str, message: str):
+        super().__init__(message)
+        self.stage = stage
+
+
+# === Global per-stage concurrency limit with a bounded wait queue ===
+# Up to `limit` holders run at once; up to `queue_size` more wait in FIFO order for at most
+# `queue_timeout` seconds. Anything beyond that is rejected immediately with Overloaded, so
+# under overload callers get a fast "busy" instead of every request slowing down together.
+class StageLimiter:
+    def __init__(self, name: str, limit: int, queue_size: int, queue_timeout: float = ADMISSION_QUEUE_TIMEOUT_SECONDS):
+        self.name = name
+        self.limit = max(1, limit)
+        self.queue_size = max(0, queue_size)
+        self.queue_timeout = queue_timeout
+
+        self._active = 0
+        self._waiters = deque()
+
+        # Reporting counters
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+        limiters[name] = self
+
+    async def acquire(self):
+        if self._active < self.limit and not self._waiters:
+            self._active += 1
+            self.admitted += 1
+            return
+
+        if len(self._waiters) >= self.queue_size:
+            self.rejected += 1
+            raise Overloaded(self.name, f"{self.name} is at capacity ({self._active} running, "
+                                        f"{len(self._waiters)} queued)")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            self.timed_out += 1
+            raise Overloaded(self.name, f"waited more than {self.queue_timeout:g}s for a {self.name} slot")
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # the slot was handed over just as we were cancelled
+            else:
+                self._discard(waiter)
+            raise
+        self.admitted += 1
+
+    def release(self):
+        # Hand the slot straight to the next live waiter, otherwise free it
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def _discard(self, waiter):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+        return False
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self._active,
+            "queued": len(self._waiters),
+            "queue_size": self.queue_size,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+# Every limiter registers itself here, for /stats and /metrics
+limiters = {}
+
+
+def admission_stats() -> dict:
+    return {name: limiter.stats() for name, limiter in limiters.items()}
+
+
+def collect_admission_metrics() -> list:
+    stats = admission_stats()
+    return [
+        ("stage_in_flight", "gauge", "Jobs currently running per admission-controlled stage",
+         {(("stage", name),): s["in_flight"] for name, s in stats.items()}),
+        ("stage_queued", "gauge", "Jobs waiting for a slot per admission-controlled stage",
+         {(("stage", name),): s["queued"] for name, s in stats.items()}),
+        ("stage_rejected_total", "counter", "Jobs turned away (queue full or waited too long) per stage",
+         {(("stage", name), ("reason", reason)): s[key] for name, s in stats.items()
+          for reason, key in (("queue_full", "rejected"), ("queue_timeout", "timed_out"))}),
+    ]
+
+
+metrics.register_collector(collect_admission_metrics)
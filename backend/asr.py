@@ -0,0 +1,212 @@
+import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.admission import Overloaded
+from backend.asr_backends import create_asr_backend
+
+# === ASR scheduler settings ===
+# Engine, model size and decoding options are configured in backend/asr_backends.py
+ASR_WORKERS = int(os.getenv("ASR_WORKERS", str(max(1, (os.cpu_count() or 1) // 4))))
+ASR_QUEUE_SIZE = int(os.getenv("ASR_QUEUE_SIZE", "32"))
+ASR_BATCH_SIZE = int(os.getenv("ASR_BATCH_SIZE", "4"))
+ASR_BATCH_WINDOW_MS = float(os.getenv("ASR_BATCH_WINDOW_MS", "20"))
+# A failed model load is retried on a later clip, backing off from this delay up to the maximum
+ASR_LOAD_RETRY_SECONDS = float(os.getenv("ASR_LOAD_RETRY_SECONDS", "1"))
+ASR_LOAD_RETRY_MAX_SECONDS = 60.0
+
+
+class TranscriptionQueueFull(Overloaded):
+    pass
+
+
+class _Job:
+    __slots__ = ("audio", "future", "enqueued_at")
+
+    def __init__(self, audio, future):
+        self.audio = audio
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+
+
+# === Off-event-loop ASR scheduler ===
+# A fixed pool of workers, each owning a model from the configured ASR backend, pulls clips from a bounded queue.
+# Inference runs in a thread pool (torch releases the GIL), so the event loop stays responsive.
+# When several short clips are waiting, a worker decodes them together as one micro-batch.
+# If the model fails to load (a transient download error, OOM), clips fail fast with that error
+# while the worker backs off, and the next clip after the backoff retries the load.
+class TranscriptionScheduler:
+    def __init__(self, backend=None, workers: int = ASR_WORKERS, queue_size: int = ASR_QUEUE_SIZE,
+                 batch_size: int = ASR_BATCH_SIZE, batch_window_ms: float = ASR_BATCH_WINDOW_MS, load_models=None,
+                 transcribe_batch=None):
+        self.backend = backend or create_asr_backend()
+        self.workers = max(1, workers)
+        # async () -> list of per-worker models; lets the model registry own loading and timing
+        self.load_models = load_models or self._load_default_models
+        # sync (model, audios) -> results, run on the worker threads (a fake in the benchmarks)
+        self.transcribe_batch = transcribe_batch or self.backend.transcribe_batch
+        self._models_task = None
+        self.queue_size = queue_size
+        self.batch_size = max(1, batch_size)
+        self.batch_window = batch_window_ms / 1000
+
+        self._queue = None
+        self._executor = None
+        self._tasks = []
+
+        # Reporting counters
+        self.completed = 0
+        self.batches = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.load_error = None  # last model load failure, until a load succeeds
+
+    def _ensure_started(self):
+        if self._queue is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="asr")
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        print(f"[🎙️ ASR] Started {self.workers} '{self.backend.describe()}' worker(s), queue size {self.queue_size}")
+
+    async def _load_default_models(self):
+        # Shared by all workers so the pool is only loaded once
+        if self._models_task is None:
+            self._models_task = asyncio.ensure_future(
+                asyncio.to_thread(self.backend.load, self.workers)
+            )
+        task = self._models_task
+        try:
+            return await asyncio.shield(task)
+        except Exception:
+            if self._models_task is task:
+                self._models_task = None  # let the next attempt load again
+            raise
+
+    async def transcribe(self, audio) -> dict:
+        # `audio` is a file path or a 16 kHz float32 array
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait(_Job(audio, future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise TranscriptionQueueFull("asr", f"ASR queue is full ({self.queue_size} clips waiting)")
+        return await future
+
+    async def _load_model(self, index: int) -> tuple:
+        # (loaded, model); a failure is kept in self.load_error for the clips that fail meanwhile
+        try:
+            model = (await self.load_models())[index]
+        except Exception as e:
+            self.load_error = e
+            return False, None
+        self.load_error = None
+        return True, model
+
+    async def _worker(self, index: int):
+        loop = asyncio.get_running_loop()
+        retry_delay = ASR_LOAD_RETRY_SECONDS
+        loaded, model = await self._load_model(index)
+        if not loaded:
+            print(f"[❌ ASR worker {index}] Failed to load the ASR model, retrying in {retry_delay:g}s:", self.load_error)
+        retry_at = loop.time() + retry_delay
+
+        while True:
+            batch = [await self._queue.get()]
+
+            # Micro-batching: give other waiting clips a short window to join this dispatch
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+
+            # Clips whose caller already gave up (barge-in, disconnect) aren't worth decoding
+            live = [job for job in batch if not job.future.done()]
+            for _ in range(len(batch) - len(live)):
+                self._queue.task_done()
+                self.cancelled += 1
+            batch = live
+            if not batch:
+                continue
+
+            if not loaded and loop.time() >= retry_at:
+                loaded, model = await self._load_model(index)
+                if not loaded:
+                    retry_delay = min(retry_delay * 2, ASR_LOAD_RETRY_MAX_SECONDS)
+                    retry_at = loop.time() + retry_delay
+                    print(f"[❌ ASR worker {index}] ASR model load failed again, retrying in {retry_delay:g}s:",
+                          self.load_error)
+                else:
+                    print(f"[🎙️ ASR worker {index}] ASR model loaded after retrying")
+            if not loaded:
+                error = self.load_error or RuntimeError("ASR model is not loaded")
+                for job in batch:
+                    self._queue.task_done()
+                    if not job.future.done():
+                        job.future.set_exception(error)
+                continue
+
+            started = time.perf_counter()
+            for job in batch:
+                wait = started - job.enqueued_at
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+
+            try:
+                results = await loop.run_in_executor(self._executor, self.transcribe_batch, model, [j.audio for j in batch])
+            except Exception as e:
+                results = [e] * len(batch)
+
+            elapsed = time.perf_counter() - started
+            self.batches += 1
+            for job, result in zip(batch, results):
+                self._queue.task_done()
+                if job.future.done():
+                    continue  # caller went away
+                if isinstance(result, Exception):
+                    job.future.set_exception(result)
+                else:
+                    self.completed += 1
+                    result["queue_wait"] = started - job.enqueued_at
+                    result["inference_time"] = elapsed
+                    result["batch_size"] = len(batch)
+                    job.future.set_result(result)
+
+            print(f"[🎙️ ASR worker {index}] batch of {len(batch)} in {elapsed * 1000:.0f} ms, "
+                  f"queue depth {self._queue.qsize()}")
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend.describe(),
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": self.queue_size,
+            "completed": self.completed,
+            "batches": self.batches,
+            "rejected": self.rejected,
+            "cancelled": self.cancelled,
+            "avg_wait_ms": (self.total_wait / self.completed * 1000) if self.completed else 0.0,
+            "max_wait_ms": self.max_wait * 1000,
+            "load_error": None if self.load_error is None else str(self.load_error),
+        }
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        self._queue = None
@@ -0,0 +1,178 @@
+import os
+
+# === ASR backend settings ===
+# Whisper on CPU is the default; everything that trades accuracy for latency is opt-in. Use
+# `python -m backend.benchmarks.asr_backends` to measure a setting before switching to it.
+ASR_BACKEND = os.getenv("ASR_BACKEND", "whisper")  # whisper | faster-whisper
+ASR_MODEL = os.getenv("ASR_MODEL", "base")  # tiny | base | small | ... (".en" variants are English-only)
+ASR_QUANTIZE = os.getenv("ASR_QUANTIZE", "none")  # none | int8 (dynamic int8 weights, CPU only)
+ASR_BEAM_SIZE = int(os.getenv("ASR_BEAM_SIZE", "1"))  # 1 = greedy decoding
+# Retried in order when a decode looks like a failure (repetitive or low confidence); "0" disables fallback
+ASR_TEMPERATURES = tuple(float(t) for t in os.getenv("ASR_TEMPERATURES", "0,0.2,0.4,0.6,0.8,1.0").split(","))
+ASR_LANGUAGE = os.getenv("ASR_LANGUAGE", "") or None  # e.g. "en": skips language detection on every clip
+
+
+def _cpu_threads(workers: int) -> int:
+    # Spread the CPU cores across workers instead of letting every model grab all of them
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+# === Backend interface ===
+# A backend knows how to load the per-worker models for the TranscriptionScheduler and how to
+# run a batch of clips on one of them (on a worker thread). Clips are 16 kHz float32 arrays or
+# file paths; results are dicts with at least "text".
+class ASRBackend:
+    name = None
+
+    def __init__(self, model_name: str = ASR_MODEL, quantize: str = ASR_QUANTIZE, beam_size: int = ASR_BEAM_SIZE,
+                 temperatures: tuple = ASR_TEMPERATURES, language: str = ASR_LANGUAGE):
+        if quantize not in ("none", "int8"):
+            raise ValueError(f"Unknown ASR quantization '{quantize}' (expected none or int8)")
+        self.model_name = model_name
+        self.quantize = quantize
+        self.beam_size = max(1, beam_size)
+        self.temperatures = tuple(temperatures) or (0.0,)
+        self.language = language
+
+    def describe(self) -> str:
+        parts = [self.name, self.model_name]
+        if self.quantize != "none":
+            parts.append(self.quantize)
+        if self.beam_size > 1:
+            parts.append(f"beam={self.beam_size}")
+        if len(self.temperatures) == 1:
+            parts.append("no-fallback")
+        if self.language:
+            parts.append(f"lang={self.language}")
+        return " ".join(parts)
+
+    def load(self, count: int) -> list:
+        raise NotImplementedError
+
+    def transcribe_batch(self, model, audios: list) -> list:
+        raise NotImplementedError
+
+
+# === openai-whisper (PyTorch) ===
+class WhisperBackend(ASRBackend):
+    name = "whisper"
+
+    def load(self, count: int) -> list:
+        # One model per worker, each warmed up with a second of silence so the first real clip
+        # doesn't pay for lazy kernel setup. whisper/torch are imported here, not at module import.
+        import numpy as np
+        import torch
+        import whisper
+
+        torch.set_num_threads(_cpu_threads(count))
+        models = []
+        for _ in range(max(1, count)):
+            model = whisper.load_model(self.model_name, device="cpu" if self.quantize == "int8" else None)
+            if self.quantize == "int8":
+                model = quantize_int8(model)
+            self.transcribe_batch(model, [np.zeros(16000, dtype=np.float32)])
+            models.append(model)
+        print(f"[🎙️ ASR] Loaded {len(models)} x {self.describe()}")
+        return models
+
+    def _decode_options(self, model) -> dict:
+        options = {"fp16": model.device.type != "cpu", "language": self.language}
+        if self.beam_size > 1:
+            options["beam_size"] = self.beam_size
+        return options
+
+    def transcribe_batch(self, model, audios: list) -> list:
+        import whisper
+
+        # A lone clip, or any clip longer than Whisper's 30 s window, goes through the regular
+        # transcribe() path (sliding window + temperature fallback).
+        if len(audios) == 1:
+            return [self._transcribe_one(model, audios[0])]
+
+        loaded = []
+        for audio in audios:
+            try:
+                loaded.append(whisper.load_audio(audio) if isinstance(audio, str) else audio)
+            except Exception as e:
+                loaded.append(e)
+
+        results = [None] * len(audios)
+        short = [i for i, a in enumerate(loaded) if not isinstance(a, Exception) and len(a) <= whisper.audio.N_SAMPLES]
+
+        if len(short) > 1:
+            import torch
+            mels = torch.stack([
+                whisper.log_mel_spectrogram(whisper.pad_or_trim(loaded[i]), model.dims.n_mels)
+                for i in short
+            ]).to(model.device)
+            # Batched decoding runs at the first temperature only; no per-clip fallback
+            options = whisper.DecodingOptions(temperature=self.temperatures[0], **self._decode_options(model))
+            try:
+                decoded = whisper.decode(model, mels, options)
+                for i, r in zip(short, decoded):
+                    results[i] = {"text": r.text, "language": r.language}
+            except Exception as e:
+                for i in short:
+                    results[i] = e
+
+        for i, audio in enumerate(loaded):
+            if results[i] is None:
+                results[i] = audio if isinstance(audio, Exception) else self._transcribe_one(model, audio)
+        return results
+
+    def _transcribe_one(self, model, audio):
+        try:
+            return model.transcribe(audio, temperature=self.temperatures, **self._decode_options(model))
+        except Exception as e:
+            return e
+
+
+def quantize_int8(model):
+    # Dynamic int8 quantization of the Linear layers (attention projections and MLPs -- most of
+    # the FLOPs); activations stay float32. whisper subclasses nn.Linear only to cast weights for
+    # fp16, which torch's quantizer doesn't recognise, so those layers are turned back into plain
+    # nn.Linear first (identical in float32 on CPU).
+    import torch
+
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear) and type(module) is not torch.nn.Linear:
+            module.__class__ = torch.nn.Linear
+    return torch.ao.quantization.quantize_dynamic(model.cpu(), {torch.nn.Linear}, dtype=torch.qint8)
+
+
+# === faster-whisper (CTranslate2), optional ===
+# Same Whisper weights converted for CTranslate2: int8 kernels on CPU and a single model shared
+# by all scheduler workers (num_workers lets them transcribe concurrently).
+class FasterWhisperBackend(ASRBackend):
+    name = "faster-whisper"
+
+    def load(self, count: int) -> list:
+        import numpy as np
+        from faster_whisper import WhisperModel
+
+        count = max(1, count)
+        model = WhisperModel(self.model_name, device="cpu", compute_type="int8" if self.quantize == "int8" else "float32",
+                             cpu_threads=_cpu_threads(count), num_workers=count)
+        self.transcribe_batch(model, [np.zeros(16000, dtype=np.float32)])
+        print(f"[🎙️ ASR] Loaded {self.describe()} shared by {count} worker(s)")
+        return [model] * count
+
+    def transcribe_batch(self, model, audios: list) -> list:
+        results = []
+        for audio in audios:
+            try:
+                segments, info = model.transcribe(audio, beam_size=self.beam_size, temperature=list(self.temperatures),
+                                                  language=self.language)
+                results.append({"text": "".join(segment.text for segment in segments), "language": info.language})
+            except Exception as e:
+                results.append(e)
+        return results
+
+
+ASR_BACKENDS = {backend.name: backend for backend in (WhisperBackend, FasterWhisperBackend)}
+
+
+def create_asr_backend(name: str = ASR_BACKEND, **options) -> ASRBackend:
+    if name not in ASR_BACKENDS:
+        raise ValueError(f"Unknown ASR backend '{name}' (expected one of {', '.join(ASR_BACKENDS)})")
+    return ASR_BACKENDS[name](**options)
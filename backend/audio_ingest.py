@@ -0,0 +1,175 @@
+import io
+import os
+import time
+import wave
+import shutil
+import asyncio
+
+import numpy as np
+
+from backend.streaming_asr import (STREAM_SAMPLE_RATE, VAD_FRAME_MS, VAD_MIN_RMS, VAD_NOISE_MULTIPLIER,
+                                   pcm16_to_float32, resample)
+
+# === Audio ingestion settings ===
+# "auto" prefers PyAV (in-process) and falls back to an ffmpeg subprocess fed through pipes
+AUDIO_DECODER = os.getenv("AUDIO_DECODER", "auto")
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+AUDIO_DECODE_TIMEOUT_SECONDS = float(os.getenv("AUDIO_DECODE_TIMEOUT_SECONDS", "15"))
+AUDIO_MIN_DURATION_MS = int(os.getenv("AUDIO_MIN_DURATION_MS", "300"))  # shorter clips are rejected
+AUDIO_MIN_SPEECH_MS = int(os.getenv("AUDIO_MIN_SPEECH_MS", "150"))  # voiced time a clip needs to reach ASR
+# Ceiling on the adaptive speech threshold: a clip with no quiet frames (trimmed, clipped or
+# continuous sound) has a "noise floor" as loud as its speech and would otherwise count as silent
+VAD_MAX_FLOOR = float(os.getenv("VAD_MAX_FLOOR", "0.03"))
+
+
+class AudioDecodeError(ValueError):
+    pass
+
+
+def _pick_decoder(preference: str = AUDIO_DECODER):
+    if preference in ("auto", "pyav"):
+        try:
+            import av  # noqa: F401
+            return "pyav"
+        except ImportError:
+            if preference == "pyav":
+                print("[⚠️ Audio] AUDIO_DECODER=pyav but PyAV is not installed, trying ffmpeg")
+    if shutil.which(FFMPEG_BINARY):
+        return "ffmpeg"
+    return None
+
+
+# === Decoders: bytes in, 16 kHz mono float32 out, nothing written to disk ===
+def decode_wav(data: bytes) -> np.ndarray:
+    # Fast path for PCM WAV (what the benchmarks and most non-browser clients send)
+    with wave.open(io.BytesIO(data)) as wav:
+        if wav.getsampwidth() != 2:
+            raise AudioDecodeError(f"unsupported WAV sample width {wav.getsampwidth() * 8} bits")
+        channels, rate = wav.getnchannels(), wav.getframerate()
+        audio = pcm16_to_float32(wav.readframes(wav.getnframes()))
+    if channels > 1:
+        audio = audio[:len(audio) - len(audio) % channels].reshape(-1, channels).mean(axis=1)
+    return resample(audio, rate)
+
+
+def decode_pyav(data: bytes) -> np.ndarray:
+    import av
+
+    try:
+        with av.open(io.BytesIO(data)) as container:
+            resampler = av.AudioResampler(format="flt", layout="mono", rate=STREAM_SAMPLE_RATE)
+            chunks = []
+            for frame in container.decode(audio=0):
+                for out in resampler.resample(frame):
+                    chunks.append(out.to_ndarray().reshape(-1))
+            for out in resampler.resample(None):  # flush
+                chunks.append(out.to_ndarray().reshape(-1))
+    except Exception as e:  # av.error.* (the class names differ between PyAV releases)
+        raise AudioDecodeError(f"PyAV could not decode the clip: {e}")
+    return np.concatenate(chunks).astype(np.float32) if chunks else np.zeros(0, dtype=np.float32)
+
+
+async def decode_ffmpeg(data: bytes, timeout: float = AUDIO_DECODE_TIMEOUT_SECONDS) -> np.ndarray:
+    # Encoded clip on stdin, raw float32 PCM on stdout
+    process = await asyncio.create_subprocess_exec(
+        FFMPEG_BINARY, "-nostdin", "-loglevel", "error", "-i", "pipe:0",
+        "-f", "f32le", "-ac", "1", "-ar", str(STREAM_SAMPLE_RATE), "pipe:1",
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(data), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise AudioDecodeError(f"ffmpeg took longer than {timeout:g}s")
+    except asyncio.CancelledError:
+        process.kill()
+        await process.wait()
+        raise
+    if process.returncode != 0:
+        raise AudioDecodeError(f"ffmpeg could not decode the clip: {stderr.decode(errors='replace').strip()[:200]}")
+    return np.frombuffer(stdout, dtype="<f4").copy()
+
+
+def speech_ms(audio: np.ndarray) -> float:
+    # Energy-based: frames clearly above the clip's own noise floor (between an absolute minimum
+    # and VAD_MAX_FLOOR, so a clip without silence to estimate the floor from still counts)
+    frame = STREAM_SAMPLE_RATE * VAD_FRAME_MS // 1000
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return 0.0
+    rms = np.sqrt(np.mean(audio[:n_frames * frame].reshape(n_frames, frame) ** 2, axis=1))
+    noise_floor = np.percentile(rms, 10)
+    threshold = max(VAD_MIN_RMS, min(noise_floor * VAD_NOISE_MULTIPLIER, VAD_MAX_FLOOR))
+    return float(np.count_nonzero(rms > threshold) * VAD_FRAME_MS)
+
+
+# === Ingestion stage in front of ASR ===
+# decode() turns whatever the client uploaded into 16 kHz float32 in memory and decides whether
+# it is worth transcribing: clips that are too short or have too little voiced audio are
+# rejected here, so they cost a few milliseconds instead of a decode plus a Whisper pass.
+class AudioIngest:
+    def __init__(self, decoder: str = AUDIO_DECODER, min_duration_ms: int = AUDIO_MIN_DURATION_MS,
+                 min_speech_ms: int = AUDIO_MIN_SPEECH_MS):
+        self.decoder = _pick_decoder(decoder)
+        self.min_duration_ms = min_duration_ms
+        self.min_speech_ms = min_speech_ms
+
+        # Reporting counters
+        self.decoded = {}  # decoder -> clips
+        self.rejected = {}  # reason -> clips
+        self.failed = 0
+        self.decode_time = 0.0
+        self.audio_seconds = 0.0
+
+    async def _decode(self, data: bytes) -> tuple:
+        if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+            try:
+                return await asyncio.to_thread(decode_wav, data), "wav"
+            except (wave.Error, EOFError, AudioDecodeError):
+                pass  # compressed WAV variants go through the general decoder
+        if self.decoder == "pyav":
+            return await asyncio.to_thread(decode_pyav, data), "pyav"
+        if self.decoder == "ffmpeg":
+            return await decode_ffmpeg(data), "ffmpeg"
+        raise AudioDecodeError("no decoder for compressed audio (install PyAV or ffmpeg)")
+
+    def check(self, audio: np.ndarray):
+        # Returns why the clip isn't worth transcribing, or None
+        if len(audio) * 1000 < self.min_duration_ms * STREAM_SAMPLE_RATE:
+            reason = "too_short"
+        elif speech_ms(audio) < self.min_speech_ms:
+            reason = "silent"
+        else:
+            return None
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        return reason
+
+    async def decode(self, data: bytes) -> dict:
+        started = time.perf_counter()
+        try:
+            audio, decoder = await self._decode(data)
+        except AudioDecodeError:
+            self.failed += 1
+            raise
+        elapsed = time.perf_counter() - started
+        duration = len(audio) / STREAM_SAMPLE_RATE
+        self.decoded[decoder] = self.decoded.get(decoder, 0) + 1
+        self.decode_time += elapsed
+        self.audio_seconds += duration
+        return {"audio": audio, "duration": duration, "decoder": decoder, "decode_time": elapsed,
+                "rejected": self.check(audio)}
+
+    def stats(self) -> dict:
+        clips = sum(self.decoded.values())
+        return {
+            "decoder": self.decoder or "wav only",
+            "decoded": dict(self.decoded),
+            "rejected": dict(self.rejected),
+            "failed": self.failed,
+            "avg_decode_ms": self.decode_time / clips * 1000 if clips else 0.0,
+            "audio_seconds": round(self.audio_seconds, 1),
+        }
+
+
+audio_ingest = AudioIngest()
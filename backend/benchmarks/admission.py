@@ -0,0 +1,157 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+
+from backend.benchmarks.stubs import GroqStub, SMTPSink, CalendarStub
+from backend.benchmarks.e2e_load import (configure_environment, build_app, free_port, ServerThread, percentile,
+                                         STUB_REPLY)
+
+# === Barge-in + admission control benchmark ===
+# 1. Barge-in: on one /ws/audio v1 connection a second (interrupting) text turn is sent while the
+#    first reply is still streaming. With BARGE_IN=speech the stale turn is cancelled and the new
+#    reply arrives after about one LLM generation; with BARGE_IN=off it waits for the stale one.
+# 2. Overload: a burst of concurrent completions against a Groq stub that slows down past
+#    `capacity` requests in flight. Without admission control every request gets slower together;
+#    with the LLM stage limiter, admitted requests keep near-normal latency and the excess is
+#    rejected in milliseconds.
+#
+#   python -m backend.benchmarks.admission --llm-delay 0.6 --burst 40 --limit 4 --queue 4
+
+
+async def barge_in_turn(port: int) -> dict:
+    import websockets
+
+    # Protocol v1, where an interrupted turn is reported with a cancelled frame (legacy clients get none)
+    async with websockets.connect(f"ws://127.0.0.1:{port}/ws/audio?session=bench-barge-in") as ws:
+        await ws.send(json.dumps({"type": "hello", "v": 1, "mode": "text", "stream": True}))
+        await ws.recv()  # welcome
+        await ws.send(json.dumps({"type": "text", "turn": "stale", "payload": "tell me a long story"}))
+        while json.loads(await ws.recv()).get("type") != "delta":
+            pass  # the first reply is now streaming
+
+        start = time.perf_counter()
+        await ws.send(json.dumps({"type": "text", "turn": "new", "payload": "actually, what time is it?",
+                                  "interrupt": True}))
+        result = {"cancelled": False}
+        while True:
+            frame = json.loads(await asyncio.wait_for(ws.recv(), 30))
+            if frame.get("type") == "cancelled" and frame.get("turn") == "stale":
+                result["cancelled"] = True
+            elif frame.get("type") == "done" and frame.get("turn") == "new":
+                result["latency"] = time.perf_counter() - start
+                return result
+
+
+async def wait_ready(port: int):
+    import httpx
+
+    async with httpx.AsyncClient() as client:
+        for _ in range(200):
+            if (await client.get(f"http://127.0.0.1:{port}/readyz")).status_code == 200:
+                return
+            await asyncio.sleep(0.05)
+
+
+def run_barge_in(args) -> dict:
+    parsed = argparse.Namespace(reply_cache=False, asr_workers=1, asr_overhead=0.05, asr_rtf=0.1, tts_delay=0.1)
+    results = {}
+    with GroqStub(delay=args.llm_delay, reply=STUB_REPLY) as groq, SMTPSink() as smtp, CalendarStub() as calendar, \
+            tempfile.TemporaryDirectory() as tmp:
+        configure_environment(parsed, groq, smtp, calendar, Path(tmp))
+        app, _ = build_app(parsed, Path(tmp))
+        from backend import ws_routes
+
+        port = free_port()
+        quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+        with quiet, ServerThread(app, port):
+            asyncio.run(wait_ready(port))
+            for mode in ("off", "speech"):
+                ws_routes.BARGE_IN = mode
+                results[mode] = asyncio.run(barge_in_turn(port))
+    return results
+
+
+async def burst(size: int) -> list:
+    from backend.admission import Overloaded
+    from backend.llm_client import llm_client
+
+    async def one(i: int):
+        start = time.perf_counter()
+        try:
+            await llm_client.chat_completion({"model": "stub", "messages": [{"role": "user", "content": f"hi {i}"}]},
+                                             api_key="stub")
+            return True, time.perf_counter() - start
+        except Overloaded:
+            return False, time.perf_counter() - start
+
+    outcomes = await asyncio.gather(*(one(i) for i in range(size)))
+    await llm_client.aclose()
+    return outcomes
+
+
+def run_overload(args) -> dict:
+    from backend.llm_client import llm_client
+
+    results = {}
+    with GroqStub(delay=args.llm_delay, capacity=args.limit) as groq:
+        llm_client.base_url = groq.url
+        limiter = llm_client.limiter
+        for label, limit, queue in (("unlimited", args.burst, args.burst), ("admission", args.limit, args.queue)):
+            limiter.limit, limiter.queue_size = limit, queue
+            outcomes = asyncio.run(burst(args.burst))
+            accepted = [t for ok, t in outcomes if ok]
+            rejected = [t for ok, t in outcomes if not ok]
+            results[label] = {
+                "accepted": len(accepted),
+                "rejected": len(rejected),
+                "accepted_p50_ms": percentile(accepted, 50) * 1000 if accepted else 0.0,
+                "accepted_p95_ms": percentile(accepted, 95) * 1000 if accepted else 0.0,
+                "rejected_max_ms": max(rejected) * 1000 if rejected else 0.0,
+            }
+    return results
+
+
+def main(args) -> int:
+    barge_in = run_barge_in(args)
+    overload = run_overload(args)
+
+    print("Barge-in (second text turn sent while the first reply streams):")
+    for mode, row in barge_in.items():
+        print(f"  BARGE_IN={mode:<7} new reply after {row['latency'] * 1000:6.0f} ms"
+              f"{'  (stale turn cancelled)' if row['cancelled'] else ''}")
+    print(f"\nOverload ({args.burst} concurrent completions, provider capacity {args.limit}):")
+    for label, row in overload.items():
+        print(f"  {label:<10} accepted {row['accepted']:>3}  p50 {row['accepted_p50_ms']:6.0f} ms  "
+              f"p95 {row['accepted_p95_ms']:6.0f} ms  rejected {row['rejected']:>3} "
+              f"(slowest rejection {row['rejected_max_ms']:.0f} ms)")
+
+    failures = []
+    if not barge_in["speech"]["cancelled"] or barge_in["speech"]["latency"] > args.llm_delay * 1.8:
+        failures.append("the stale turn was not cancelled promptly")
+    admitted = overload["admission"]
+    bound = args.llm_delay * (1 + -(-args.queue // args.limit)) * 1.5
+    if admitted["accepted_p95_ms"] / 1000 > bound:
+        failures.append(f"admitted p95 above {bound * 1000:.0f} ms")
+    if admitted["rejected"] and admitted["rejected_max_ms"] > 100:
+        failures.append("rejections were not fast")
+    for failure in failures:
+        print("❌ FAIL:", failure)
+    if not failures:
+        print("✅ PASS")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Barge-in and per-stage admission control benchmark")
+    parser.add_argument("--llm-delay", type=float, default=0.6, help="stub LLM generation time (s)")
+    parser.add_argument("--burst", type=int, default=40, help="concurrent completions in the overload burst")
+    parser.add_argument("--limit", type=int, default=4, help="LLM slots (also the stub's capacity)")
+    parser.add_argument("--queue", type=int, default=4, help="LLM requests allowed to wait for a slot")
+    parser.add_argument("--verbose", action="store_true", help="show the server's own log output")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,185 @@
+import re
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+from backend.benchmarks.e2e_load import synthetic_utterance, percentile
+
+# === ASR backend accuracy / latency benchmark ===
+# Loads each configuration in turn, transcribes every fixture clip on one CPU worker and reports
+# the real-time factor (inference time / audio duration; below 1 is faster than real time) and
+# the word error rate against reference transcripts, then names the fastest configuration whose
+# WER is within --max-wer. Unlike the other benchmarks this runs the real models, so the
+# backends under test (openai-whisper, faster-whisper) must be installed; missing ones are skipped.
+#
+# Fixtures: a directory of WAV clips with a manifest.jsonl of {"audio": "clip.wav", "text": "..."}
+# lines, or clip.wav + clip.txt pairs. Without --fixtures only the RTF is measured, on synthetic audio.
+#
+#   python -m backend.benchmarks.asr_backends --fixtures path/to/fixtures \
+#       --config whisper:base --config whisper:base:int8:lang=en --config faster-whisper:base:int8
+
+DEFAULT_CONFIGS = [
+    "whisper:tiny",
+    "whisper:base",
+    "whisper:base:int8",
+    "whisper:base:int8:lang=en",
+    "whisper:base:int8:lang=en:no-fallback",
+    "whisper:base:beam=5",
+    "faster-whisper:base:int8:lang=en",
+]
+
+
+def parse_config(spec: str) -> dict:
+    # backend:model[:int8][:beam=N][:lang=xx][:no-fallback]
+    backend, model, *options = spec.split(":")
+    config = {"name": backend, "model_name": model}
+    for option in options:
+        key, _, value = option.partition("=")
+        if key == "int8":
+            config["quantize"] = "int8"
+        elif key == "beam":
+            config["beam_size"] = int(value)
+        elif key == "lang":
+            config["language"] = value
+        elif key == "no-fallback":
+            config["temperatures"] = (0.0,)
+        else:
+            raise SystemExit(f"Unknown option '{option}' in --config {spec}")
+    return config
+
+
+def load_fixtures(directory: str) -> list:
+    # [(name, 16 kHz float32 audio, reference text)]
+    from backend.audio_ingest import decode_wav
+
+    root = Path(directory)
+    manifest = root / "manifest.jsonl"
+    if manifest.exists():
+        entries = [json.loads(line) for line in manifest.read_text().splitlines() if line.strip()]
+        pairs = [(root / entry["audio"], entry["text"]) for entry in entries]
+    else:
+        pairs = [(path, path.with_suffix(".txt").read_text()) for path in sorted(root.glob("*.wav"))
+                 if path.with_suffix(".txt").exists()]
+    if not pairs:
+        raise SystemExit(f"No fixtures in {directory} (expected manifest.jsonl or clip.wav + clip.txt pairs)")
+    return [(path.name, decode_wav(path.read_bytes()), text) for path, text in pairs]
+
+
+def normalize(text: str) -> list:
+    return re.sub(r"[^\w\s']", " ", text.lower()).split()
+
+
+def word_errors(reference: list, hypothesis: list) -> int:
+    # Levenshtein distance over words (substitutions + insertions + deletions)
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1]
+
+
+def run_config(spec: str, fixtures: list, repeat: int) -> dict:
+    from backend.asr_backends import create_asr_backend
+
+    backend = create_asr_backend(**parse_config(spec))
+    try:
+        started = time.perf_counter()
+        model = backend.load(1)[0]
+        load_seconds = time.perf_counter() - started
+    except ImportError as e:
+        return {"config": spec, "skipped": f"not installed ({e.name})"}
+
+    audio_seconds, inference_seconds, latencies = 0.0, 0.0, []
+    errors, words, hypotheses = 0, 0, {}
+    for name, audio, reference in fixtures:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = backend.transcribe_batch(model, [audio])[0]
+            elapsed = time.perf_counter() - started
+            if isinstance(result, Exception):
+                return {"config": spec, "skipped": f"failed on {name}: {result}"}
+            latencies.append(elapsed)
+            inference_seconds += elapsed
+            audio_seconds += len(audio) / 16000
+        hypotheses[name] = result["text"].strip()
+        if reference is not None:
+            reference_words = normalize(reference)
+            errors += word_errors(reference_words, normalize(result["text"]))
+            words += len(reference_words)
+    return {
+        "config": spec,
+        "backend": backend.describe(),
+        "load_s": load_seconds,
+        "rtf": inference_seconds / audio_seconds,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "wer": errors / words if words else None,
+        "hypotheses": hypotheses,
+    }
+
+
+def main(args) -> int:
+    if args.fixtures:
+        fixtures = load_fixtures(args.fixtures)
+    else:
+        print("No --fixtures given: measuring RTF only, on synthetic audio (WER needs real speech)\n")
+        fixtures = [("synthetic", synthetic_utterance(seconds=4.0), None)]
+    total = sum(len(audio) for _, audio, _ in fixtures) / 16000
+    print(f"{len(fixtures)} clip(s), {total:.1f}s of audio, {args.repeat} pass(es) per configuration\n")
+
+    rows = [run_config(spec, fixtures, args.repeat) for spec in (args.config or DEFAULT_CONFIGS)]
+
+    print(f"{'configuration':<42}{'load s':>8}{'RTF':>8}{'p50 ms':>9}{'WER':>8}")
+    for row in rows:
+        if "skipped" in row:
+            print(f"{row['config']:<42}  skipped: {row['skipped']}")
+            continue
+        wer = "n/a" if row["wer"] is None else f"{row['wer'] * 100:.1f}%"
+        print(f"{row['config']:<42}{row['load_s']:>8.1f}{row['rtf']:>8.3f}{row['p50_ms']:>9.0f}{wer:>8}")
+    if args.verbose:
+        for row in rows:
+            for name, text in row.get("hypotheses", {}).items():
+                print(f"  [{row['config']}] {name}: {text}")
+
+    measured = [row for row in rows if "skipped" not in row]
+    if args.json:
+        Path(args.json).write_text(json.dumps(rows, indent=2))
+    if not measured:
+        print("❌ FAIL: no configuration could run (install openai-whisper and/or faster-whisper)")
+        return 1
+    verified = [row for row in measured if row["wer"] is not None]
+    if verified:
+        eligible = [row for row in verified if row["wer"] <= args.max_wer]
+        label = f"Fastest within {args.max_wer * 100:.0f}% WER"
+    else:
+        eligible = measured  # no references to score against: speed is all that was measured
+        label = "Fastest (RTF only, accuracy unverified)"
+    if eligible:
+        best = min(eligible, key=lambda row: row["rtf"])
+        settings = parse_config(best["config"])
+        env = [f"ASR_BACKEND={settings['name']}", f"ASR_MODEL={settings['model_name']}"]
+        env += [f"ASR_QUANTIZE={settings['quantize']}"] if "quantize" in settings else []
+        env += [f"ASR_BEAM_SIZE={settings['beam_size']}"] if "beam_size" in settings else []
+        env += [f"ASR_LANGUAGE={settings['language']}"] if "language" in settings else []
+        env += ["ASR_TEMPERATURES=0"] if "temperatures" in settings else []
+        print(f"\n{label}: {best['config']} (RTF {best['rtf']:.3f})")
+        print("  " + " ".join(env))
+    else:
+        print(f"\nNo configuration reached {args.max_wer * 100:.0f}% WER")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Real-time factor and WER of ASR backend configurations")
+    parser.add_argument("--fixtures", help="directory of WAV clips with manifest.jsonl or .txt references")
+    parser.add_argument("--config", action="append",
+                        help="backend:model[:int8][:beam=N][:lang=xx][:no-fallback]; repeatable "
+                             f"(default: {', '.join(DEFAULT_CONFIGS)})")
+    parser.add_argument("--repeat", type=int, default=1, help="passes over the fixtures per configuration")
+    parser.add_argument("--max-wer", type=float, default=0.15, help="accuracy budget for the recommendation")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="print every transcript")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,167 @@
+import io
+import os
+import sys
+import time
+import wave
+import shutil
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+
+from backend.benchmarks.e2e_load import synthetic_utterance, percentile
+
+# === Audio ingestion benchmark ===
+# Per-clip cost of turning an uploaded clip into Whisper input, measured apart from inference:
+#   in-memory  -- AudioIngest.decode() (WAV fast path, or PyAV / ffmpeg over pipes for webm/opus,
+#                 which is what browsers' MediaRecorder uploads)
+#   temp file  -- the old path: NamedTemporaryFile, then ffmpeg reading it back (whisper.load_audio),
+#                 or just the disk round trip when ffmpeg isn't installed
+# and whether the energy check turns away silent / too-short clips before they reach ASR. Also
+# checks that resampling filters out content above 8 kHz instead of aliasing it into speech.
+#
+#   python -m backend.benchmarks.audio_ingest --repeat 50
+
+
+def to_wav(audio: np.ndarray, rate: int = 16000, channels: int = 1) -> bytes:
+    pcm = (np.clip(audio, -1, 1) * 32767).astype("<i2")
+    if channels > 1:
+        pcm = np.repeat(pcm, channels)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def to_webm_opus(audio: np.ndarray, rate: int = 16000):
+    # Encoded the way a browser's MediaRecorder sends it; None when neither PyAV nor ffmpeg is installed
+    pcm = (np.clip(audio, -1, 1) * 32767).astype("<i2")
+    try:
+        import av
+    except ImportError:
+        av = None
+    if av is not None:
+        buffer = io.BytesIO()
+        with av.open(buffer, "w", format="webm") as container:
+            stream = container.add_stream("libopus", rate=48000)
+            stream.layout = "mono"
+            frame = av.AudioFrame.from_ndarray(pcm[None, :], format="s16", layout="mono")
+            frame.sample_rate = rate
+            for packet in stream.encode(frame):
+                container.mux(packet)
+            for packet in stream.encode(None):
+                container.mux(packet)
+        return buffer.getvalue()
+    if shutil.which("ffmpeg"):
+        return subprocess.run(["ffmpeg", "-nostdin", "-loglevel", "error", "-f", "s16le", "-ar", str(rate), "-ac", "1",
+                               "-i", "pipe:0", "-c:a", "libopus", "-f", "webm", "pipe:1"],
+                              input=pcm.tobytes(), capture_output=True, check=True).stdout
+    return None
+
+
+def fixtures() -> list:
+    # (name, clip bytes, expected rejection reason or None)
+    rng = np.random.default_rng(1)
+    speech = synthetic_utterance()
+    long_speech = np.concatenate([synthetic_utterance()] * 4)
+    t = np.arange(32000) / 16000
+    trimmed = 0.2 * (0.7 + 0.3 * np.sin(2 * np.pi * 4 * t)) * np.sin(2 * np.pi * 180 * t) + 0.05 * rng.standard_normal(32000)
+    resampled = np.interp(np.arange(int(len(speech) * 44100 / 16000)) * 16000 / 44100, np.arange(len(speech)), speech)
+    webm = to_webm_opus(speech)
+    return [
+        ("speech 2.3s", to_wav(speech), None),
+        *([("speech webm/opus", webm, None)] if webm is not None else []),
+        ("speech 9.2s", to_wav(long_speech), None),
+        ("speech 44.1k stereo", to_wav(resampled, 44100, channels=2), None),
+        ("trimmed speech 2s", to_wav(trimmed), None),  # no silence to estimate a noise floor from
+        ("steady tone 2s", to_wav(0.3 * np.sin(2 * np.pi * 440 * t)), None),
+        ("silence 3s", to_wav(np.zeros(48000)), "silent"),
+        ("room noise 3s", to_wav(0.003 * rng.standard_normal(48000)), "silent"),
+        ("click 0.2s", to_wav(0.3 * rng.standard_normal(3200)), "too_short"),
+    ]
+
+
+def decode_via_tempfile(data: bytes) -> np.ndarray:
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
+        tmp.write(data)
+        path = tmp.name
+    try:
+        if shutil.which("ffmpeg"):
+            # What whisper.load_audio does
+            out = subprocess.run(["ffmpeg", "-nostdin", "-threads", "0", "-i", path, "-f", "s16le", "-ac", "1",
+                                  "-acodec", "pcm_s16le", "-ar", "16000", "-"], capture_output=True, check=True).stdout
+            return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+        with open(path, "rb") as f:
+            data = f.read()[44:]
+        return np.frombuffer(data[:len(data) // 2 * 2], "<i2").astype(np.float32) / 32768.0
+    finally:
+        os.remove(path)
+
+
+async def run(args) -> list:
+    from backend.audio_ingest import AudioIngest
+
+    ingest = AudioIngest(decoder=args.decoder)
+    rows = []
+    for name, data, expected in fixtures():
+        in_memory, temp_file, clip = [], [], None
+        for _ in range(args.repeat):
+            clip = await ingest.decode(data)
+            in_memory.append(clip["decode_time"])
+            start = time.perf_counter()
+            await asyncio.to_thread(decode_via_tempfile, data)
+            temp_file.append(time.perf_counter() - start)
+        rows.append({"name": name, "duration": clip["duration"], "decoder": clip["decoder"],
+                     "in_memory_ms": percentile(in_memory, 50) * 1000, "temp_file_ms": percentile(temp_file, 50) * 1000,
+                     "rejected": clip["rejected"], "expected": expected})
+    return rows
+
+
+def aliasing_rms() -> float:
+    # A full-scale 12 kHz tone has nothing below the 8 kHz Nyquist of 16 kHz audio: what is left is aliasing
+    from backend.streaming_asr import resample
+
+    tone = np.sin(2 * np.pi * 12000 * np.arange(48000) / 48000).astype(np.float32)
+    out = resample(tone, 48000)[1000:-1000]  # skip the filter's edge transients
+    return float(np.sqrt(np.mean(out * out)))
+
+
+def main(args) -> int:
+    rows = asyncio.run(run(args))
+    alias = aliasing_rms()
+    baseline = "tempfile+ffmpeg" if shutil.which("ffmpeg") else "tempfile only"
+    print(f"{'clip':<22}{'audio':>7}{'decoder':>9}{'in-memory':>11}{baseline:>17}  decision")
+    for row in rows:
+        print(f"{row['name']:<22}{row['duration']:>6.1f}s{row['decoder']:>9}{row['in_memory_ms']:>9.2f}ms"
+              f"{row['temp_file_ms']:>15.2f}ms  {row['rejected'] or 'transcribe'}")
+    if not shutil.which("ffmpeg"):
+        print("\nffmpeg not found: the temp-file column is only the disk round trip, not the old decode cost")
+    if not any(row["name"] == "speech webm/opus" for row in rows):
+        print("Neither PyAV nor ffmpeg is installed: the webm/opus clip was skipped")
+    print(f"12 kHz tone resampled 48 -> 16 kHz: RMS {alias:.4f} left (0.707 in)")
+
+    failures = [f"{row['name']}: expected {row['expected'] or 'transcribe'}, got {row['rejected'] or 'transcribe'}"
+                for row in rows if row["rejected"] != row["expected"]]
+    for row in rows:
+        if row["decoder"] == "wav" and row["in_memory_ms"] > args.max_decode_ms:
+            failures.append(f"{row['name']}: in-memory decode took {row['in_memory_ms']:.1f} ms")
+    if alias > 0.01:
+        failures.append(f"a 12 kHz tone aliased into the 16 kHz output (RMS {alias:.3f})")
+    for failure in failures:
+        print("❌ FAIL:", failure)
+    if not failures:
+        print("✅ PASS")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-memory audio decode and pre-ASR rejection benchmark")
+    parser.add_argument("--repeat", type=int, default=20, help="decodes per clip (median is reported)")
+    parser.add_argument("--decoder", default="auto", help="auto | pyav | ffmpeg (for non-WAV input)")
+    parser.add_argument("--max-decode-ms", type=float, default=50.0, help="fail if a WAV clip decodes slower")
+    sys.exit(main(parser.parse_args()))
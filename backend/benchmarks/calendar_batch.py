@@ -0,0 +1,77 @@
+import os
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+
+from backend.benchmarks.stubs import CalendarStub
+from backend.calendar_client import CalendarClient
+
+# === Calendar client check against a local Calendar API stand-in ===
+# Writes an already-expired token.json, then fires N concurrent inserts. Expected: one token
+# refresh, one service build, and the inserts coalesced into batch requests instead of N calls.
+# Then token.json is rewritten (a re-auth): the next insert must build a service with the new
+# credentials rather than keep the old one.
+#
+#   python -m backend.benchmarks.calendar_batch --events 10
+
+
+def write_expired_token(path: Path, token_uri: str, refresh_token: str = "refresh-token",
+                        expiry: str = "2000-01-01T00:00:00Z"):
+    path.write_text(json.dumps({
+        "token": "expired-token",
+        "refresh_token": refresh_token,
+        "token_uri": token_uri,
+        "client_id": "stub-client",
+        "client_secret": "stub-secret",
+        "scopes": ["https://www.googleapis.com/auth/calendar.events"],
+        "expiry": expiry,
+    }))
+
+
+def make_event(i: int) -> dict:
+    return {
+        "summary": f"Stub event {i}",
+        "start": {"dateTime": f"2030-01-01T{9 + i % 8:02d}:00:00", "timeZone": "Asia/Kolkata"},
+        "end": {"dateTime": f"2030-01-01T{9 + i % 8:02d}:30:00", "timeZone": "Asia/Kolkata"},
+    }
+
+
+async def main(n_events: int) -> int:
+    with CalendarStub() as stub, tempfile.TemporaryDirectory() as tmp:
+        token_path = Path(tmp) / "token.json"
+        write_expired_token(token_path, stub.token_uri)
+        client = CalendarClient(token_path=token_path, credentials_path=Path(tmp) / "credentials.json",
+                                api_root=stub.url, token_uri=stub.token_uri)
+
+        start = time.perf_counter()
+        created = await asyncio.gather(*(client.insert_event("primary", make_event(i)) for i in range(n_events)))
+        elapsed = time.perf_counter() - start
+
+        # A second round reuses the cached service and the refreshed token
+        await client.insert_event("primary", make_event(n_events))
+        reused = client._service
+
+        # Re-auth rewrites token.json; the cached service must not outlive it
+        write_expired_token(token_path, stub.token_uri, refresh_token="reauth-refresh", expiry="2100-01-01T00:00:00Z")
+        later = time.time() + 5
+        os.utime(token_path, (later, later))
+        await client.insert_event("primary", make_event(n_events + 1))
+        rebuilt = client._service is not reused and client._service._http.credentials.refresh_token == "reauth-refresh"
+
+    print(f"{n_events} concurrent inserts in {elapsed * 1000:.0f} ms")
+    print(f"HTTP requests: {stub.http_requests} (batch: {stub.batch_requests}, token refreshes: {stub.token_refreshes})")
+    print(f"Service rebuilt with the new credentials after token.json was rewritten: {rebuilt}")
+    ok = (len(created) == n_events and all(e.get("id") for e in created)
+          and stub.token_refreshes == 1 and rebuilt)
+    print("✅ PASS" if ok else "❌ FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batched inserts + token refresh against a Calendar stand-in")
+    parser.add_argument("--events", type=int, default=10)
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(main(args.events)))
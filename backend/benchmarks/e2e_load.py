@@ -0,0 +1,362 @@
+import os
+import sys
+import json
+import time
+import wave
+import socket
+import asyncio
+import argparse
+import tempfile
+import threading
+import contextlib
+from pathlib import Path
+
+import numpy as np
+
+from backend.benchmarks.stubs import GroqStub, FakeTTS, FakeEmbedder, FakeASR, SMTPSink, CalendarStub
+
+# === End-to-end latency / load harness ===
+# Starts the real FastAPI app under uvicorn with every external dependency replaced by a local
+# fake (Groq stub, fake ElevenLabs, fake Whisper and sentence encoder, SMTP sink, Calendar
+# stand-in; Chroma runs for real in a temp dir), then drives POST /chat and /ws/audio with N
+# concurrent virtual users and reports p50/p95/p99 per stage plus end-to-end throughput.
+#
+#   python -m backend.benchmarks.e2e_load --users 8 --turns 5 --scenarios chat,chat_stream,ws_text,ws_voice,ws_audio
+#   python -m backend.benchmarks.e2e_load --audio-fixtures path/to/wavs --json results.json
+#
+# Scenarios (stages are client-observed milestones, timed from the moment the turn is sent):
+#   chat         POST /chat                        total
+#   chat_stream  POST /chat, stream=true           first_delta, total
+#   ws_text      /ws/audio text in, text deltas    first_delta, total
+#   ws_voice     /ws/audio text in, streamed audio first_audio, total
+#   ws_audio     /ws/audio PCM in, streamed audio  transcript, first_audio, total  (from end of speech)
+
+SCENARIOS = ["chat", "chat_stream", "ws_text", "ws_voice", "ws_audio"]
+PROMPTS = [
+    "what can you do?",
+    "tell me something interesting about the ocean",
+    "how do I stay focused while working from home?",
+    "please email the team that standup moves to ten",
+    "what's a good name for a cat?",
+]
+STUB_REPLY = (
+    "Sure! I can chat with you, answer questions, send emails and schedule calendar events. "
+    "Just tell me what you need and I'll take care of it. Anything else on your mind today?"
+)
+TOOL_CALLS = [
+    ("send_email", {"to": "team@example.com", "subject": "Standup", "body": "Standup moves to 10:00."}),
+    ("schedule_event", {"title": "Standup", "date": "2030-01-01", "time": "10:00"}),
+]
+FRAME_MS = 20
+
+
+# --- Audio fixtures ---
+def synthetic_utterance(seconds: float = 1.5, rate: int = 16000) -> np.ndarray:
+    # Speech-band noise with a syllable-rate envelope, then trailing silence for the VAD
+    rng = np.random.default_rng(0)
+    t = np.arange(int(seconds * rate)) / rate
+    envelope = 0.5 * (1 + np.sin(2 * np.pi * 4 * t))
+    voiced = 0.2 * envelope * np.sin(2 * np.pi * 180 * t) + 0.05 * rng.standard_normal(len(t))
+    return np.concatenate([np.zeros(rate // 5), voiced, np.zeros(int(rate * 0.6))]).astype(np.float32)
+
+
+def load_fixtures(directory: str) -> list:
+    # 16-bit mono WAV files; other sample rates are resampled to 16 kHz
+    from backend.streaming_asr import resample, pcm16_to_float32
+
+    fixtures = []
+    for path in sorted(Path(directory).glob("*.wav")):
+        with wave.open(str(path)) as wav:
+            if wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+                print(f"[skip] {path.name}: expected 16-bit mono")
+                continue
+            audio = pcm16_to_float32(wav.readframes(wav.getnframes()))
+            fixtures.append(resample(audio, wav.getframerate()))
+    if not fixtures:
+        raise SystemExit(f"No usable .wav fixtures in {directory}")
+    return fixtures
+
+
+def pcm16_frames(audio: np.ndarray, rate: int = 16000) -> list:
+    pcm = (np.clip(audio, -1, 1) * 32767).astype("<i2").tobytes()
+    step = rate * FRAME_MS // 1000 * 2
+    return [pcm[i:i + step] for i in range(0, len(pcm), step)]
+
+
+# --- Stats ---
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}  # (scenario, stage) -> [seconds]
+        self.errors = {}
+        self.turns = 0
+
+    def add(self, scenario: str, stages: dict):
+        for stage, seconds in stages.items():
+            self.samples.setdefault((scenario, stage), []).append(seconds)
+        self.turns += 1
+
+    def error(self, scenario: str, message: str):
+        self.errors.setdefault(scenario, []).append(message)
+
+    def summary(self) -> dict:
+        return {
+            f"{scenario}.{stage}": {
+                "count": len(values),
+                "p50_ms": percentile(values, 50) * 1000,
+                "p95_ms": percentile(values, 95) * 1000,
+                "p99_ms": percentile(values, 99) * 1000,
+                "max_ms": max(values) * 1000,
+            }
+            for (scenario, stage), values in sorted(self.samples.items())
+        }
+
+
+# --- App under test ---
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def configure_environment(args, groq: GroqStub, smtp: SMTPSink, calendar: CalendarStub, workdir: Path):
+    # Settings are read at import time, so this runs before anything from the app is imported
+    os.environ.update({
+        "GROQ_BASE_URL": groq.url,
+        "GROQ_API_KEY": "stub",
+        "ELEVENLABS_API_KEY": "stub",
+        "EMAIL_ADDRESS": "agent@example.com",
+        "SMTP_HOST": smtp.host,
+        "SMTP_PORT": str(smtp.port),
+        "SMTP_SECURITY": "none",
+        "SMTP_AUTH": "0",
+        "CALENDAR_API_ROOT": calendar.url,
+        "CALENDAR_TOKEN_URI": calendar.token_uri,
+        "MEMORY_DIR": str(workdir / "memory"),
+        "TTS_CACHE_DIR": str(workdir / "tts_cache"),
+        "TTS_PREWARM": "0",
+        "REPLY_CACHE": "1" if args.reply_cache else "0",
+        "ASR_WORKERS": str(args.asr_workers),
+        "ENABLE_VOICE": "1",
+    })
+    (workdir / "token.json").write_text(json.dumps({
+        "token": "stub-token", "refresh_token": "stub-refresh", "client_id": "stub", "client_secret": "stub",
+        "scopes": ["https://www.googleapis.com/auth/calendar.events"], "expiry": "2100-01-01T00:00:00Z",
+    }))
+
+
+def build_app(args, workdir: Path):
+    from backend.main import app
+    from backend.models import registry
+    from backend import ws_routes, tts
+    from backend.calendar_client import calendar_client
+
+    fake_asr = FakeASR(overhead=args.asr_overhead, real_time_factor=args.asr_rtf, transcripts=PROMPTS)
+    ws_routes.whisper_model.transcribe_batch = fake_asr.transcribe_batch
+    registry.register("asr", lambda: [None] * ws_routes.whisper_model.workers)
+    registry.register("embedder", lambda: FakeEmbedder(bag_of_words=True))
+    tts.cached_synthesize.synthesize = FakeTTS(first_byte_delay=args.tts_delay)
+    calendar_client.token_path = workdir / "token.json"
+    return app, fake_asr
+
+
+class ServerThread:
+    def __init__(self, app, port: int):
+        import uvicorn
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning",
+                                                    ws_max_size=16 * 1024 * 1024))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.02)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+# --- Virtual users ---
+async def run_chat(client, base: str, prompt: str, stream: bool) -> dict:
+    start = time.perf_counter()
+    if not stream:
+        response = await client.post(f"{base}/chat", json={"prompt": prompt})
+        response.raise_for_status()
+        return {"total": time.perf_counter() - start}
+
+    stages = {}
+    async with client.stream("POST", f"{base}/chat", json={"prompt": prompt, "stream": True}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line.startswith("data:") and "first_delta" not in stages and line.strip() != "data: [DONE]":
+                stages["first_delta"] = time.perf_counter() - start
+    stages["total"] = time.perf_counter() - start
+    return stages
+
+
+async def receive_reply(ws, start: float, stages: dict, audio: bool):
+    # Reads frames until the reply is complete; records first reply byte and total
+    while True:
+        message = await ws.recv()
+        now = time.perf_counter() - start
+        if isinstance(message, bytes):
+            stages.setdefault("first_audio", now)
+            continue
+        try:
+            frame = json.loads(message)
+        except ValueError:
+            raise RuntimeError(f"unexpected server message: {message[:80]}")
+        kind = frame.get("type") if isinstance(frame, dict) else None
+        if kind == "transcript":
+            stages["transcript"] = now
+        elif kind == "delta" and not audio:
+            stages.setdefault("first_delta", now)
+        elif kind == "done" and not audio:
+            stages["total"] = now
+            return
+        elif kind == "audio_end" and audio:
+            stages["total"] = now
+            return
+
+
+async def run_ws_turns(base_ws: str, user: int, scenario: str, turns: int, fixtures: list, recorder: Recorder):
+    import websockets
+
+    audio_reply = scenario in ("ws_voice", "ws_audio")
+    async with websockets.connect(f"{base_ws}/ws/audio?session=bench-{scenario}-{user}", max_size=None) as ws:
+        await ws.send(json.dumps({"type": "mode", "payload": "audio" if audio_reply else "text", "stream": True}))
+        for turn in range(turns):
+            stages = {}
+            try:
+                if scenario == "ws_audio":
+                    frames = pcm16_frames(fixtures[(user + turn) % len(fixtures)])
+                    await ws.send(json.dumps({"type": "stream_start", "payload": {"sample_rate": 16000}}))
+                    for frame in frames:
+                        await ws.send(frame)
+                    start = time.perf_counter()  # end of speech: everything after is server latency
+                    await ws.send(json.dumps({"type": "stream_end"}))
+                else:
+                    start = time.perf_counter()
+                    await ws.send(json.dumps({"type": "text", "payload": PROMPTS[(user + turn) % len(PROMPTS)]}))
+                await asyncio.wait_for(receive_reply(ws, start, stages, audio_reply), 60)
+                recorder.add(scenario, stages)
+            except Exception as e:
+                recorder.error(scenario, repr(e))
+
+
+async def run_chat_turns(base: str, user: int, scenario: str, turns: int, recorder: Recorder):
+    import httpx
+
+    async with httpx.AsyncClient(timeout=60) as client:
+        for turn in range(turns):
+            try:
+                stages = await run_chat(client, base, PROMPTS[(user + turn) % len(PROMPTS)], scenario == "chat_stream")
+                recorder.add(scenario, stages)
+            except Exception as e:
+                recorder.error(scenario, repr(e))
+
+
+async def drive(port: int, args, fixtures: list) -> tuple:
+    base, base_ws = f"http://127.0.0.1:{port}", f"ws://127.0.0.1:{port}"
+    recorder = Recorder()
+
+    import httpx
+    async with httpx.AsyncClient() as client:  # wait for the (fake) models to be loaded
+        for _ in range(200):
+            if (await client.get(f"{base}/readyz")).status_code == 200:
+                break
+            await asyncio.sleep(0.05)
+
+    users = []
+    for scenario in args.scenarios:
+        for user in range(args.users):
+            if scenario.startswith("chat"):
+                users.append(run_chat_turns(base, user, scenario, args.turns, recorder))
+            else:
+                users.append(run_ws_turns(base_ws, user, scenario, args.turns, fixtures, recorder))
+
+    start = time.perf_counter()
+    await asyncio.gather(*users)
+    elapsed = time.perf_counter() - start
+
+    async with httpx.AsyncClient() as client:
+        server_stats = (await client.get(f"{base}/stats")).json()
+    return recorder, elapsed, server_stats
+
+
+def print_report(recorder: Recorder, elapsed: float, args, server_stats: dict, fake_asr, smtp, calendar):
+    summary = recorder.summary()
+    print(f"\n{'stage':<28}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, row in summary.items():
+        print(f"{name:<28}{row['count']:>6}{row['p50_ms']:>10.0f}{row['p95_ms']:>10.0f}"
+              f"{row['p99_ms']:>10.0f}{row['max_ms']:>10.0f}")
+    print(f"\n{recorder.turns} turns in {elapsed:.2f}s -> {recorder.turns / elapsed:.1f} turns/s "
+          f"({args.users} users x {len(args.scenarios)} scenarios x {args.turns} turns)")
+    for scenario, errors in recorder.errors.items():
+        print(f"❌ {scenario}: {len(errors)} failed turns, e.g. {errors[0]}")
+    asr = server_stats.get("asr", {})
+    print(f"Server: ASR avg wait {asr.get('avg_wait_ms', 0):.0f} ms over {fake_asr.batches} batches, "
+          f"embeddings {server_stats.get('embeddings', {}).get('avg_batch_size', 0):.1f}/batch, "
+          f"emails delivered {len(smtp.messages)}, calendar events {len(calendar.events)}")
+
+
+def main(args) -> int:
+    fixtures = load_fixtures(args.audio_fixtures) if args.audio_fixtures else [synthetic_utterance()]
+
+    with GroqStub(delay=args.llm_delay, reply=STUB_REPLY, tool_calls=TOOL_CALLS, tool_trigger="email") as groq, \
+            SMTPSink(handshake_delay=0.05) as smtp, CalendarStub() as calendar, \
+            tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        configure_environment(args, groq, smtp, calendar, workdir)
+        app, fake_asr = build_app(args, workdir)
+
+        port = free_port()
+        # The app logs every turn to stdout; keep the report readable unless asked otherwise
+        quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+        with quiet, ServerThread(app, port):
+            recorder, elapsed, server_stats = asyncio.run(drive(port, args, fixtures))
+            time.sleep(0.5)  # let the outbox / calendar batch finish before reporting
+
+        print_report(recorder, elapsed, args, server_stats, fake_asr, smtp, calendar)
+        result = {
+            "config": {k: v for k, v in vars(args).items() if k != "json"},
+            "stages": recorder.summary(),
+            "turns": recorder.turns,
+            "throughput_turns_per_s": recorder.turns / elapsed,
+            "errors": {k: len(v) for k, v in recorder.errors.items()},
+            "server": server_stats,
+        }
+        if args.json:
+            Path(args.json).write_text(json.dumps(result, indent=2, default=str))
+            print(f"Wrote {args.json}")
+
+    return 1 if recorder.errors else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end latency/load benchmark against local fakes")
+    parser.add_argument("--users", type=int, default=4, help="concurrent virtual users per scenario")
+    parser.add_argument("--turns", type=int, default=5, help="turns per user")
+    parser.add_argument("--scenarios", type=lambda s: [x for x in s.split(",") if x], default=SCENARIOS,
+                        help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--audio-fixtures", help="directory of 16-bit mono .wav files for ws_audio")
+    parser.add_argument("--llm-delay", type=float, default=0.4, help="stub LLM generation time (s)")
+    parser.add_argument("--tts-delay", type=float, default=0.15, help="fake TTS first-byte delay (s)")
+    parser.add_argument("--asr-overhead", type=float, default=0.05, help="fake ASR per-dispatch cost (s)")
+    parser.add_argument("--asr-rtf", type=float, default=0.1, help="fake ASR real-time factor")
+    parser.add_argument("--asr-workers", type=int, default=2)
+    parser.add_argument("--reply-cache", action="store_true", help="leave the reply cache on")
+    parser.add_argument("--json", help="write the full results to this file")
+    parser.add_argument("--verbose", action="store_true", help="show the server's own log output")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+    sys.exit(main(args))
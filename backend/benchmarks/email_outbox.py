@@ -0,0 +1,109 @@
+import time
+import asyncio
+import argparse
+import smtplib
+from email.message import EmailMessage
+
+from backend.benchmarks.stubs import SMTPSink
+from backend.email_outbox import EmailOutbox
+
+# === Email outbox benchmark ===
+# Sends N emails through a local SMTP sink two ways: the old "connect, login, send, quit per
+# message" path, awaited inline like the tool call used to be, and the background outbox. Then
+# checks that the outbox reconnects after the sink drops an idle session and retries a 451, and
+# that restarting a dead sender task keeps the emails still queued behind it.
+#
+#   python -m backend.benchmarks.email_outbox --emails 10 --handshake 0.2
+
+
+def make_message(i: int) -> EmailMessage:
+    msg = EmailMessage()
+    msg["Subject"] = f"Benchmark #{i}"
+    msg["From"] = "agent@example.com"
+    msg["To"] = f"user{i}@example.com"
+    msg.set_content("Hello from the outbox benchmark.")
+    return msg
+
+
+def send_per_message(sink: SMTPSink, msg: EmailMessage):
+    with smtplib.SMTP(sink.host, sink.port) as smtp:
+        smtp.ehlo()
+        smtp.login("agent@example.com", "secret")
+        smtp.send_message(msg)
+
+
+async def wait_for(outbox: EmailOutbox, ids: list, timeout: float = 30.0) -> list:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        statuses = [outbox.status(i)["status"] for i in ids]
+        if all(s in ("sent", "failed") for s in statuses):
+            return statuses
+        await asyncio.sleep(0.01)
+    return [outbox.status(i)["status"] for i in ids]
+
+
+async def main(n_emails: int, handshake: float) -> int:
+    ok = True
+
+    with SMTPSink(handshake_delay=handshake) as sink:
+        start = time.perf_counter()
+        for i in range(n_emails):
+            await asyncio.to_thread(send_per_message, sink, make_message(i))
+        baseline = time.perf_counter() - start
+        baseline_connections = sink.connections
+
+    with SMTPSink(handshake_delay=handshake) as sink:
+        outbox = EmailOutbox(host=sink.host, port=sink.port, security="none",
+                             username="agent@example.com", password="secret")
+        start = time.perf_counter()
+        ids = [outbox.enqueue(make_message(i)) for i in range(n_emails)]
+        queued = time.perf_counter() - start
+        statuses = await wait_for(outbox, ids)
+        delivered = time.perf_counter() - start
+        await outbox.stop()
+        ok &= statuses.count("sent") == n_emails and sink.connections == 1
+
+    print(f"Per-message SMTP: {baseline * 1000:.0f} ms for {n_emails} emails, {baseline_connections} connections "
+          f"(tool call blocked {baseline / n_emails * 1000:.0f} ms each)")
+    print(f"Outbox:           {queued * 1000:.2f} ms to queue {n_emails} emails, all delivered after "
+          f"{delivered * 1000:.0f} ms over {sink.connections} connection(s)")
+
+    # Idle drop + transient failure: the sink hangs up on idle sessions and fails the next DATA
+    with SMTPSink(handshake_delay=0.0, idle_timeout=0.2) as sink:
+        outbox = EmailOutbox(host=sink.host, port=sink.port, security="none", use_auth=False,
+                             idle_timeout=60, retry_base=0.05)
+        first = outbox.enqueue(make_message(0))
+        await wait_for(outbox, [first])
+        await asyncio.sleep(0.4)  # the sink drops the session meanwhile
+        sink.fail_next = 1
+        second = outbox.enqueue(make_message(1))
+        statuses = await wait_for(outbox, [first, second])
+        record = outbox.status(second)
+        await outbox.stop()
+    print(f"Idle drop + 451:  statuses {statuses}, second email took {record['attempts']} attempts, "
+          f"{sink.connections} connections, {sink.dropped_idle} idle drop(s)")
+    ok &= statuses == ["sent", "sent"] and record["attempts"] == 2
+
+    # Sender task dies mid-send with emails queued: the next enqueue restarts it on the same queue
+    with SMTPSink(handshake_delay=0.2) as sink:
+        outbox = EmailOutbox(host=sink.host, port=sink.port, security="none", use_auth=False)
+        ids = [outbox.enqueue(make_message(i)) for i in range(3)]
+        await asyncio.sleep(0.05)  # the first email is mid-handshake
+        outbox._task.cancel()
+        await asyncio.gather(outbox._task, return_exceptions=True)
+        ids.append(outbox.enqueue(make_message(3)))
+        statuses = await wait_for(outbox, ids)
+        await outbox.stop()
+    print(f"Sender restart:   statuses {statuses} (the in-flight email is reported, the queued ones kept)")
+    ok &= statuses == ["failed", "sent", "sent", "sent"]
+
+    print("✅ PASS" if ok else "❌ FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Background email outbox vs per-message SMTP")
+    parser.add_argument("--emails", type=int, default=10)
+    parser.add_argument("--handshake", type=float, default=0.2, help="simulated TLS handshake + login seconds")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(main(args.emails, args.handshake)))
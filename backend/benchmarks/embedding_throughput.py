@@ -0,0 +1,63 @@
+import time
+import asyncio
+import argparse
+
+from backend.benchmarks.stubs import FakeEmbedder
+from backend.embeddings import EmbeddingService
+
+# === Embedding throughput benchmark ===
+# Each simulated session does what a conversation turn does: encode the query, then encode the
+# "User:/AI:" pair to store. Compares the old per-call encode on the event loop with the
+# batched service at 1, 8 and 32 concurrent sessions.
+#
+#   python -m backend.benchmarks.embedding_throughput            # fake embedder
+#   python -m backend.benchmarks.embedding_throughput --real     # all-MiniLM-L6-v2
+
+
+async def session_direct(model, session: int, turns: int):
+    for turn in range(turns):
+        query = f"session {session} question {turn}"
+        model.encode([query])[0]  # blocking, batch size 1, as ws_routes used to do
+        model.encode([f"User: {query}\nAI: answer {turn}"])[0]
+        await asyncio.sleep(0)
+
+
+async def session_service(service: EmbeddingService, session: int, turns: int):
+    for turn in range(turns):
+        query = f"session {session} question {turn}"
+        await service.encode(query)
+        await service.encode(f"User: {query}\nAI: answer {turn}")
+
+
+async def run(model, sessions: int, turns: int, batched: bool) -> float:
+    start = time.perf_counter()
+    if batched:
+        service = EmbeddingService(model)
+        await asyncio.gather(*(session_service(service, s, turns) for s in range(sessions)))
+        await service.stop()
+    else:
+        await asyncio.gather(*(session_direct(model, s, turns) for s in range(sessions)))
+    elapsed = time.perf_counter() - start
+    return sessions * turns * 2 / elapsed
+
+
+async def main(real: bool, turns: int):
+    if real:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer("all-MiniLM-L6-v2")
+    else:
+        model = FakeEmbedder()
+
+    print(f"{'sessions':>8} | {'direct enc/s':>12} | {'batched enc/s':>13} | speedup")
+    for sessions in (1, 8, 32):
+        direct = await run(model, sessions, turns, batched=False)
+        batched = await run(model, sessions, turns, batched=True)
+        print(f"{sessions:>8} | {direct:>12.1f} | {batched:>13.1f} | {batched / direct:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embedding throughput: per-call encode vs batched service")
+    parser.add_argument("--real", action="store_true", help="Use the real SentenceTransformer model")
+    parser.add_argument("--turns", type=int, default=10, help="Turns per session")
+    args = parser.parse_args()
+    asyncio.run(main(args.real, args.turns))
@@ -0,0 +1,50 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+# === Import-time budget check ===
+# Imports backend.main in a fresh interpreter (with and without the voice stack enabled) and
+# fails if it takes longer than the budget or pulls in any of the heavy model libraries,
+# which must only load lazily through the model registry.
+#
+#   python -m backend.benchmarks.import_time --budget 2.0
+
+HEAVY_MODULES = ["torch", "whisper", "sentence_transformers", "transformers", "chromadb"]
+
+PROBE = f"""
+import sys, time, json
+start = time.perf_counter()
+import backend.main
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def probe(env_overrides: dict) -> dict:
+    env = {**os.environ, **env_overrides}
+    env.setdefault("ELEVENLABS_API_KEY", "unused")
+    out = subprocess.run([sys.executable, "-c", PROBE], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(budget: float, runs: int) -> int:
+    failed = False
+    for label, env in (("voice enabled", {"ENABLE_VOICE": "1"}), ("chat only", {"ENABLE_VOICE": "0"})):
+        results = [probe(env) for _ in range(runs)]
+        best = min(r["seconds"] for r in results)
+        heavy = sorted({m for r in results for m in r["heavy"]})
+        ok = best <= budget and not heavy
+        failed |= not ok
+        print(f"{'✅' if ok else '❌'} {label:14s} import backend.main: {best:.2f}s (budget {budget:.2f}s)"
+              + (f", heavy modules loaded: {', '.join(heavy)}" if heavy else ""))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that importing the app stays fast and lazy")
+    parser.add_argument("--budget", type=float, default=2.0, help="Max seconds for import backend.main")
+    parser.add_argument("--runs", type=int, default=3, help="Best of N runs (filters out cold disk cache)")
+    args = parser.parse_args()
+    raise SystemExit(main(args.budget, args.runs))
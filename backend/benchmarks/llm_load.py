@@ -0,0 +1,67 @@
+import time
+import asyncio
+import argparse
+import statistics
+
+from backend.benchmarks.stubs import GroqStub
+from backend.llm_client import llm_client
+from backend.phiagent2_groq import run_agent
+
+# === LLM load test ===
+# Runs N concurrent run_agent calls against a local Groq stub. With a non-blocking,
+# pooled client the batch should take roughly as long as a single chat, not N times as long.
+# The pool is first filled with as many concurrent requests as will be timed, so no measured
+# wave pays for new connections, and the medians of several rounds are compared.
+#
+#   python -m backend.benchmarks.llm_load --concurrency 20 --delay 0.5 --rounds 5
+
+
+async def timed_run(prompt: str) -> float:
+    start = time.perf_counter()
+    await run_agent(prompt)
+    return time.perf_counter() - start
+
+
+async def main(concurrency: int, delay: float, tolerance: float, rounds: int) -> int:
+    with GroqStub(delay=delay) as stub:
+        llm_client.base_url = stub.url
+        await llm_client.aclose()  # rebind to the stub on next call
+
+        # Open every pooled connection the timed waves will use, so none of them pays for a connect
+        warm = min(concurrency, llm_client.limits.max_connections or concurrency)
+        await asyncio.gather(*(timed_run(f"warmup #{i}") for i in range(warm)))
+
+        singles, totals, slowest = [], [], []
+        for _ in range(max(1, rounds)):
+            singles.append(await timed_run("hi"))
+            start = time.perf_counter()
+            latencies = await asyncio.gather(*(timed_run(f"hi #{i}") for i in range(concurrency)))
+            totals.append(time.perf_counter() - start)
+            slowest.append(max(latencies))
+
+        await llm_client.aclose()
+
+    single, total = statistics.median(singles), statistics.median(totals)
+    ratio = total / single
+    print(f"Medians over {len(totals)} round(s), pool warmed with {warm} connection(s)")
+    print(f"Single chat:               {single * 1000:.0f} ms")
+    print(f"{concurrency} concurrent chats:  {total * 1000:.0f} ms total "
+          f"(max {statistics.median(slowest) * 1000:.0f} ms per chat)")
+    print(f"Wall-clock ratio:          {ratio:.2f}x  (serialized would be ~{concurrency}x)")
+    print(f"Stub requests served:      {stub.requests_served}")
+
+    if concurrency <= llm_client.limiter.limit and ratio > tolerance:
+        print(f"❌ FAIL: concurrent chats took more than {tolerance}x a single chat")
+        return 1
+    print("✅ PASS")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent run_agent load test against a local Groq stub")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--delay", type=float, default=0.5, help="Stub response delay in seconds")
+    parser.add_argument("--tolerance", type=float, default=2.0, help="Max allowed total/single ratio")
+    parser.add_argument("--rounds", type=int, default=5, help="Timed rounds; medians are compared")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(main(args.concurrency, args.delay, args.tolerance, args.rounds)))
@@ -0,0 +1,152 @@
+import sys
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import statistics
+
+import numpy as np
+
+from backend.memory_store import MemoryStore, MEMORY_MAX_TURNS, anonymous_namespace
+
+# === Memory retrieval benchmark ===
+# Fills a fresh on-disk store with N total turns spread over per-session namespaces (each at the
+# per-namespace cap, as they would be in steady state), then measures query latency for one
+# session. With namespacing + caps the latency should stay flat as N grows. --baseline also
+# measures the old design: every turn in one global collection. Then checks that lookups on
+# unknown namespaces create nothing on disk, that anonymous namespaces are gone after forget()
+# and that the collection cache stays within its bound.
+#
+#   python -m backend.benchmarks.memory_retrieval --turns 10000 100000 1000000 --baseline
+
+INSERT_BATCH = 5000  # under Chroma's max batch size
+
+
+def random_vectors(n: int, dim: int) -> np.ndarray:
+    vectors = np.random.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def bulk_fill(collection, start: int, n: int, dim: int, now: float):
+    for offset in range(0, n, INSERT_BATCH):
+        size = min(INSERT_BATCH, n - offset)
+        collection.add(
+            ids=[f"t{start + offset + i}" for i in range(size)],
+            embeddings=random_vectors(size, dim),
+            documents=[f"User: question {start + offset + i}\nAI: answer" for i in range(size)],
+            metadatas=[{"ts": now - i, "importance": 1.0, "kind": "turn"} for i in range(size)],
+        )
+
+
+async def measure(query, dim: int, samples: int) -> tuple:
+    latencies = []
+    for _ in range(samples):
+        embedding = random_vectors(1, dim)[0]
+        start = time.perf_counter()
+        await query(embedding)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+
+async def bench_namespaced(total: int, dim: int, per_namespace: int, samples: int) -> tuple:
+    async def embed(text):
+        return random_vectors(1, dim)[0]
+
+    with tempfile.TemporaryDirectory() as path:
+        store = MemoryStore(embed=embed, path=path, max_turns=per_namespace)
+        now = time.time()
+        n_namespaces = max(1, total // per_namespace)
+        for ns in range(n_namespaces):
+            bulk_fill(store._collection(f"session-{ns}"), ns * per_namespace, per_namespace, dim, now)
+            store._counts[f"session-{ns}"] = per_namespace
+
+        target = f"session-{random.randrange(n_namespaces)}"
+        return await measure(lambda e: store.query(target, e), dim, samples)
+
+
+async def bench_global(total: int, dim: int, samples: int) -> tuple:
+    import chromadb
+
+    with tempfile.TemporaryDirectory() as path:
+        collection = chromadb.PersistentClient(path=path).get_or_create_collection(
+            "neura_memory", metadata={"hnsw:space": "cosine"}
+        )
+        bulk_fill(collection, 0, total, dim, time.time())
+
+        async def query(embedding):
+            return await asyncio.to_thread(collection.query, query_embeddings=[embedding], n_results=3)
+
+        return await measure(query, dim, samples)
+
+
+async def check_growth(dim: int, namespaces: int, max_loaded: int) -> list:
+    async def embed(text):
+        return random_vectors(1, dim)[0]
+
+    failures = []
+    with tempfile.TemporaryDirectory() as path:
+        store = MemoryStore(embed=embed, path=path, max_loaded=max_loaded)
+        for i in range(namespaces):
+            await store.query(f"fresh-{i}", random_vectors(1, dim)[0])
+        on_disk = len(store._get_client("fresh").list_collections())
+        if on_disk:
+            failures.append(f"{namespaces} queries on new namespaces created {on_disk} collections on disk")
+
+        anonymous = [anonymous_namespace() for _ in range(namespaces)]
+        for namespace in anonymous:
+            await store.add(namespace, "User: hi\nAI: hello", random_vectors(1, dim)[0])
+            if not await store.query(namespace, random_vectors(1, dim)[0]):
+                failures.append("an anonymous namespace did not return its own history")
+                break
+        on_disk = len(store._get_client("persistent").list_collections())
+        if on_disk:
+            failures.append(f"anonymous namespaces wrote {on_disk} collections to disk")
+        for i in range(namespaces):
+            await store.add(f"user-{i}", "User: hi\nAI: hello", random_vectors(1, dim)[0])
+        cached = max(len(store._collections), len(store._counts), len(store._locks))
+        if cached > max_loaded:
+            failures.append(f"{cached} namespaces cached, bound is {max_loaded}")
+
+        for namespace in anonymous:
+            await store.forget(namespace)
+        left = len(store._get_client(anonymous[0]).list_collections())
+        if left:
+            failures.append(f"{left} anonymous collections left after forget()")
+        print(f"\nGrowth: {namespaces} unknown-namespace queries, {namespaces} anonymous and {namespaces} named "
+              f"sessions -> {len(store._get_client('persistent').list_collections())} collections on disk, "
+              f"{left} in memory after forget, {cached} cached (bound {max_loaded})")
+    return failures
+
+
+async def main(sizes: list, dim: int, per_namespace: int, samples: int, baseline: bool) -> int:
+    print(f"Per-namespace cap: {per_namespace} turns, {dim}-dim embeddings, {samples} queries each")
+    print(f"{'stored turns':>12} | {'namespaced p50/p95 ms':>22} | {'global p50/p95 ms':>18}")
+    for total in sizes:
+        p50, p95 = await bench_namespaced(total, dim, per_namespace, samples)
+        row = f"{total:>12,} | {p50:>10.2f} / {p95:<9.2f} |"
+        if baseline:
+            g50, g95 = await bench_global(total, dim, samples)
+            row += f" {g50:>7.2f} / {g95:<8.2f}"
+        else:
+            row += f" {'(skipped)':>18}"
+        print(row)
+
+    failures = await check_growth(dim, namespaces=50, max_loaded=16)
+    for failure in failures:
+        print("❌ FAIL:", failure)
+    if not failures:
+        print("✅ PASS")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory retrieval latency vs total stored history")
+    parser.add_argument("--turns", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--per-namespace", type=int, default=MEMORY_MAX_TURNS)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--baseline", action="store_true", help="Also measure one global collection")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.turns, args.dim, args.per_namespace, args.samples, args.baseline)))
@@ -0,0 +1,73 @@
+import sys
+import time
+import argparse
+
+from backend.metrics import MetricsRegistry, metrics
+
+# === /metrics exposition check ===
+# Renders a registry holding a large counter, fractional and non-finite values and a histogram,
+# then parses every sample line back and fails if any value lost precision (Prometheus rate()
+# over a long uptime needs counters exact to the unit), and reports what a scrape of the
+# app's own registry costs.
+#
+#   python -m backend.benchmarks.metrics_exposition
+
+
+def parse_samples(text: str) -> dict:
+    # {"name{labels}": float} for every sample line of a text exposition
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, _, value = line.rpartition(" ")
+            samples[name] = float(value)
+    return samples
+
+
+def main(args) -> int:
+    registry = MetricsRegistry(prefix="check")
+    counter = registry.counter("events_total", "Events")
+    counter.inc(1234567, kind="large")
+    counter.inc(2 ** 40 + 1, kind="huge")
+    counter.inc(0.1, kind="fraction")
+    counter.inc(0.2, kind="fraction")
+    histogram = registry.histogram("latency_seconds", "Latency")
+    for value in (0.003, 0.07, 12.0):
+        histogram.observe(value)
+    registry.register_collector(lambda: [
+        ("bytes", "gauge", "Bytes", {(("kind", "collected"),): 9876543210, (("kind", "inf"),): float("inf")}),
+    ])
+
+    expected = {
+        'check_events_total{kind="large"}': 1234567,
+        'check_events_total{kind="huge"}': 2 ** 40 + 1,
+        'check_events_total{kind="fraction"}': 0.1 + 0.2,
+        'check_latency_seconds_bucket{le="+Inf"}': 3,
+        "check_latency_seconds_sum": 0.003 + 0.07 + 12.0,
+        'check_bytes{kind="collected"}': 9876543210,
+        'check_bytes{kind="inf"}': float("inf"),
+    }
+    text = registry.render()
+    samples = parse_samples(text)
+    failures = [f"{name} rendered as {samples.get(name)!r}, expected {value!r}"
+                for name, value in expected.items() if samples.get(name) != value]
+    if args.verbose:
+        print(text)
+
+    started = time.perf_counter()
+    for _ in range(args.scrapes):
+        metrics.render()
+    print(f"Exposition: {len(samples)} samples checked; app registry scrape "
+          f"{(time.perf_counter() - started) / args.scrapes * 1000:.2f} ms")
+
+    for failure in failures:
+        print("❌ FAIL:", failure)
+    if not failures:
+        print("✅ PASS")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precision of the Prometheus text exposition")
+    parser.add_argument("--scrapes", type=int, default=200, help="renders of the app registry to time")
+    parser.add_argument("--verbose", action="store_true", help="print the rendered exposition")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,164 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import resource
+import tempfile
+import threading
+import contextlib
+import multiprocessing
+
+from backend.benchmarks.stubs import FakeASR, FakeEmbedder
+from backend.benchmarks.e2e_load import synthetic_utterance, percentile, PROMPTS
+
+# === Shared model host benchmark ===
+# Runs the model host (fake Whisper and sentence encoder, real Chroma in a temp dir) and drives
+# it from 1 and then N separate worker processes, each with several concurrent sessions doing
+# what a voice turn does: transcribe a clip, embed the text, query and add conversation memory.
+# Clips and texts from different workers should be batched together on the host, so throughput
+# rises with workers while each worker stays small and every worker sees the same memory.
+#
+#   python -m backend.benchmarks.model_host --workers 4 --sessions 4 --turns 5
+
+
+def rss_mb() -> float:
+    # Current resident set (ru_maxrss would include the parent's high-water mark from before exec)
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * resource.getpagesize() / 2 ** 20
+
+
+def start_host(path: str, args, workdir: str):
+    from backend.models import ModelRegistry
+    from backend.model_host import ModelHost, create_model_services
+
+    registry = ModelRegistry()
+    whisper_model, embedding_service, memory_store = create_model_services(registry)
+    fake_asr = FakeASR(overhead=args.asr_overhead, real_time_factor=args.asr_rtf, transcripts=PROMPTS)
+    whisper_model.workers = 1
+    whisper_model.transcribe_batch = fake_asr.transcribe_batch
+    registry.register("asr", lambda: [None])
+    registry.register("embedder", lambda: FakeEmbedder())
+    memory_store.path = workdir
+    host = ModelHost(registry, whisper_model, embedding_service, memory_store)
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_until_complete, args=(host.serve(path, warmup=["asr", "embedder", "memory"]),),
+                              daemon=True)
+    thread.start()
+    while not os.path.exists(path):
+        time.sleep(0.02)
+    return host, loop, thread
+
+
+async def worker_sessions(path: str, worker: int, sessions: int, turns: int, ready, go) -> dict:
+    from backend.model_host import ModelHostClient
+
+    client = ModelHostClient(path)
+    audio = synthetic_utterance()
+    latencies = []
+    await client.call("ping")  # connected; wait until every worker is, so only the turns are timed
+    ready.put(worker)
+    await asyncio.to_thread(go.wait)
+
+    async def session(index: int):
+        namespace = f"bench-{worker}-{index}"
+        for turn in range(turns):
+            start = time.perf_counter()
+            text = (await client.transcriber.transcribe(audio))["text"]
+            embedding = await client.embedder.encode(f"{text} #{worker}.{index}.{turn}")
+            await client.memory.query(namespace, embedding)
+            await client.memory.add(namespace, f"User: {text}\nAI: ok", embedding)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(session(i) for i in range(sessions)))
+    await client.aclose()
+    return {"latencies": latencies, "rss_mb": rss_mb()}
+
+
+def worker_main(path: str, worker: int, sessions: int, turns: int, ready, go, results):
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        results.put(asyncio.run(worker_sessions(path, worker, sessions, turns, ready, go)))
+
+
+def run_workers(path: str, workers: int, args) -> dict:
+    context = multiprocessing.get_context("spawn")
+    ready, go, results = context.Queue(), context.Event(), context.Queue()
+    processes = [context.Process(target=worker_main, args=(path, w, args.sessions, args.turns, ready, go, results))
+                 for w in range(workers)]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.get(timeout=120)
+    start = time.perf_counter()
+    go.set()
+    outcomes = [results.get(timeout=300) for _ in processes]
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+    latencies = [t for outcome in outcomes for t in outcome["latencies"]]
+    return {
+        "turns": len(latencies),
+        "turns_per_s": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "worker_rss_mb": max(outcome["rss_mb"] for outcome in outcomes),
+    }
+
+
+def host_stats(host) -> dict:
+    return {"asr": host.whisper_model.stats(), "embeddings": host.embedding_service.stats(),
+            "memory": host.memory_store.stats()}
+
+
+def main(args) -> int:
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "models.sock")
+        quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+        with quiet:
+            host, loop, thread = start_host(path, args, os.path.join(workdir, "memory"))
+            runs = {}
+            for workers in sorted({1, args.workers}):
+                before = host_stats(host)["asr"]
+                runs[workers] = run_workers(path, workers, args)
+                after = host_stats(host)["asr"]
+                clips = after["completed"] - before["completed"]
+                runs[workers]["asr_batch"] = clips / max(1, after["batches"] - before["batches"])
+            stats = host_stats(host)
+            loop.call_soon_threadsafe(host.stop)
+            thread.join(timeout=10)
+
+    print(f"{'workers':<9}{'turns':>7}{'turns/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'ASR batch':>11}{'worker RSS':>12}")
+    for workers, row in runs.items():
+        print(f"{workers:<9}{row['turns']:>7}{row['turns_per_s']:>10.1f}{row['p50_ms']:>9.0f}{row['p95_ms']:>9.0f}"
+              f"{row['asr_batch']:>11.2f}{row['worker_rss_mb']:>10.0f}MB")
+    host_rss = rss_mb()
+    print(f"\nHost: RSS {host_rss:.0f} MB, embeddings {stats['embeddings']['avg_batch_size']:.1f}/batch, "
+          f"memory entries {stats['memory']['entries_loaded']} in {stats['memory']['namespaces_loaded']} namespaces")
+
+    failures = []
+    total_turns = sum(row["turns"] for row in runs.values())
+    if stats["memory"]["entries_loaded"] != total_turns:
+        failures.append(f"expected {total_turns} memory entries on the host, found {stats['memory']['entries_loaded']}")
+    if args.workers > 1:
+        single, multi = runs[1], runs[args.workers]
+        if multi["asr_batch"] <= 1.0:
+            failures.append("clips from different workers were never batched together")
+        if multi["turns_per_s"] < single["turns_per_s"] * 1.5:
+            failures.append(f"{args.workers} workers were not meaningfully faster than one")
+    for failure in failures:
+        print("❌ FAIL:", failure)
+    if not failures:
+        print("✅ PASS")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-worker benchmark of the shared model host")
+    parser.add_argument("--workers", type=int, default=4, help="web worker processes in the multi-worker run")
+    parser.add_argument("--sessions", type=int, default=4, help="concurrent sessions per worker")
+    parser.add_argument("--turns", type=int, default=5, help="turns per session")
+    parser.add_argument("--asr-overhead", type=float, default=0.05, help="fake ASR per-dispatch cost (s)")
+    parser.add_argument("--asr-rtf", type=float, default=0.02, help="fake ASR real-time factor")
+    parser.add_argument("--verbose", action="store_true", help="show the host's own log output")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,79 @@
+import time
+import asyncio
+import argparse
+
+from backend.benchmarks.stubs import GroqStub
+from backend.llm_client import llm_client
+from backend import phiagent2_groq as agent
+
+# === Parallel tool-call benchmark ===
+# The Groq stub answers with several tool calls in one turn (an email plus calendar events, and
+# one broken call). Tool handlers are swapped for fakes with a fixed latency, so the turn should
+# take about one tool's latency, not the sum, and every valid call should show up in the reply.
+#
+#   python -m backend.benchmarks.parallel_tools --events 2 --tool-latency 0.5
+
+TOOL_LATENCY = 0.5
+
+
+async def fake_send_email(to: str, subject: str, body: str) -> str:
+    await asyncio.sleep(TOOL_LATENCY)
+    return f"📨 Email queued for delivery. To {to}, status id fake."
+
+
+def fake_schedule_event(title: str, date: str, time: str, end_time: str = None,
+                        location: str = "", description: str = "") -> str:
+    # Sync on purpose: blocking handlers must not hold up the loop or each other
+    import time as _time
+    _time.sleep(TOOL_LATENCY)
+    return f"📅 Event scheduled. '{title}' on {date} at {time}.\n"
+
+
+async def main(n_events: int, tool_latency: float) -> int:
+    global TOOL_LATENCY
+    TOOL_LATENCY = tool_latency
+
+    tools = agent.tools
+    definitions = {d["name"]: d for d in tools.definitions()}
+    tools.register(definitions["send_email"], fake_send_email)
+    tools.register(definitions["schedule_event"], fake_schedule_event)
+
+    calls = [("send_email", {"to": "team@example.com", "subject": "Standup", "body": "Moved to 10."})]
+    calls += [("schedule_event", {"title": f"Meeting {i}", "date": "2030-01-01", "time": f"1{i}:00"})
+              for i in range(n_events)]
+    calls += [("schedule_event", {"title": "Broken"})]  # missing required args -> blocked
+
+    ok = True
+    with GroqStub(delay=0.05, tool_calls=calls) as stub:
+        llm_client.base_url = stub.url
+        await llm_client.aclose()
+
+        for label, run in (("run_agent", agent.run_agent),
+                           ("run_agent_stream", lambda p: _join_stream(agent.run_agent_stream(p)))):
+            start = time.perf_counter()
+            reply = await run("Email the team and book the meetings")
+            elapsed = time.perf_counter() - start
+            lines = reply.splitlines()
+            print(f"{label}: {len(lines)} result lines in {elapsed * 1000:.0f} ms "
+                  f"({len(calls) - 1} valid tools x {tool_latency * 1000:.0f} ms each)")
+            for line in lines:
+                print("   ", line)
+            ok &= len(lines) == len(calls) and elapsed < tool_latency * 2
+
+        ok &= "tools" in stub.last_request and "functions" not in stub.last_request
+        await llm_client.aclose()
+
+    print("✅ PASS" if ok else "❌ FAIL")
+    return 0 if ok else 1
+
+
+async def _join_stream(deltas) -> str:
+    return "".join([delta async for delta in deltas])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent execution of multiple tool calls per turn")
+    parser.add_argument("--events", type=int, default=2)
+    parser.add_argument("--tool-latency", type=float, default=0.5)
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(main(args.events, args.tool_latency)))
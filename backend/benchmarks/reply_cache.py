@@ -0,0 +1,110 @@
+import time
+import asyncio
+import argparse
+
+from backend.benchmarks.stubs import GroqStub, FakeEmbedder
+from backend.embeddings import EmbeddingService
+from backend.llm_client import llm_client
+from backend.reply_cache import reply_cache, context_scope
+from backend import phiagent2_groq as agent
+
+# === Reply cache benchmark ===
+# Replays a small chat workload with repeats and paraphrases through run_agent_cached against
+# a Groq stub, with a bag-of-words fake encoder standing in for the sentence model. Reports hit
+# rate and latency saved, then checks that a turn that calls a tool is never replayed (nor a
+# near-duplicate of one), and that a turn asked with memory context never gets a reply cached
+# without that context or for another session.
+#
+#   python -m backend.benchmarks.reply_cache --delay 0.3 --threshold 0.85
+
+WORKLOAD = [
+    "hi", "Hi!", "what can you do?", "What can you do", "hello there", "hi",
+    "what can you do for me?", "tell me a joke", "Tell me a joke!", "please tell me a joke",
+    "what's the weather like on mars", "what can you do?",
+]
+
+
+async def main(delay: float, threshold: float) -> int:
+    embedder = EmbeddingService(FakeEmbedder(call_overhead=0.002, per_item=0.0, bag_of_words=True))
+    reply_cache.embed = embedder.encode
+    reply_cache.threshold = threshold
+    reply_cache.clear()
+
+    with GroqStub(delay=delay) as stub:
+        llm_client.base_url = stub.url
+        await llm_client.aclose()
+
+        start = time.perf_counter()
+        for question in WORKLOAD:
+            await agent.run_agent_cached(question)
+        cached_total = time.perf_counter() - start
+        llm_calls = stub.requests_served
+
+    stats = reply_cache.stats()
+    uncached_total = len(WORKLOAD) * delay
+    print(f"{len(WORKLOAD)} turns: {cached_total * 1000:.0f} ms with the cache "
+          f"(~{uncached_total * 1000:.0f} ms without), {llm_calls} LLM calls")
+    print(f"Hit rate {stats['hit_rate']:.0%} ({stats['exact_hits']} exact, {stats['semantic_hits']} semantic), "
+          f"latency saved {stats['latency_saved_seconds'] * 1000:.0f} ms")
+    print(f"Best-similarity histogram: {stats['best_similarity_histogram']}")
+    ok = llm_calls < len(WORKLOAD) and stats["exact_hits"] > 0 and stats["semantic_hits"] > 0
+
+    # Context-dependent follow-ups: "yes" is cached globally, then asked by two sessions with memory
+    with GroqStub(delay=0.01) as stub:
+        llm_client.base_url = stub.url
+        await llm_client.aclose()
+        await agent.run_agent_cached("yes")
+        for session, context in (("alice", "User: shall I book it?"), ("bob", "User: my name is Bob")):
+            scope = context_scope(session, context)
+            await agent.run_agent_cached("yes", f"Prior context:\n{context}\n\nUser: yes", scope)
+        repeat_scope = context_scope("alice", "User: shall I book it?")
+        await agent.run_agent_cached("yes", "Prior context:\nUser: shall I book it?\n\nUser: yes", repeat_scope)
+        await llm_client.aclose()
+    print(f"Follow-up 'yes' (global, 2 sessions with context, 1 repeat): LLM called {stub.requests_served}x")
+    ok &= stub.requests_served == 3
+
+    # Tool turns: the same request twice must run the tool twice
+    sent = []
+
+    async def fake_send_email(to: str, subject: str, body: str) -> str:
+        sent.append(to)
+        return f"📨 Email queued for delivery. To {to}, status id fake."
+
+    agent.tools.register({d["name"]: d for d in agent.tools.definitions()}["send_email"], fake_send_email)
+    call = ("send_email", {"to": "team@example.com", "subject": "Hi", "body": "Standup at 10."})
+    with GroqStub(delay=0.01, tool_calls=[call]) as stub:
+        llm_client.base_url = stub.url
+        await llm_client.aclose()
+        for _ in range(2):
+            await agent.run_agent_cached("email the team about standup")
+        async for _ in agent.run_agent_stream_cached("email the team about standup"):
+            pass
+        await llm_client.aclose()
+    print(f"Tool turn repeated 3x: tool ran {len(sent)}x, LLM called {stub.requests_served}x")
+    ok &= len(sent) == 3
+
+    # A near-duplicate of a tool request must reach the LLM (and the tool), not a semantic hit
+    sent.clear()
+    with GroqStub(delay=0.01, tool_calls=[call]) as stub:
+        llm_client.base_url = stub.url
+        await llm_client.aclose()
+        await agent.run_agent_cached("email the team that standup moves to ten")
+        await agent.run_agent_cached("email the team that standup moves to eleven")
+        await llm_client.aclose()
+    similarity = float(await reply_cache._vector("email the team that standup moves to ten")
+                       @ await reply_cache._vector("email the team that standup moves to eleven"))
+    print(f"Near-duplicate tool requests (similarity {similarity:.2f}): tool ran {len(sent)}x, "
+          f"{reply_cache.stats()['tool_misses']} lookup(s) refused as tool turns")
+    ok &= len(sent) == 2
+
+    await embedder.stop()
+    print("✅ PASS" if ok else "❌ FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exact + semantic reply cache in front of run_agent")
+    parser.add_argument("--delay", type=float, default=0.3, help="stub LLM latency in seconds")
+    parser.add_argument("--threshold", type=float, default=0.85, help="similarity threshold for the fake encoder")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(main(args.delay, args.threshold)))
@@ -0,0 +1,450 @@
+import json
+import time
+import uuid
+import threading
+import socketserver
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# === Local service stubs used by the benchmarks ===
+# Each stub runs in a background thread on 127.0.0.1 with an OS-assigned port.
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+# === Groq / OpenAI-compatible chat-completions stub ===
+# Replies after a fixed delay so the client's concurrency (not the stub) is what gets measured.
+# With `tool_calls` ([(name, arguments dict)]) it answers with those tool calls instead of text;
+# with `tool_trigger` as well, only when the user message contains that word. With `capacity`,
+# it behaves like a saturated provider: beyond that many requests in flight, each one slows down
+# in proportion.
+class GroqStub:
+    def __init__(self, delay: float = 0.5, reply: str = "Hello from the stub!", tool_calls=None,
+                 tool_trigger: str = None, capacity: int = None):
+        self.delay = delay
+        self.capacity = capacity
+        self.in_flight = 0
+        self.reply = reply
+        self.tool_calls = tool_calls or []
+        self.tool_trigger = tool_trigger
+        self.last_request = None
+        self.requests_served = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/openai/v1"
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is exercised
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                with stub._lock:
+                    stub.requests_served += 1
+                    stub.last_request = request
+                    stub.in_flight += 1
+                    delay = stub.delay * max(1.0, stub.in_flight / stub.capacity) if stub.capacity else stub.delay
+                try:
+                    self._reply(request, delay)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client hung up mid-reply (e.g. a turn cancelled by barge-in)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+            def _reply(self, request: dict, delay: float):
+                tool_calls = stub._tool_calls_for(request)
+                if request.get("stream"):
+                    self._stream_reply(tool_calls, delay)
+                    return
+
+                time.sleep(delay)
+
+                body = json.dumps({
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion",
+                    "choices": [{
+                        "index": 0,
+                        "message": stub._message(tool_calls),
+                        "finish_reason": "tool_calls" if tool_calls else "stop"
+                    }]
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _stream_reply(self, tool_calls, delay: float):
+                # SSE chat.completion.chunk events, one word at a time, spread over `delay`
+                words = [] if tool_calls else stub.reply.split(" ")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                if not words:
+                    time.sleep(delay)
+                for i, word in enumerate(words):
+                    time.sleep(delay / len(words))
+                    chunk = {
+                        "id": "chatcmpl-stub",
+                        "object": "chat.completion.chunk",
+                        "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}}]
+                    }
+                    self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+                for index, (name, arguments) in enumerate(tool_calls):
+                    # Name first, then the arguments JSON split across two deltas, like Groq does
+                    raw = json.dumps(arguments)
+                    for fn in ({"name": name, "arguments": ""}, {"arguments": raw[:len(raw) // 2]},
+                               {"arguments": raw[len(raw) // 2:]}):
+                        delta = {"tool_calls": [{"index": index, "type": "function", "function": fn}]}
+                        chunk = {"id": "chatcmpl-stub", "object": "chat.completion.chunk",
+                                 "choices": [{"index": 0, "delta": delta}]}
+                        self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+                self._write_chunk(b"data: [DONE]\n\n")
+                self._write_chunk(b"")
+
+            def _write_chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def log_message(self, format, *args):
+                pass  # keep benchmark output readable
+
+        return Handler
+
+    def _tool_calls_for(self, request: dict) -> list:
+        if not self.tool_calls or self.tool_trigger is None:
+            return self.tool_calls
+        user_text = " ".join(str(m.get("content") or "") for m in request.get("messages", []) if m.get("role") == "user")
+        return self.tool_calls if self.tool_trigger.lower() in user_text.lower() else []
+
+    def _message(self, tool_calls: list) -> dict:
+        if not tool_calls:
+            return {"role": "assistant", "content": self.reply}
+        return {"role": "assistant", "content": None, "tool_calls": [
+            {"id": f"call_{i}", "type": "function", "function": {"name": name, "arguments": json.dumps(arguments)}}
+            for i, (name, arguments) in enumerate(tool_calls)
+        ]}
+
+    def start(self):
+        self._server = _StubServer(("127.0.0.1", 0), self._make_handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# === Fake TTS generator ===
+# Drop-in for elevenlabs_synthesize: waits a first-byte latency, then yields fake MP3-sized
+# chunks at a rate proportional to the text length, like a streaming TTS API would.
+class FakeTTS:
+    def __init__(self, first_byte_delay: float = 0.2, seconds_per_char: float = 0.004, chunk_size: int = 2048):
+        self.first_byte_delay = first_byte_delay
+        self.seconds_per_char = seconds_per_char
+        self.chunk_size = chunk_size
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, text: str):
+        with self._lock:
+            self.calls.append(text)
+        time.sleep(self.first_byte_delay)
+        n_chunks = max(1, len(text) // 20)
+        for i in range(n_chunks):
+            time.sleep(self.seconds_per_char * 20)
+            yield bytes([i % 256]) * self.chunk_size
+
+
+# === Fake sentence embedder ===
+# Same encode(list) -> array contract as SentenceTransformer, with a fixed per-call overhead
+# plus a small per-sentence cost, which is what makes batching pay off on the real model.
+class FakeEmbedder:
+    def __init__(self, call_overhead: float = 0.008, per_item: float = 0.0005, dim: int = 384,
+                 bag_of_words: bool = False):
+        self.call_overhead = call_overhead
+        self.per_item = per_item
+        self.dim = dim
+        # bag_of_words: sum of per-word vectors, so texts sharing most words come out similar
+        self.bag_of_words = bag_of_words
+        self.calls = 0
+
+    def _vector(self, token: str):
+        import zlib
+        import numpy as np
+        return np.random.default_rng(zlib.crc32(token.encode("utf-8"))).standard_normal(self.dim)
+
+    def encode(self, texts):
+        import numpy as np
+
+        self.calls += 1
+        time.sleep(self.call_overhead + self.per_item * len(texts))
+        vectors = np.empty((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            tokens = text.lower().split() if self.bag_of_words else [text]
+            vectors[i] = sum(self._vector(token) for token in tokens) if tokens else self._vector("")
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors
+
+
+# === Fake Whisper ===
+# Drop-in for TranscriptionScheduler's transcribe_batch: costs a fixed overhead per dispatch plus
+# a fraction of each clip's duration (real-time factor), and returns the transcripts in order.
+class FakeASR:
+    def __init__(self, overhead: float = 0.05, real_time_factor: float = 0.1, transcripts=None,
+                 sample_rate: int = 16000):
+        self.overhead = overhead
+        self.real_time_factor = real_time_factor
+        self.transcripts = list(transcripts or ["what can you do"])
+        self.sample_rate = sample_rate
+        self.batches = 0
+        self.clips = 0
+        self._lock = threading.Lock()
+
+    def _duration(self, audio) -> float:
+        if isinstance(audio, str):  # whole-clip path: assume 16-bit mono at sample_rate
+            import os
+            return max(0, os.path.getsize(audio) - 44) / 2 / self.sample_rate
+        return len(audio) / self.sample_rate
+
+    def transcribe_batch(self, model, audios: list) -> list:
+        with self._lock:
+            self.batches += 1
+            start = self.clips
+            self.clips += len(audios)
+        time.sleep(self.overhead + self.real_time_factor * sum(self._duration(a) for a in audios))
+        return [{"text": self.transcripts[(start + i) % len(self.transcripts)]} for i in range(len(audios))]
+
+
+# === Google Calendar REST stand-in ===
+# Serves the three endpoints the calendar client uses: OAuth token refresh, single event
+# insert, and the multipart/mixed batch endpoint. Point CalendarClient(api_root=stub.url,
+# token_uri=stub.token_uri).
+class CalendarStub:
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.events = []
+        self.http_requests = 0
+        self.batch_requests = 0
+        self.token_refreshes = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    @property
+    def token_uri(self) -> str:
+        return self.url + "token"
+
+    def _insert(self, calendar_id: str, event: dict) -> dict:
+        created = {**event, "id": uuid.uuid4().hex, "status": "confirmed", "organizer": {"email": calendar_id}}
+        with self._lock:
+            self.events.append(created)
+        return created
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with stub._lock:
+                    stub.http_requests += 1
+                time.sleep(stub.delay)
+
+                if self.path.startswith("/token"):
+                    with stub._lock:
+                        stub.token_refreshes += 1
+                    self._send(200, "application/json", json.dumps(
+                        {"access_token": f"token-{uuid.uuid4().hex}", "expires_in": 3600, "token_type": "Bearer"}
+                    ).encode())
+                elif self.path.startswith("/batch/"):
+                    with stub._lock:
+                        stub.batch_requests += 1
+                    self._batch(body)
+                elif "/events" in self.path:
+                    calendar_id = self.path.split("/calendars/")[1].split("/")[0]
+                    self._send(200, "application/json", json.dumps(stub._insert(calendar_id, json.loads(body))).encode())
+                else:
+                    self._send(404, "application/json", b"{}")
+
+            def _batch(self, body: bytes):
+                message = BytesParser().parsebytes(
+                    f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body
+                )
+                boundary = f"batch_{uuid.uuid4().hex}"
+                parts = []
+                for part in message.get_payload():
+                    request = part.get_payload(decode=True) or part.get_payload().encode()
+                    head, _, payload = request.partition(b"\r\n\r\n")
+                    if not payload:
+                        head, _, payload = request.partition(b"\n\n")
+                    path = head.split(b" ")[1].decode()
+                    calendar_id = path.split("/calendars/")[1].split("/")[0]
+                    created = json.dumps(stub._insert(calendar_id, json.loads(payload)))
+                    content_id = part["Content-ID"].strip("<>")
+                    parts.append(
+                        f"--{boundary}\r\nContent-Type: application/http\r\n"
+                        f"Content-ID: <response-{content_id}>\r\n\r\n"
+                        f"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n{created}\r\n"
+                    )
+                self._send(200, f"multipart/mixed; boundary={boundary}",
+                           ("".join(parts) + f"--{boundary}--\r\n").encode())
+
+            def _send(self, status: int, content_type: str, data: bytes):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._server = _StubServer(("127.0.0.1", 0), self._make_handler())
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# === Local SMTP sink ===
+# Plain-text SMTP server that accepts any login and keeps delivered messages in memory. Use it with
+# SMTP_SECURITY=none (EmailOutbox(security="none")). `handshake_delay` stands in for the TLS
+# handshake + login a real server costs per connection, `idle_timeout` drops sessions that sit
+# idle, and `fail_next` answers the next N DATA commands with a transient 451.
+class SMTPSink:
+    def __init__(self, handshake_delay: float = 0.2, idle_timeout: float = None, fail_next: int = 0):
+        self.handshake_delay = handshake_delay
+        self.idle_timeout = idle_timeout
+        self.fail_next = fail_next
+        self.messages = []
+        self.connections = 0
+        self.dropped_idle = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def host(self) -> str:
+        return self._server.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def _make_handler(self):
+        sink = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line: str):
+                self.wfile.write((line + "\r\n").encode())
+                self.wfile.flush()
+
+            def handle(self):
+                with sink._lock:
+                    sink.connections += 1
+                time.sleep(sink.handshake_delay)
+                self.request.settimeout(sink.idle_timeout)
+                self.reply("220 sink ESMTP ready")
+                sender, recipients = None, []
+                while True:
+                    try:
+                        raw = self.rfile.readline()
+                    except OSError:  # idle timeout: hang up without a goodbye, like real servers
+                        with sink._lock:
+                            sink.dropped_idle += 1
+                        return
+                    if not raw:
+                        return
+                    command = raw.decode(errors="replace").strip()
+                    verb = command.split(" ", 1)[0].upper()
+                    if verb == "EHLO":
+                        self.reply("250-sink\r\n250-AUTH PLAIN LOGIN\r\n250 8BITMIME")
+                    elif verb == "HELO":
+                        self.reply("250 sink")
+                    elif verb == "AUTH":
+                        self.reply("235 2.7.0 Authentication successful")
+                    elif verb == "MAIL":
+                        sender, recipients = command, []
+                        self.reply("250 OK")
+                    elif verb == "RCPT":
+                        recipients.append(command)
+                        self.reply("250 OK")
+                    elif verb == "DATA":
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        lines = []
+                        while True:
+                            line = self.rfile.readline()
+                            if not line or line in (b".\r\n", b".\n"):
+                                break
+                            lines.append(line)
+                        with sink._lock:
+                            failing = sink.fail_next > 0
+                            if failing:
+                                sink.fail_next -= 1
+                            else:
+                                sink.messages.append(BytesParser().parsebytes(b"".join(lines)))
+                        self.reply("451 4.3.0 Try again later" if failing else "250 OK queued")
+                    elif verb in ("RSET", "NOOP"):
+                        self.reply("250 OK")
+                    elif verb == "QUIT":
+                        self.reply("221 Bye")
+                        return
+                    else:
+                        self.reply("502 Command not implemented")
+
+        return Handler
+
+    def start(self):
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), self._make_handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
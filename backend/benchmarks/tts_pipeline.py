@@ -0,0 +1,52 @@
+import time
+import asyncio
+import argparse
+
+from backend.benchmarks.stubs import FakeTTS
+from backend.tts import synthesize_stream, split_sentences
+
+# === TTS pipeline benchmark ===
+# Compares time-to-first-audio for the old "synthesize the whole reply, then send" path with
+# the sentence-pipelined stream, using a local fake TTS generator.
+#
+#   python -m backend.benchmarks.tts_pipeline
+
+REPLY = (
+    "Sure, I can help with that. I've looked at your calendar for tomorrow and you're free after lunch. "
+    "Would you like me to schedule the meeting at two in the afternoon? "
+    "I can also send an email to the team letting them know. Just say the word and it's done!"
+)
+
+
+async def whole_reply(tts: FakeTTS) -> tuple:
+    start = time.perf_counter()
+    audio = b"".join(await asyncio.to_thread(lambda: list(tts(REPLY))))
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed, len(audio)  # nothing can be sent until the end
+
+
+async def pipelined(tts: FakeTTS) -> tuple:
+    start = time.perf_counter()
+    first = None
+    size = 0
+    async for chunk in synthesize_stream(split_sentences(REPLY), tts):
+        if first is None:
+            first = time.perf_counter() - start
+        size += len(chunk)
+    return first, time.perf_counter() - start, size
+
+
+async def main(first_byte_delay: float, seconds_per_char: float):
+    print(f"Reply: {len(REPLY)} chars, {len(split_sentences(REPLY))} sentences")
+    for name, run in (("Whole reply", whole_reply), ("Sentence pipeline", pipelined)):
+        tts = FakeTTS(first_byte_delay=first_byte_delay, seconds_per_char=seconds_per_char)
+        first, total, size = await run(tts)
+        print(f"{name:18s} first audio {first * 1000:6.0f} ms | complete {total * 1000:6.0f} ms | {size} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time-to-first-audio: whole-reply vs sentence-pipelined TTS")
+    parser.add_argument("--first-byte-delay", type=float, default=0.2)
+    parser.add_argument("--seconds-per-char", type=float, default=0.004)
+    args = parser.parse_args()
+    asyncio.run(main(args.first_byte_delay, args.seconds_per_char))
@@ -0,0 +1,242 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+
+from backend.benchmarks.stubs import GroqStub, SMTPSink, CalendarStub
+from backend.benchmarks.e2e_load import (configure_environment, build_app, free_port, ServerThread, percentile,
+                                         PROMPTS, STUB_REPLY)
+from backend.benchmarks.admission import wait_ready
+
+# === /ws/audio session protocol benchmark ===
+# 1. Handshakes: text turns the way the old frontend sent them (new socket + mode frame per
+#    message, legacy format) vs as turns on one persistent protocol v1 connection.
+# 2. Multiplexing: K text turns sent at once on one v1 connection (each under its own turn id)
+#    vs the same K turns one after another on a legacy connection.
+# 3. Resume: the connection is dropped while a reply streams; a new connection resumes the
+#    session and must receive the complete reply (every delta plus "done") with nothing lost.
+# 4. Legacy barge-in: a second text turn interrupts the first on a legacy connection; the old
+#    client must get only the second reply, never the v1 {"type": "cancelled"} frame.
+# 5. Serialized turns (BARGE_IN=off): two interrupting turns queue one behind the other, and a
+#    ping sent meanwhile must still be answered right away (the receive loop never blocks).
+#
+#   python -m backend.benchmarks.ws_protocol --turns 10 --concurrent 6 --llm-delay 0.4
+
+
+async def legacy_turn(url: str, prompt: str) -> float:
+    import websockets
+
+    start = time.perf_counter()
+    async with websockets.connect(url) as ws:
+        await ws.send(json.dumps({"type": "mode", "payload": "text", "stream": True}))
+        await ws.send(json.dumps({"type": "text", "payload": prompt}))
+        while json.loads(await ws.recv()).get("type") != "done":
+            pass
+    return time.perf_counter() - start
+
+
+async def hello(ws, **fields) -> dict:
+    await ws.send(json.dumps({"type": "hello", "v": 1, "mode": "text", "stream": True, **fields}))
+    return json.loads(await ws.recv())
+
+
+async def collect_turns(ws, turns: set, replies: dict = None, last_seq: list = None, seconds: float = 30) -> set:
+    # Reads v1 frames until every turn in `turns` has ended or `seconds` pass; returns the unfinished turns
+    pending = set(turns)
+    deadline = time.perf_counter() + seconds
+    while pending:
+        try:
+            frame = json.loads(await asyncio.wait_for(ws.recv(), deadline - time.perf_counter()))
+        except asyncio.TimeoutError:
+            break
+        if last_seq is not None and "seq" in frame:
+            last_seq[0] = frame["seq"]
+        if replies is not None and frame.get("type") == "delta":
+            replies.setdefault(frame["turn"], []).append(frame["payload"])
+        if replies is not None and frame.get("type") == "done":
+            replies[frame["turn"] + ":done"] = frame["payload"]
+        if frame.get("type") in ("turn_end", "cancelled"):
+            pending.discard(frame["turn"])
+    return pending
+
+
+async def run_handshakes(port: int, turns: int) -> dict:
+    import websockets
+
+    url = f"ws://127.0.0.1:{port}/ws/audio?session=bench-protocol"
+    per_message = [await legacy_turn(url, PROMPTS[i % len(PROMPTS)]) for i in range(turns)]
+    persistent = []
+    async with websockets.connect(url) as ws:
+        await hello(ws)
+        for i in range(turns):
+            start = time.perf_counter()
+            await ws.send(json.dumps({"type": "text", "turn": f"t{i}", "payload": PROMPTS[i % len(PROMPTS)]}))
+            await collect_turns(ws, {f"t{i}"})
+            persistent.append(time.perf_counter() - start)
+    return {"per_message": per_message, "persistent": persistent}
+
+
+async def run_multiplexing(port: int, concurrent: int) -> dict:
+    import websockets
+
+    url = f"ws://127.0.0.1:{port}/ws/audio?session=bench-protocol"
+    prompts = [f"{PROMPTS[i % len(PROMPTS)]} #{i}" for i in range(concurrent)]
+
+    start = time.perf_counter()
+    async with websockets.connect(url) as ws:
+        await ws.send(json.dumps({"type": "mode", "payload": "text", "stream": True}))
+        for prompt in prompts:
+            await ws.send(json.dumps({"type": "text", "payload": prompt}))
+            while json.loads(await ws.recv()).get("type") != "done":
+                pass
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    async with websockets.connect(url) as ws:
+        await hello(ws)
+        for i, prompt in enumerate(prompts):
+            await ws.send(json.dumps({"type": "text", "turn": f"m{i}", "payload": prompt}))
+        await collect_turns(ws, {f"m{i}" for i in range(concurrent)})
+    multiplexed = time.perf_counter() - start
+    return {"sequential": sequential, "multiplexed": multiplexed}
+
+
+async def run_resume(port: int, drop_after: float) -> dict:
+    import websockets
+
+    url = f"ws://127.0.0.1:{port}/ws/audio?session=bench-protocol"
+    replies, last_seq = {}, [0]
+    async with websockets.connect(url) as ws:
+        token = (await hello(ws))["session"]
+        await ws.send(json.dumps({"type": "text", "turn": "r", "payload": "tell me a long story"}))
+        in_flight = await collect_turns(ws, {"r"}, replies, last_seq, seconds=drop_after)
+    seen_before_drop = len(replies.get("r", []))
+
+    await asyncio.sleep(drop_after)  # the reply keeps streaming into the session's buffer meanwhile
+    start = time.perf_counter()
+    async with websockets.connect(url) as ws:
+        welcome = await hello(ws, resume=token, last_seq=last_seq[0])
+        unfinished = await collect_turns(ws, in_flight, replies, last_seq)
+    return {
+        "dropped_mid_reply": bool(in_flight),
+        "resumed": welcome.get("resumed", False),
+        "replayed": welcome.get("replayed", 0),
+        "deltas_before_drop": seen_before_drop,
+        "complete": not unfinished and "".join(replies.get("r", [])) == replies.get("r:done") == STUB_REPLY,
+        "resume_ms": (time.perf_counter() - start) * 1000,
+    }
+
+
+async def run_legacy_barge_in(port: int) -> dict:
+    import websockets
+
+    url = f"ws://127.0.0.1:{port}/ws/audio?session=bench-protocol"
+    types, dones = [], 0
+    async with websockets.connect(url) as ws:
+        await ws.send(json.dumps({"type": "mode", "payload": "text", "stream": True}))
+        await ws.send(json.dumps({"type": "text", "payload": "tell me a long story"}))
+        while json.loads(await asyncio.wait_for(ws.recv(), 30)).get("type") != "delta":
+            pass
+        await ws.send(json.dumps({"type": "text", "payload": "actually, never mind"}))
+        while not dones:
+            frame = await asyncio.wait_for(ws.recv(), 30)
+            kind = json.loads(frame).get("type") if frame.startswith("{") else "text"
+            types.append(kind)
+            dones += kind == "done"
+        with contextlib.suppress(asyncio.TimeoutError):
+            while True:  # anything trailing the reply, e.g. a late control frame
+                frame = await asyncio.wait_for(ws.recv(), 0.5)
+                types.append(json.loads(frame).get("type") if frame.startswith("{") else "text")
+    return {"cancelled_frames": types.count("cancelled"), "replies": types.count("done")}
+
+
+async def run_serialized(port: int) -> dict:
+    import websockets
+
+    url = f"ws://127.0.0.1:{port}/ws/audio?session=bench-protocol"
+    order, pong_ms = [], None
+    async with websockets.connect(url) as ws:
+        await hello(ws)
+        for turn in ("s1", "s2"):
+            await ws.send(json.dumps({"type": "text", "turn": turn, "payload": "hi", "interrupt": True}))
+        sent = time.perf_counter()
+        await ws.send(json.dumps({"type": "ping", "ack": 0}))
+        while len(order) < 4:
+            frame = json.loads(await asyncio.wait_for(ws.recv(), 30))
+            if frame["type"] == "pong" and pong_ms is None:
+                pong_ms = (time.perf_counter() - sent) * 1000
+            elif frame["type"] in ("delta", "turn_end") and (frame["turn"], frame["type"]) not in order:
+                order.append((frame["turn"], frame["type"]))
+    serialized = order == [("s1", "delta"), ("s1", "turn_end"), ("s2", "delta"), ("s2", "turn_end")]
+    return {"pong_ms": pong_ms, "serialized": serialized}
+
+
+def main(args) -> int:
+    parsed = argparse.Namespace(reply_cache=False, asr_workers=1, asr_overhead=0.05, asr_rtf=0.1, tts_delay=0.1)
+    with GroqStub(delay=args.llm_delay, reply=STUB_REPLY) as groq, SMTPSink() as smtp, \
+            CalendarStub() as calendar, tempfile.TemporaryDirectory() as tmp:
+        configure_environment(parsed, groq, smtp, calendar, Path(tmp))
+        app, _ = build_app(parsed, Path(tmp))
+        port = free_port()
+        quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+        with quiet, ServerThread(app, port):
+            asyncio.run(wait_ready(port))
+            handshakes = asyncio.run(run_handshakes(port, args.turns))
+            multiplexing = asyncio.run(run_multiplexing(port, args.concurrent))
+            resume = asyncio.run(run_resume(port, args.llm_delay / 2))
+            legacy_barge_in = asyncio.run(run_legacy_barge_in(port))
+            from backend import ws_routes
+            ws_routes.BARGE_IN = "off"
+            serialized = asyncio.run(run_serialized(port))
+
+    print(f"Sequential text turns ({args.turns} each):")
+    for label, key in (("new socket per message (legacy)", "per_message"), ("one persistent v1 session", "persistent")):
+        values = handshakes[key]
+        print(f"  {label:<34} p50 {percentile(values, 50) * 1000:6.0f} ms  p95 {percentile(values, 95) * 1000:6.0f} ms")
+    print(f"\n{args.concurrent} turns on one connection:")
+    print(f"  legacy, one after another          {multiplexing['sequential'] * 1000:6.0f} ms")
+    print(f"  v1, multiplexed                    {multiplexing['multiplexed'] * 1000:6.0f} ms")
+    print(f"\nResume after a drop mid-reply: resumed={resume['resumed']}, {resume['deltas_before_drop']} deltas "
+          f"before the drop, {resume['replayed']} frames replayed in {resume['resume_ms']:.0f} ms, "
+          f"reply {'complete' if resume['complete'] else 'INCOMPLETE'}")
+    print(f"Legacy barge-in: {legacy_barge_in['replies']} reply, "
+          f"{legacy_barge_in['cancelled_frames']} cancelled frames sent to the old client")
+    print(f"BARGE_IN=off: turns {'ran in order' if serialized['serialized'] else 'OVERLAPPED'}, "
+          f"ping answered after {serialized['pong_ms'] or 0:.0f} ms")
+
+    failures = []
+    if percentile(handshakes["persistent"], 50) > percentile(handshakes["per_message"], 50) * 1.1:
+        failures.append("a persistent session was slower than a socket per message")
+    if multiplexing["multiplexed"] > multiplexing["sequential"] / 2:
+        failures.append("multiplexed turns did not overlap")
+    if not resume["dropped_mid_reply"]:
+        failures.append("the reply finished before the connection was dropped (raise --llm-delay)")
+    elif not (resume["resumed"] and resume["complete"]):
+        failures.append("the in-flight reply was not recovered after resuming")
+    if legacy_barge_in["cancelled_frames"]:
+        failures.append("a legacy client was sent a v1 cancelled frame")
+    if legacy_barge_in["replies"] != 1:
+        failures.append("the interrupted legacy turn still finished its reply")
+    if not serialized["serialized"]:
+        failures.append("BARGE_IN=off turns were not serialized")
+    if serialized["pong_ms"] is None or serialized["pong_ms"] > args.llm_delay * 1000 / 2:
+        failures.append("a ping waited behind a serialized turn")
+    for failure in failures:
+        print("❌ FAIL:", failure)
+    if not failures:
+        print("✅ PASS")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Persistent, multiplexed and resumable /ws/audio sessions")
+    parser.add_argument("--turns", type=int, default=10, help="sequential turns in the handshake comparison")
+    parser.add_argument("--concurrent", type=int, default=6, help="turns sent at once in the multiplexing run")
+    parser.add_argument("--llm-delay", type=float, default=0.4, help="stub LLM generation time (s)")
+    parser.add_argument("--verbose", action="store_true", help="show the server's own log output")
+    sys.exit(main(parser.parse_args()))
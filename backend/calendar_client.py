@@ -0,0 +1,159 @@
+import os
+import asyncio
+import datetime
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from google.oauth2.credentials import Credentials
+from google_auth_oauthlib.flow import InstalledAppFlow
+from google.auth.transport.requests import Request
+from googleapiclient.discovery import build
+from googleapiclient.http import BatchHttpRequest
+
+# === Google Calendar settings ===
+SCOPES = ['https://www.googleapis.com/auth/calendar.events']
+TOKEN_PATH = Path(__file__).resolve().parent / "token.json"
+CREDENTIALS_PATH = Path(__file__).resolve().parent / "credentials.json"
+# Root URL of the Calendar REST API; point it at a local stand-in for tests/benchmarks
+CALENDAR_API_ROOT = os.getenv("CALENDAR_API_ROOT", "https://www.googleapis.com/")
+CALENDAR_TOKEN_URI = os.getenv("CALENDAR_TOKEN_URI")  # OAuth token endpoint override, same purpose
+CALENDAR_REFRESH_MARGIN_SECONDS = int(os.getenv("CALENDAR_REFRESH_MARGIN_SECONDS", "300"))
+CALENDAR_BATCH_WINDOW_MS = float(os.getenv("CALENDAR_BATCH_WINDOW_MS", "50"))
+CALENDAR_BATCH_MAX = 50  # Calendar API limit per batch request
+
+
+# === Long-lived Calendar client ===
+# Credentials are read from token.json once (and again only if the file changes), refreshed
+# shortly *before* they expire, and the discovery-built service object is reused until the
+# credentials are reloaded or refreshed (token.json rewritten), then built again. All Google
+# API calls run on one dedicated thread -- httplib2 isn't thread-safe -- and concurrent inserts
+# arriving within a short window are sent as a single HTTP batch request.
+class CalendarClient:
+    def __init__(self, token_path: Path = TOKEN_PATH, credentials_path: Path = CREDENTIALS_PATH,
+                 api_root: str = CALENDAR_API_ROOT, token_uri: str = CALENDAR_TOKEN_URI):
+        self.token_path = Path(token_path)
+        self.credentials_path = Path(credentials_path)
+        self.api_root = api_root if api_root.endswith("/") else api_root + "/"
+        self.token_uri = token_uri
+
+        self._creds = None
+        self._token_mtime = None
+        self._service = None
+        self._service_key = None  # (credentials object, token.json mtime) the service was built for
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="calendar")
+        self._pending = []  # (calendar_id, event, future) waiting for the next batch
+        self._flush_task = None
+
+    # --- Credentials (calendar thread) ---
+    def _load_credentials(self) -> Credentials:
+        mtime = self.token_path.stat().st_mtime if self.token_path.exists() else None
+        if self._creds is not None and mtime == self._token_mtime:
+            return self._creds
+
+        if mtime is not None:
+            creds = Credentials.from_authorized_user_file(str(self.token_path), SCOPES)
+        else:
+            # First run: launch the OAuth consent flow and save the token for next time
+            flow = InstalledAppFlow.from_client_secrets_file(str(self.credentials_path), SCOPES)
+            creds = flow.run_local_server(port=0)
+            self._save_token(creds)
+        if self.token_uri:
+            expiry = creds.expiry
+            creds = creds.with_token_uri(self.token_uri)
+            creds.expiry = expiry  # with_token_uri() drops it, which would force a refresh per reload
+
+        self._creds = creds
+        self._token_mtime = self.token_path.stat().st_mtime if self.token_path.exists() else None
+        return creds
+
+    def _save_token(self, creds: Credentials):
+        with open(self.token_path, 'w') as token_file:
+            token_file.write(creds.to_json())
+        self._token_mtime = self.token_path.stat().st_mtime
+
+    def _ensure_fresh(self, creds: Credentials):
+        # Refresh proactively so a request never goes out with a token about to expire
+        if not creds.refresh_token:
+            return
+        expiry = creds.expiry  # naive UTC, or None if unknown
+        margin = datetime.timedelta(seconds=CALENDAR_REFRESH_MARGIN_SECONDS)
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        if creds.token is None or expiry is None or expiry - margin <= now:
+            print("[📅 Calendar] Refreshing access token")
+            creds.refresh(Request())
+            self._save_token(creds)
+
+    def get_service(self):
+        creds = self._load_credentials()
+        self._ensure_fresh(creds)
+
+        # Keyed on the token file as well: re-auth or a refresh rewrites it, and the old service
+        # object would keep using the credentials it was built with
+        key = (creds, self._token_mtime)
+        if self._service is None or self._service_key != key:
+            # static_discovery: use the discovery document bundled with the library, no fetch
+            self._service = build(
+                'calendar', 'v3',
+                credentials=creds,
+                static_discovery=True,
+                cache_discovery=False,
+                client_options={"api_endpoint": self.api_root + "calendar/v3/"},
+            )
+            self._service_key = key
+        return self._service
+
+    # --- Inserts (calendar thread) ---
+    def insert_events(self, items: list) -> list:
+        # items: [(calendar_id, event)] -> list of created events or Exceptions, same order
+        service = self.get_service()
+        if len(items) == 1:
+            calendar_id, event = items[0]
+            try:
+                return [service.events().insert(calendarId=calendar_id, body=event).execute()]
+            except Exception as e:
+                return [e]
+
+        results = [None] * len(items)
+
+        def on_response(request_id, response, exception):
+            results[int(request_id)] = exception if exception is not None else response
+
+        batch = BatchHttpRequest(callback=on_response, batch_uri=self.api_root + "batch/calendar/v3")
+        for i, (calendar_id, event) in enumerate(items):
+            batch.add(service.events().insert(calendarId=calendar_id, body=event), request_id=str(i))
+        batch.execute()
+        return results
+
+    # --- Async API ---
+    async def insert_event(self, calendar_id: str, event: dict) -> dict:
+        # Queues the insert; everything queued within CALENDAR_BATCH_WINDOW_MS goes out together
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((calendar_id, event, future))
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_after_window())
+        return await future
+
+    async def _flush_after_window(self):
+        loop = asyncio.get_running_loop()
+        await asyncio.sleep(CALENDAR_BATCH_WINDOW_MS / 1000)
+        while self._pending:
+            batch, self._pending = self._pending[:CALENDAR_BATCH_MAX], self._pending[CALENDAR_BATCH_MAX:]
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, self.insert_events, [(c, e) for c, e, _ in batch]
+                )
+            except Exception as e:
+                results = [e] * len(batch)
+            if len(batch) > 1:
+                print(f"[📅 Calendar] Inserted {len(batch)} events in one batch request")
+            for (_, _, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+# Shared client used by schedule_event
+calendar_client = CalendarClient()
@@ -0,0 +1,228 @@
+import os
+import time
+import uuid
+import random
+import asyncio
+import smtplib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# === SMTP / outbox settings ===
+# Point SMTP_HOST/SMTP_PORT at a local sink (see backend/benchmarks/stubs.py) for tests; use
+# SMTP_SECURITY=none and SMTP_AUTH=0 for a plain-text sink that doesn't take a login.
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+SMTP_SECURITY = os.getenv("SMTP_SECURITY", "ssl" if SMTP_PORT == 465 else "starttls")  # ssl | starttls | none
+SMTP_AUTH = os.getenv("SMTP_AUTH", "1") == "1"
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "20"))
+# Servers drop idle sessions (Gmail after a few minutes); close ours first and reconnect on demand
+SMTP_IDLE_TIMEOUT_SECONDS = float(os.getenv("SMTP_IDLE_TIMEOUT_SECONDS", "60"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+OUTBOX_RETRY_BASE_SECONDS = float(os.getenv("OUTBOX_RETRY_BASE_SECONDS", "2"))
+OUTBOX_RETRY_MAX_SECONDS = float(os.getenv("OUTBOX_RETRY_MAX_SECONDS", "60"))
+OUTBOX_STATUS_HISTORY = 500  # delivery records kept for status lookups
+
+
+def is_permanent_failure(error: Exception) -> bool:
+    # 5xx replies (bad recipient, rejected sender, auth failure) won't succeed on retry
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500
+    return False
+
+
+# === Background email outbox ===
+# enqueue() records the message and returns its id immediately; one sender task delivers queued
+# messages in order over a single authenticated SMTP connection that is reused across messages,
+# closed after SMTP_IDLE_TIMEOUT_SECONDS of inactivity and re-opened when needed. Transient
+# failures are retried with exponential backoff; every message's delivery status can be looked up.
+# If the sender task stops, the next enqueue() restarts it on the same queue, so nothing already
+# queued is lost; a message it was in the middle of sending is marked failed and logged.
+class EmailOutbox:
+    def __init__(self, host: str = SMTP_HOST, port: int = SMTP_PORT, security: str = SMTP_SECURITY,
+                 username: str = None, password: str = None, use_auth: bool = SMTP_AUTH,
+                 idle_timeout: float = SMTP_IDLE_TIMEOUT_SECONDS, max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+                 retry_base: float = OUTBOX_RETRY_BASE_SECONDS, retry_max: float = OUTBOX_RETRY_MAX_SECONDS):
+        self.host = host
+        self.port = port
+        self.security = security
+        self.username = username
+        self.password = password
+        self.use_auth = use_auth
+        self.idle_timeout = idle_timeout
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+
+        self._smtp = None
+        self._last_used = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="smtp")
+        self._queue = None
+        self._task = None
+        self._status = OrderedDict()  # message id -> delivery record
+
+        # Reporting counters
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.connections = 0
+
+    # --- SMTP connection (smtp thread) ---
+    def _connect(self):
+        if self.security == "ssl":
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=SMTP_TIMEOUT_SECONDS)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT_SECONDS)
+        smtp.ehlo()
+        if self.security == "starttls":
+            smtp.starttls()
+            smtp.ehlo()
+        if self.use_auth and self.username and self.password:
+            smtp.login(self.username, self.password)
+        self.connections += 1
+        return smtp
+
+    def _close(self):
+        smtp, self._smtp = self._smtp, None
+        if smtp is not None:
+            try:
+                smtp.quit()
+            except Exception:
+                smtp.close()
+
+    def _deliver(self, message):
+        # Reuse the open connection unless it has sat idle long enough to have been dropped
+        if self._smtp is not None and time.monotonic() - self._last_used > self.idle_timeout:
+            self._close()
+        if self._smtp is None:
+            self._smtp = self._connect()
+        try:
+            self._smtp.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # The server closed the session under us: one immediate retry on a fresh connection,
+            # anything after that goes through the outbox's backoff
+            self._smtp = None
+            self._smtp = self._connect()
+            self._smtp.send_message(message)
+        self._last_used = time.monotonic()
+
+    # --- Async API ---
+    def _ensure_started(self):
+        if self._task is not None and not self._task.done():
+            return
+        if self._task is not None:
+            if not self._task.cancelled() and self._task.exception() is not None:
+                print("[📨 Outbox] Sender task died, restarting it:", repr(self._task.exception()))
+            if self._queue is not None and not self._queue.empty():
+                print(f"[📨 Outbox] Restarting the sender with {self._queue.qsize()} email(s) still queued")
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        elif self._task is not None and self._task.get_loop() is not asyncio.get_running_loop():
+            # A queue is tied to the loop it first waited on; carry the emails over to a fresh one
+            old, self._queue = self._queue, asyncio.Queue()
+            while not old.empty():
+                self._queue.put_nowait(old.get_nowait())
+        self._task = asyncio.create_task(self._sender())
+
+    def enqueue(self, message) -> str:
+        # Queues an EmailMessage for delivery and returns its id without waiting on SMTP
+        self._ensure_started()
+        message_id = uuid.uuid4().hex[:12]
+        self._status[message_id] = {
+            "id": message_id, "to": message["To"], "subject": message["Subject"],
+            "status": "queued", "attempts": 0, "error": None,
+            "queued_at": time.time(), "sent_at": None,
+        }
+        while len(self._status) > OUTBOX_STATUS_HISTORY:
+            self._status.popitem(last=False)
+        self._queue.put_nowait((message_id, message))
+        return message_id
+
+    def status(self, message_id: str):
+        record = self._status.get(message_id)
+        return dict(record) if record is not None else None
+
+    async def _sender(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                message_id, message = await asyncio.wait_for(self._queue.get(), self.idle_timeout)
+            except asyncio.TimeoutError:
+                # Nothing to send for a while: log out instead of letting the server drop us
+                if self._smtp is not None:
+                    await loop.run_in_executor(self._executor, self._close)
+                continue
+
+            record = self._status.get(message_id, {})
+            try:
+                await self._send_with_retry(message, record)
+            except asyncio.CancelledError:
+                # Stopped mid-send: the email may or may not have gone out, but it won't be retried
+                record["status"] = "failed"
+                record["error"] = "outbox stopped while sending; delivery unknown"
+                self.failed += 1
+                print(f"[📨 Outbox] Email to {record.get('to')} ({message_id}) dropped: the sender stopped mid-send")
+                raise
+            except Exception as e:
+                # Never let one message take the sender (and everything queued behind it) down
+                record["status"] = "failed"
+                record["error"] = str(e)
+                self.failed += 1
+                print(f"[📨 Outbox] Unexpected error sending email to {record.get('to')}:", e)
+            finally:
+                self._queue.task_done()
+
+    async def _send_with_retry(self, message, record: dict):
+        loop = asyncio.get_running_loop()
+        for attempt in range(1, self.max_attempts + 1):
+            record["status"] = "sending"
+            record["attempts"] = attempt
+            try:
+                await loop.run_in_executor(self._executor, self._deliver, message)
+            except Exception as e:
+                await loop.run_in_executor(self._executor, self._close)
+                record["error"] = str(e)
+                if is_permanent_failure(e) or attempt == self.max_attempts:
+                    record["status"] = "failed"
+                    self.failed += 1
+                    print(f"[📨 Outbox] Giving up on email to {record.get('to')} after {attempt} attempt(s):", e)
+                    return
+                delay = min(self.retry_max, self.retry_base * 2 ** (attempt - 1)) * random.uniform(0.8, 1.2)
+                record["status"] = "retrying"
+                self.retries += 1
+                print(f"[📨 Outbox] Email to {record.get('to')} failed ({e}); retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+
+            record["status"] = "sent"
+            record["error"] = None
+            record["sent_at"] = time.time()
+            self.sent += 1
+            print(f"[📨 Outbox] Email sent to {record.get('to')} (attempt {attempt})")
+            return
+
+    async def drain(self, timeout: float = 10.0):
+        # Waits (bounded) for queued messages to go out, e.g. before shutdown
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                print(f"[📨 Outbox] {self._queue.qsize()} email(s) still queued at shutdown")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._close)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "connections_opened": self.connections,
+            "connected": self._smtp is not None,
+        }
@@ -0,0 +1,133 @@
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# === Embedding service settings ===
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "4096"))
+EMBED_MODEL = "all-MiniLM-L6-v2"  # Lightweight and fast sentence encoder
+
+
+def load_sentence_encoder(model_name: str = EMBED_MODEL):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+# === Micro-batched, cached embedding service ===
+# Every connection's encode() calls land in one queue; a single batcher task drains it into
+# small time-boxed batches and runs model.encode() on a worker thread, so the event loop never
+# blocks and the model sees batches instead of one sentence at a time. Recent text -> vector
+# results are kept in an LRU, and identical texts requested at the same time share one slot.
+class EmbeddingService:
+    def __init__(self, model=None, batch_size: int = EMBED_BATCH_SIZE, batch_window_ms: float = EMBED_BATCH_WINDOW_MS,
+                 cache_size: int = EMBED_CACHE_SIZE, load_model=None):
+        self.model = model
+        self.load_model = load_model  # async () -> model, used on first batch when no model was given
+        self.batch_size = max(1, batch_size)
+        self.batch_window = batch_window_ms / 1000
+        self.cache_size = cache_size
+
+        self._cache = OrderedDict()
+        self._inflight = {}  # text -> future, for identical concurrent requests
+        self._queue = None
+        self._task = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedder")
+        self._last_batch_size = 0
+
+        # Reporting counters
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.batches = 0
+        self.encoded = 0
+        self.encode_time = 0.0
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._batcher())
+
+    async def encode(self, text: str):
+        cached = self._cache.get(text)
+        if cached is not None:
+            self._cache.move_to_end(text)
+            self.cache_hits += 1
+            return cached
+        self.cache_misses += 1
+
+        future = self._inflight.get(text)
+        if future is None:
+            self._ensure_started()
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[text] = future
+            self._queue.put_nowait(text)
+        return await asyncio.shield(future)
+
+    async def encode_many(self, texts: list) -> list:
+        return await asyncio.gather(*(self.encode(t) for t in texts))
+
+    async def _batcher(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+
+            # Give requests from other connections a short window to join this batch, but only
+            # when there is evidence of concurrency; a lone session shouldn't pay for the wait
+            window = self.batch_window if (self._last_batch_size > 1 or not self._queue.empty()) else 0
+            deadline = loop.time() + window
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0 and self._queue.empty():
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), max(remaining, 0)))
+                except asyncio.TimeoutError:
+                    break
+
+            started = time.perf_counter()
+            try:
+                if self.model is None:
+                    self.model = await self.load_model()
+                vectors = await loop.run_in_executor(self._executor, self.model.encode, batch)
+            except Exception as e:
+                for text in batch:
+                    future = self._inflight.pop(text, None)
+                    if future is not None and not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.encode_time += time.perf_counter() - started
+            self.batches += 1
+            self.encoded += len(batch)
+            self._last_batch_size = len(batch)
+            for text, vector in zip(batch, vectors):
+                self._remember(text, vector)
+                future = self._inflight.pop(text, None)
+                if future is not None and not future.done():
+                    future.set_result(vector)
+
+    def _remember(self, text: str, vector):
+        self._cache[text] = vector
+        self._cache.move_to_end(text)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> dict:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "hit_rate": self.cache_hits / lookups if lookups else 0.0,
+            "cache_entries": len(self._cache),
+            "batches": self.batches,
+            "avg_batch_size": self.encoded / self.batches if self.batches else 0.0,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+        }
@@ -0,0 +1,43 @@
+import json
+import struct
+import asyncio
+
+import numpy as np
+
+# === Length-prefixed binary frames ===
+# Frame: [header length][payload length] (network order uint32) + JSON header + binary payload.
+# Shared by the model host's socket RPC (read from a stream) and the /ws/audio session protocol
+# (one frame per WebSocket binary message).
+_LENGTHS = struct.Struct("!II")
+
+
+def encode_frame(header: dict, payload: bytes = b"") -> bytes:
+    raw = json.dumps(header, default=_jsonable).encode("utf-8")
+    return _LENGTHS.pack(len(raw), len(payload)) + raw + payload
+
+
+async def read_frame(reader: asyncio.StreamReader):
+    header_len, payload_len = _LENGTHS.unpack(await reader.readexactly(_LENGTHS.size))
+    header = json.loads(await reader.readexactly(header_len))
+    payload = await reader.readexactly(payload_len) if payload_len else b""
+    return header, payload
+
+
+def decode_frame(data: bytes):
+    # The same frame from a message-based transport (e.g. one WebSocket binary message)
+    if len(data) < _LENGTHS.size:
+        raise ValueError("frame shorter than its length prefix")
+    header_len, payload_len = _LENGTHS.unpack_from(data)
+    if len(data) != _LENGTHS.size + header_len + payload_len:
+        raise ValueError("frame length does not match its length prefix")
+    header = json.loads(data[_LENGTHS.size:_LENGTHS.size + header_len])
+    return header, data[_LENGTHS.size + header_len:]
+
+
+def _jsonable(value):
+    # Whisper results carry numpy scalars/arrays here and there
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
@@ -0,0 +1,121 @@
+import os
+import json
+import time
+
+import httpx
+
+from backend.admission import StageLimiter
+from backend.metrics import span, observe_stage, stage_errors
+from dotenv import load_dotenv
+from pathlib import Path
+
+# Same .env as phiagent2_groq.py, loaded here too since this module reads its settings at import
+load_dotenv(dotenv_path=Path(__file__).resolve().parent / ".env", override=True)
+
+# === Groq (OpenAI-compatible) connection settings ===
+# The base URL is configurable so the agent can be pointed at a local stub for load testing.
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_QUEUE_SIZE = int(os.getenv("LLM_QUEUE_SIZE", "64"))  # completions allowed to wait for a slot
+
+
+# === Shared async HTTP client for chat completions ===
+# One pooled httpx.AsyncClient is reused by every request so TLS/TCP connections stay
+# alive between turns, and the "llm" stage limiter caps how many completions are in flight at
+# once (beyond its queue, requests fail fast with Overloaded).
+class LLMClient:
+    def __init__(self, base_url: str = GROQ_BASE_URL, timeout: float = LLM_TIMEOUT_SECONDS,
+                 max_connections: int = LLM_MAX_CONNECTIONS, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 queue_size: int = LLM_QUEUE_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = httpx.Timeout(timeout, connect=LLM_CONNECT_TIMEOUT_SECONDS)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=60,
+        )
+        self.limiter = StageLimiter("llm", max_concurrency, queue_size)
+        self._client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created lazily so it binds to the running event loop (uvicorn's, or a test's)
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    async def chat_completion(self, payload: dict, api_key: str, timeout: float = None) -> httpx.Response:
+        client = self._get_client()
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        with span("llm_queue"):
+            await self.limiter.acquire()
+        try:
+            with span("llm"):
+                response = await client.post(
+                    "/chat/completions",
+                    headers=headers,
+                    json=payload,
+                    timeout=timeout if timeout is not None else self.timeout,
+                )
+        finally:
+            self.limiter.release()
+        if response.status_code != 200:
+            stage_errors.inc(stage="llm")
+        return response
+
+    async def stream_chat_completion(self, payload: dict, api_key: str, timeout: float = None):
+        # Yields each parsed chunk of a `stream: true` completion (OpenAI-style SSE)
+        client = self._get_client()
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            "Accept": "text/event-stream"
+        }
+        with span("llm_queue"):
+            await self.limiter.acquire()
+        started = time.perf_counter()
+        first_chunk = True
+        try:
+            with span("llm"):
+                async with client.stream(
+                    "POST",
+                    "/chat/completions",
+                    headers=headers,
+                    json={**payload, "stream": True},
+                    timeout=timeout if timeout is not None else self.timeout,
+                ) as response:
+                    if response.status_code != 200:
+                        body = await response.aread()
+                        print(f"[Groq API Error {response.status_code}]:", body[:500])
+                        stage_errors.inc(stage="llm")
+                        return
+
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue  # blank separators, comments and keep-alives
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            return
+                        if first_chunk:
+                            first_chunk = False
+                            observe_stage("llm_first_token", time.perf_counter() - started, started=started)
+                        try:
+                            yield json.loads(data)
+                        except json.JSONDecodeError:
+                            print("[Groq Stream Parse Error]:", data[:200])
+        finally:
+            self.limiter.release()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Module-level client shared by run_agent and the FastAPI lifecycle hooks
+llm_client = LLMClient()
@@ -1,13 +1,54 @@
+import os
+import json
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 
-# Import the core LLM agent function and WebSocket route handler
-from backend.phiagent2_groq import run_agent
-from backend.ws_routes import router as websocket_router
+# Import the core LLM agent function and the lazy model registry
+from backend.phiagent2_groq import run_agent_cached, run_agent_stream_cached, email_outbox
+from backend.reply_cache import reply_cache
+from backend.metrics import metrics, Trace
+from backend.admission import Overloaded, admission_stats
+from backend.llm_client import llm_client
+from backend.models import registry, WARMUP_MODELS
+
+# Set ENABLE_VOICE=0 for POST /chat-only deployments: the WebSocket route, and with it the
+# ASR / embedding / memory / TTS stack, is then never imported or loaded.
+ENABLE_VOICE = os.getenv("ENABLE_VOICE", "1") == "1"
+STARTED_AT = time.time()
+
+# === App Lifecycle ===
+# Heavy models load in a background task so the server accepts connections immediately;
+# shared clients live for the whole process and are closed cleanly on shutdown.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    background = []
+    if ENABLE_VOICE:
+        from backend.tts import prewarm_tts_cache
+        from backend.streaming_asr import prewarm_resampler
+        background.append(asyncio.create_task(registry.warmup(WARMUP_MODELS)))
+        background.append(asyncio.create_task(prewarm_resampler()))
+        # Fill the TTS cache with common phrases in the background; startup doesn't wait on it
+        background.append(asyncio.create_task(prewarm_tts_cache()))
+    yield
+    for task in background:
+        task.cancel()
+    # Give queued emails a moment to go out before the process exits
+    await email_outbox.drain()
+    await email_outbox.stop()
+    await llm_client.aclose()
+    if ENABLE_VOICE:
+        from backend.ws_routes import model_host
+        if model_host is not None:
+            await model_host.aclose()
 
 # === FastAPI App Initialization ===
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # === CORS Middleware ===
 # This allows your frontend (even if it's on a different domain/port) to talk to your backend without getting blocked.
@@ -24,14 +65,118 @@ app.add_middleware(
 # Used to validate incoming POST body data
 class PromptInput(BaseModel):
     prompt: str  # Single string prompt from user
+    stream: bool = False  # Stream the reply back as server-sent events
 
 # === REST Endpoint: POST /chat ===
 # This is a simple HTTP endpoint to get an LLM response (text in, text out).
+# With "stream": true the reply comes back as SSE: `data: {"delta": ...}` events, then `data: [DONE]`.
+# When the LLM stage is saturated the request is turned away at once: 503 + Retry-After, or a
+# `data: {"error": "busy"}` event for a stream that has already started.
 @app.post("/chat")
 async def chat_response(payload: PromptInput):
-    reply = await run_agent(payload.prompt)  # delegate to Groq LLM logic
+    if payload.stream:
+        async def event_stream():
+            try:
+                with Trace("chat_stream"):
+                    async for delta in run_agent_stream_cached(payload.prompt):
+                        yield f"data: {json.dumps({'delta': delta})}\n\n"
+            except Overloaded as e:
+                yield f"data: {json.dumps({'error': 'busy', 'stage': e.stage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+    try:
+        with Trace("chat"):
+            reply = await run_agent_cached(payload.prompt)  # delegate to Groq LLM logic (behind the reply cache)
+    except Overloaded as e:
+        return JSONResponse({"error": "busy", "stage": e.stage, "detail": str(e)}, status_code=503,
+                            headers={"Retry-After": "1"})
     return {"response": reply}  # send back a JSON with the response
 
+# === Health Endpoints ===
+# /healthz: the process is up. /readyz: the models listed in WARMUP_MODELS are loaded (503 until
+# then) and no model's last load attempt failed, with per-model load/warmup timings either way.
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok", "uptime_seconds": round(time.time() - STARTED_AT, 1)}
+
+@app.get("/readyz")
+async def readyz():
+    required = WARMUP_MODELS if ENABLE_VOICE else []
+    failed = registry.failed()
+    ready = registry.ready(required) and not failed
+    body = {"ready": ready, "voice_enabled": ENABLE_VOICE, "required": required, "failed": failed,
+            "models": registry.status()}
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+# === Runtime Stats ===
+# Reply cache hit rate / latency saved (to tune REPLY_CACHE_SIMILARITY), per-stage admission
+# (slots in use, queued, rejected), plus the voice stack's queues and caches when it is loaded.
+@app.get("/stats")
+async def stats():
+    body = {"reply_cache": reply_cache.stats(), "email_outbox": email_outbox.stats(), "admission": admission_stats()}
+    if ENABLE_VOICE:
+        from backend.ws_routes import whisper_model, embedding_service, memory_store, model_host
+        from backend.tts import tts_cache
+        from backend.audio_ingest import audio_ingest
+        from backend.ws_protocol import protocol_stats
+        body.update({
+            "ws_sessions": protocol_stats(),
+            "audio_ingest": audio_ingest.stats(),
+            "asr": whisper_model.stats(),
+            "embeddings": embedding_service.stats(),
+            "memory": memory_store.stats(),
+            "tts_cache": tts_cache.stats(),
+        })
+        if model_host is not None:
+            body["model_host"] = model_host.stats()
+    return body
+
+# === Prometheus Metrics ===
+# Per-stage latency histograms (ASR, embedding, Chroma, LLM, tools, TTS, socket send), error and
+# turn counters, plus queue depths and cache hit counts read from each component at scrape time.
+def collect_app_metrics() -> list:
+    cache = reply_cache.stats()
+    outbox = email_outbox.stats()
+    return [
+        ("cache_lookups_total", "counter", "Cache lookups by cache and result", {
+            (("cache", "reply"), ("result", "exact_hit")): cache["exact_hits"],
+            (("cache", "reply"), ("result", "semantic_hit")): cache["semantic_hits"],
+            (("cache", "reply"), ("result", "miss")): cache["misses"],
+        }),
+        ("reply_cache_latency_saved_seconds_total", "counter", "LLM time avoided by reply cache hits",
+         {(): cache["latency_saved_seconds"]}),
+        ("email_queue_depth", "gauge", "Emails waiting in the outbox", {(): outbox["queued"]}),
+        ("emails_total", "counter", "Emails by delivery outcome", {
+            (("outcome", "sent"),): outbox["sent"],
+            (("outcome", "failed"),): outbox["failed"],
+            (("outcome", "retried"),): outbox["retries"],
+        }),
+    ]
+
+
+metrics.register_collector(collect_app_metrics)
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# === Email Delivery Status ===
+# send_email only queues the message; these report what the background outbox did with it.
+@app.get("/email/{message_id}")
+async def email_status(message_id: str):
+    record = email_outbox.status(message_id)
+    if record is None:
+        return JSONResponse({"error": "unknown message id"}, status_code=404)
+    return record
+
+@app.get("/email")
+async def email_outbox_stats():
+    return email_outbox.stats()
+
 # === WebSocket Endpoint for Audio/Text Stream ===
 # This pulls in your live bi-directional route from ws_routes.py
-app.include_router(websocket_router)
+if ENABLE_VOICE:
+    from backend.ws_routes import router as websocket_router
+    app.include_router(websocket_router)
@@ -0,0 +1,254 @@
+import os
+import math
+import time
+import asyncio
+import hashlib
+import uuid
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+# === Memory store settings ===
+MEMORY_DIR = os.getenv("MEMORY_DIR", str(Path(__file__).resolve().parent / ".memory"))
+MEMORY_MAX_TURNS = int(os.getenv("MEMORY_MAX_TURNS", "500"))  # per namespace, summaries included
+MEMORY_COMPACT_BATCH = int(os.getenv("MEMORY_COMPACT_BATCH", "25"))  # turns folded into one summary
+MEMORY_MAX_SUMMARIES = int(os.getenv("MEMORY_MAX_SUMMARIES", "50"))
+MEMORY_HALF_LIFE_HOURS = float(os.getenv("MEMORY_HALF_LIFE_HOURS", "72"))  # recency decay for eviction
+MEMORY_MAX_LOADED_NAMESPACES = int(os.getenv("MEMORY_MAX_LOADED_NAMESPACES", "256"))  # open collections kept cached
+MEMORY_SUMMARY_CHARS = 100  # per compacted turn
+
+
+def estimate_importance(user_input: str, reply_text: str) -> float:
+    # Cheap heuristic: actions taken and longer, substantive exchanges are worth keeping longer
+    importance = 1.0
+    if reply_text.startswith(("✅", "📅", "📨")):
+        importance += 2.0
+    if any(word in user_input.lower() for word in ("remember", "my name", "i am", "i'm", "always", "never")):
+        importance += 1.5
+    importance += min(1.0, len(user_input) / 400)
+    return importance
+
+
+def namespace_collection(namespace: str) -> str:
+    # Chroma collection names are restricted, so namespaces (session/user ids) are hashed
+    return "mem_" + hashlib.sha1(namespace.encode("utf-8")).hexdigest()[:24]
+
+
+# Connections without a ?session= id get a throwaway namespace: kept in memory, never on disk
+ANONYMOUS_PREFIX = "anon-"
+
+
+def anonymous_namespace() -> str:
+    return ANONYMOUS_PREFIX + uuid.uuid4().hex
+
+
+def is_anonymous(namespace: str) -> bool:
+    return namespace.startswith(ANONYMOUS_PREFIX)
+
+
+# === Persistent, per-namespace, size-bounded conversation memory ===
+# Each session/user gets its own Chroma collection on local disk, so retrieval only ever
+# searches that namespace's (bounded) history and users never see each other's context.
+# When a namespace exceeds MEMORY_MAX_TURNS, its lowest-value turns (importance decayed by age)
+# are compacted into a single summary entry; the oldest summaries are evicted past a limit.
+# Only add() creates a collection, anonymous namespaces live in an in-memory client until
+# forget(), and at most MEMORY_MAX_LOADED_NAMESPACES collections stay cached (LRU).
+class MemoryStore:
+    def __init__(self, embed, path: str = MEMORY_DIR, max_turns: int = MEMORY_MAX_TURNS,
+                 compact_batch: int = MEMORY_COMPACT_BATCH, max_summaries: int = MEMORY_MAX_SUMMARIES,
+                 load_client=None, max_loaded: int = MEMORY_MAX_LOADED_NAMESPACES):
+        self.embed = embed  # async text -> vector, used for summaries
+        self.load_client = load_client  # async () -> Chroma client; defaults to opening one at `path`
+        self.path = path
+        self.max_turns = max_turns
+        self.compact_batch = max(2, min(compact_batch, max_turns // 2))
+        self.max_summaries = max_summaries
+        self.max_loaded = max(1, max_loaded)
+
+        self._client = None
+        self._ephemeral = None
+        self._collections = OrderedDict()  # namespace -> collection, least recently used first
+        self._counts = {}
+        self._locks = {}
+        self._cache_lock = threading.Lock()  # collections are opened from worker threads
+
+    def open_client(self):
+        import chromadb
+        return chromadb.PersistentClient(path=self.path)
+
+    def _get_client(self, namespace: str):
+        if is_anonymous(namespace):
+            if self._ephemeral is None:
+                import chromadb
+                self._ephemeral = chromadb.EphemeralClient()
+            return self._ephemeral
+        if self._client is None:
+            self._client = self.open_client()
+        return self._client
+
+    async def _ready(self):
+        if self._client is None and self.load_client is not None:
+            self._client = await self.load_client()
+
+    def _collection(self, namespace: str, create: bool = True):
+        # None if the namespace has no collection yet and `create` is False
+        with self._cache_lock:
+            collection = self._collections.get(namespace)
+            if collection is not None:
+                self._collections.move_to_end(namespace)
+                return collection
+        client = self._get_client(namespace)
+        if create:
+            collection = client.get_or_create_collection(
+                namespace_collection(namespace),
+                metadata={"hnsw:space": "cosine", "namespace": namespace},
+            )
+        else:
+            try:
+                collection = client.get_collection(namespace_collection(namespace))
+            except _missing_collection_errors():
+                return None
+        count = collection.count()
+        with self._cache_lock:
+            if namespace not in self._collections:
+                self._collections[namespace] = collection
+                self._counts[namespace] = count
+            self._collections.move_to_end(namespace)
+            self._evict()
+            return self._collections[namespace]
+
+    def _evict(self):
+        # Drop the least recently used collections past the bound; the data stays in its client.
+        # A namespace whose lock is held (add/compact running) keeps its cache entries.
+        for namespace in list(self._collections):
+            if len(self._collections) <= self.max_loaded:
+                break
+            lock = self._locks.get(namespace)
+            if lock is not None and lock.locked():
+                continue
+            del self._collections[namespace]
+            self._counts.pop(namespace, None)
+            self._locks.pop(namespace, None)
+
+    def _lock(self, namespace: str) -> asyncio.Lock:
+        return self._locks.setdefault(namespace, asyncio.Lock())
+
+    async def query(self, namespace: str, embedding, n_results: int = 3) -> list:
+        def run():
+            collection = self._collection(namespace, create=False)
+            n = min(n_results, self._counts.get(namespace, 0)) if collection is not None else 0
+            if n == 0:
+                return []
+            results = collection.query(query_embeddings=[embedding], n_results=n, include=["documents"])
+            return results["documents"][0]
+
+        await self._ready()
+        return await asyncio.to_thread(run)
+
+    async def add(self, namespace: str, text: str, embedding, importance: float = 1.0):
+        metadata = {"ts": time.time(), "importance": importance, "kind": "turn"}
+
+        def run():
+            self._collection(namespace).add(
+                ids=[str(uuid.uuid4())], documents=[text], embeddings=[embedding], metadatas=[metadata]
+            )
+            self._counts[namespace] += 1
+            return self._counts[namespace]
+
+        await self._ready()
+        async with self._lock(namespace):
+            count = await asyncio.to_thread(run)
+            if count > self.max_turns:
+                await self._compact(namespace)
+
+    async def _compact(self, namespace: str):
+        collection = self._collection(namespace)
+        entries = await asyncio.to_thread(collection.get, include=["documents", "metadatas"])
+
+        now = time.time()
+        half_life = MEMORY_HALF_LIFE_HOURS * 3600
+
+        def score(i):
+            meta = entries["metadatas"][i] or {}
+            age = max(0.0, now - meta.get("ts", now))
+            return meta.get("importance", 1.0) * math.pow(0.5, age / half_life)
+
+        turns = [i for i, m in enumerate(entries["metadatas"]) if (m or {}).get("kind") != "summary"]
+        summaries = [i for i, m in enumerate(entries["metadatas"]) if (m or {}).get("kind") == "summary"]
+
+        # Fold the lowest-value turns into one summary, oldest first so it reads chronologically
+        victims = sorted(turns, key=score)[:self.compact_batch]
+        victims.sort(key=lambda i: entries["metadatas"][i].get("ts", 0))
+        delete_ids = [entries["ids"][i] for i in victims]
+
+        summary = None
+        if victims:
+            lines = [_condense(entries["documents"][i]) for i in victims]
+            first = time.strftime("%Y-%m-%d", time.localtime(entries["metadatas"][victims[0]].get("ts", now)))
+            summary = f"Summary of {len(victims)} earlier exchanges (since {first}):\n" + "\n".join(lines)
+
+        # Evict the oldest summaries once there are too many of them
+        if len(summaries) + (1 if summary else 0) > self.max_summaries:
+            summaries.sort(key=lambda i: entries["metadatas"][i].get("ts", 0))
+            excess = len(summaries) + (1 if summary else 0) - self.max_summaries
+            delete_ids += [entries["ids"][i] for i in summaries[:excess]]
+
+        summary_embedding = await self.embed(summary) if summary else None
+
+        def run():
+            if summary:
+                importance = max(entries["metadatas"][i].get("importance", 1.0) for i in victims)
+                collection.add(
+                    ids=[str(uuid.uuid4())],
+                    documents=[summary],
+                    embeddings=[summary_embedding],
+                    metadatas=[{"ts": now, "importance": importance, "kind": "summary"}],
+                )
+            if delete_ids:
+                collection.delete(ids=delete_ids)
+            self._counts[namespace] = collection.count()
+
+        await asyncio.to_thread(run)
+        print(f"[🧠 Memory] Compacted {len(victims)} turns in '{namespace}', "
+              f"{self._counts[namespace]} entries left")
+
+    async def forget(self, namespace: str):
+        # Deletes a namespace's history, e.g. an anonymous one when its connection ends
+        def run():
+            with self._cache_lock:
+                self._collections.pop(namespace, None)
+                self._counts.pop(namespace, None)
+            try:
+                self._get_client(namespace).delete_collection(namespace_collection(namespace))
+            except _missing_collection_errors():
+                pass
+
+        await self._ready()
+        async with self._lock(namespace):
+            await asyncio.to_thread(run)
+        self._locks.pop(namespace, None)
+
+    def stats(self) -> dict:
+        with self._cache_lock:
+            return {
+                "namespaces_loaded": len(self._collections),
+                "anonymous_loaded": sum(1 for namespace in self._collections if is_anonymous(namespace)),
+                "entries_loaded": sum(self._counts.values()),
+                "max_turns_per_namespace": self.max_turns,
+                "max_namespaces_loaded": self.max_loaded,
+            }
+
+
+def _missing_collection_errors() -> tuple:
+    # Chroma >= 0.6 raises NotFoundError for a missing collection, older releases ValueError
+    try:
+        from chromadb.errors import NotFoundError
+    except ImportError:
+        return (ValueError,)
+    return (ValueError, NotFoundError)
+
+
+def _condense(document: str) -> str:
+    # "User: ...\nAI: ..." -> one short line
+    line = " / ".join(part.strip() for part in document.splitlines() if part.strip())
+    return "- " + (line if len(line) <= MEMORY_SUMMARY_CHARS else line[:MEMORY_SUMMARY_CHARS - 1] + "…")
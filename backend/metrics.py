@@ -0,0 +1,238 @@
+import os
+import json
+import time
+import uuid
+import bisect
+import asyncio
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# === Metrics / tracing settings ===
+METRICS_PREFIX = "neuravoice"
+TRACE_LOG = os.getenv("TRACE_LOG", "1") == "1"  # one JSON line per finished turn
+# Latency buckets (seconds), dense around what a voice turn's stages actually take
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(pairs: tuple) -> str:
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value) -> str:
+    # Full precision, as the official client writes it: integral values as ints, others via repr
+    value = float(value)
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    if value.is_integer() and abs(value) < 2 ** 53:
+        return str(int(value))
+    return repr(value)
+
+
+# === Minimal Prometheus-style instruments ===
+# Plain dicts behind one lock per instrument: an observation is a bisect plus two additions,
+# cheap enough to leave on for every stage of every turn. Worker threads (TTS, ASR) may observe too.
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._values = {}  # label key -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            slot = self._values.get(key)
+            if slot is None:
+                slot = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            slot[index] += 1
+            slot[-1] += value
+
+    def samples(self):
+        with self._lock:
+            snapshot = {key: list(slot) for key, slot in self._values.items()}
+        out = []
+        for key, slot in snapshot.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, slot):
+                cumulative += count
+                out.append((self.name + "_bucket", key + (("le", f"{bound:g}"),), cumulative))
+            cumulative += slot[len(self.buckets)]
+            out.append((self.name + "_bucket", key + (("le", "+Inf"),), cumulative))
+            out.append((self.name + "_sum", key, slot[-1]))
+            out.append((self.name + "_count", key, cumulative))
+        return out
+
+
+# === Registry + text exposition ===
+# Instruments are created once at import. Components that already keep their own counters
+# (queues, caches) register a collector instead: a callable returning
+# [(metric name, "gauge" | "counter", help, {label tuple: value})], read at scrape time.
+class MetricsRegistry:
+    def __init__(self, prefix: str = METRICS_PREFIX):
+        self.prefix = prefix
+        self._instruments = []
+        self._collectors = []
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        instrument = Counter(f"{self.prefix}_{name}", help_text)
+        self._instruments.append(instrument)
+        return instrument
+
+    def histogram(self, name: str, help_text: str, buckets=LATENCY_BUCKETS) -> Histogram:
+        instrument = Histogram(f"{self.prefix}_{name}", help_text, buckets)
+        self._instruments.append(instrument)
+        return instrument
+
+    def register_collector(self, collect):
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        lines = []
+        for instrument in self._instruments:
+            lines.append(f"# HELP {instrument.name} {instrument.help}")
+            lines.append(f"# TYPE {instrument.name} {instrument.kind}")
+            for name, key, value in instrument.samples():
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+        # Collectors may contribute samples to the same family (e.g. cache_lookups_total)
+        families = {}
+        for collect in self._collectors:
+            try:
+                collected = collect()
+            except Exception as e:
+                print("[⚠️ Metrics] Collector failed:", e)
+                continue
+            for name, kind, help_text, values in collected:
+                families.setdefault(name, (kind, help_text, {}))[2].update(values)
+
+        for name, (kind, help_text, values) in families.items():
+            full_name = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {kind}")
+            for key, value in values.items():
+                lines.append(f"{full_name}{_format_labels(key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+stage_latency = metrics.histogram("stage_latency_seconds", "Time spent per pipeline stage")
+stage_errors = metrics.counter("stage_errors_total", "Exceptions raised per pipeline stage")
+turn_latency = metrics.histogram("turn_latency_seconds", "End-to-end turn latency by entry point")
+turns_total = metrics.counter("turns_total", "Finished turns by entry point")
+tool_calls = metrics.counter("tool_calls_total", "Tool calls by tool and outcome")
+
+
+# === Per-turn tracing ===
+# A Trace is opened for each user turn (keyed by connection id + turn number, or a request id
+# for /chat) and made current through a contextvar, so code deep in the pipeline -- the LLM
+# client, tools, TTS -- records spans without the trace being passed around. Every span also
+# feeds the stage histogram, so traces and /metrics always agree.
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+class Trace:
+    def __init__(self, path: str, connection_id: str = None, turn: int = None):
+        self.path = path
+        self.connection_id = connection_id or uuid.uuid4().hex[:8]
+        self.turn = turn
+        self.started = time.perf_counter()
+        self.spans = []  # (stage, start offset, duration, error)
+        self._token = None
+
+    @property
+    def trace_id(self) -> str:
+        return self.connection_id if self.turn is None else f"{self.connection_id}:{self.turn}"
+
+    def record(self, stage: str, duration: float, error: str = None, started: float = None):
+        offset = (started if started is not None else time.perf_counter() - duration) - self.started
+        self.spans.append((stage, offset, duration, error))
+
+    def __enter__(self):
+        self._token = _current_trace.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            _current_trace.reset(self._token)
+        except ValueError:
+            pass  # closed from another context (e.g. a streaming response torn down on disconnect)
+        if exc_type is not None and issubclass(exc_type, asyncio.CancelledError):
+            self.finish(outcome="cancelled")  # barge-in or disconnect, not a failure
+        else:
+            self.finish(error=None if exc is None else repr(exc))
+        return False
+
+    def finish(self, error: str = None, outcome: str = None):
+        total = time.perf_counter() - self.started
+        outcome = outcome or ("error" if error else "ok")
+        turn_latency.observe(total, path=self.path)
+        turns_total.inc(path=self.path, outcome=outcome)
+        if TRACE_LOG:
+            stages = {}
+            for stage, _, duration, _ in self.spans:
+                stages[stage] = round(stages.get(stage, 0.0) + duration * 1000, 1)
+            print("[🧭 Trace]", json.dumps({
+                "trace": self.trace_id, "path": self.path, "outcome": outcome, "total_ms": round(total * 1000, 1),
+                "stages_ms": stages, "errors": [s for s, _, _, e in self.spans if e] + ([error] if error else []),
+            }))
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def observe_stage(stage: str, duration: float, error: str = None, trace: Trace = None, started: float = None):
+    # For timings measured elsewhere (e.g. on a worker thread); `trace` defaults to the current one
+    stage_latency.observe(duration, stage=stage)
+    if error:
+        stage_errors.inc(stage=stage)
+    trace = trace or _current_trace.get()
+    if trace is not None:
+        trace.record(stage, duration, error, started)
+
+
+@contextmanager
+def span(stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        observe_stage(stage, time.perf_counter() - started, repr(e), started=started)
+        raise
+    # Cancellation / an abandoned generator (barge-in, disconnect) skips the except above: an
+    # interrupted stage is neither a sample nor a failure
+    observe_stage(stage, time.perf_counter() - started, started=started)
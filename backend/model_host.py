@@ -0,0 +1,418 @@
+import os
+import time
+import asyncio
+import argparse
+import itertools
+
+import numpy as np
+from dotenv import load_dotenv
+
+from backend.admission import Overloaded
+from backend.asr import TranscriptionScheduler, TranscriptionQueueFull
+from backend.embeddings import EmbeddingService, load_sentence_encoder
+from backend.framing import encode_frame, read_frame
+from backend.memory_store import MemoryStore
+from backend.models import WARMUP_MODELS
+
+# === Model host settings ===
+# With MODEL_HOST_SOCKET set, web workers don't load Whisper, the sentence encoder or Chroma
+# themselves: they send requests to one `python -m backend.model_host` process over this socket.
+MODEL_HOST_SOCKET = os.getenv("MODEL_HOST_SOCKET", "")
+MODEL_HOST_TIMEOUT_SECONDS = float(os.getenv("MODEL_HOST_TIMEOUT_SECONDS", "60"))  # per request
+MODEL_HOST_CONNECT_TIMEOUT_SECONDS = float(os.getenv("MODEL_HOST_CONNECT_TIMEOUT_SECONDS", "30"))
+MODEL_HOST_STATS_INTERVAL_SECONDS = 1.0  # how stale the host stats behind /stats and /metrics may be
+
+# Requests and replies are length-prefixed frames (backend/framing.py). Audio and vectors travel
+# as raw float32 in the payload, described by the header's "shape".
+
+
+class ModelHostError(RuntimeError):
+    pass
+
+
+def pack_array(array) -> tuple:
+    array = np.ascontiguousarray(array, dtype=np.float32)
+    return list(array.shape), array.tobytes()
+
+
+def unpack_array(shape: list, payload: bytes) -> np.ndarray:
+    return np.frombuffer(payload, dtype=np.float32).reshape(shape)
+
+
+# === In-process model services ===
+# Whisper worker pool, batched sentence encoder and Chroma memory, registered with a model
+# registry for lazy loading / startup warmup. Used by ws_routes when there is no model host,
+# and by the model host itself.
+def create_model_services(registry):
+    whisper_model = TranscriptionScheduler(load_models=lambda: registry.get("asr"))
+    registry.register("asr", lambda: whisper_model.backend.load(whisper_model.workers))
+
+    registry.register("embedder", load_sentence_encoder, warmup=lambda model: model.encode(["warmup"]))
+    # All connections share one batched, cached encoder that runs off the event loop
+    embedding_service = EmbeddingService(load_model=lambda: registry.get("embedder"))
+
+    # Persistent on local disk, one bounded namespace per session (see backend/memory_store.py)
+    memory_store = MemoryStore(embed=embedding_service.encode, load_client=lambda: registry.get("memory"))
+    registry.register("memory", memory_store.open_client)
+    return whisper_model, embedding_service, memory_store
+
+
+# === Model host server ===
+# One process owns the models and the memory store; every web worker keeps a single socket
+# connection to it. Requests on a connection are handled concurrently, so clips and texts from
+# all workers land in the same ASR scheduler and embedding batcher and get batched together.
+class ModelHost:
+    def __init__(self, registry, whisper_model, embedding_service, memory_store):
+        self.registry = registry
+        self.whisper_model = whisper_model
+        self.embedding_service = embedding_service
+        self.memory_store = memory_store
+        self.connections = 0
+        self.requests = 0
+        self._server = None
+
+    async def serve(self, path: str, warmup=None):
+        if os.path.exists(path):
+            os.remove(path)  # stale socket from a previous run
+        self._server = await asyncio.start_unix_server(self._handle_connection, path=path)
+        os.chmod(path, 0o660)
+        print(f"[🧩 Model Host] Listening on {path}")
+        if warmup:
+            asyncio.create_task(self.registry.warmup(warmup))
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        except asyncio.CancelledError:
+            pass  # stop() closed the server
+        finally:
+            await self.whisper_model.stop()
+            await self.embedding_service.stop()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.close()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        send_lock = asyncio.Lock()
+        tasks = {}  # request id -> task, so a client can cancel what it no longer needs
+        try:
+            while True:
+                try:
+                    header, payload = await read_frame(reader)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                if header.get("op") == "cancel":
+                    task = tasks.get(header.get("target"))
+                    if task is not None:
+                        task.cancel()
+                    continue
+                request_id = header.get("id")
+                task = asyncio.create_task(self._respond(header, payload, writer, send_lock))
+                tasks[request_id] = task
+                task.add_done_callback(lambda _, request_id=request_id: tasks.pop(request_id, None))
+        finally:
+            self.connections -= 1
+            for task in list(tasks.values()):
+                task.cancel()
+            writer.close()
+
+    async def _respond(self, header: dict, payload: bytes, writer: asyncio.StreamWriter, send_lock: asyncio.Lock):
+        self.requests += 1
+        reply, reply_payload = {"id": header.get("id")}, b""
+        try:
+            handler = getattr(self, f"_op_{header.get('op')}", None)
+            if handler is None:
+                raise ModelHostError(f"unknown op {header.get('op')!r}")
+            fields, reply_payload = await handler(header, payload)
+            reply.update(fields)
+        except asyncio.CancelledError:
+            return  # the client gave up on this request
+        except Overloaded as e:
+            reply.update(error=str(e), stage=e.stage)
+        except Exception as e:
+            reply.update(error=f"{type(e).__name__}: {e}")
+        async with send_lock:
+            writer.write(encode_frame(reply, reply_payload))
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+    async def _op_ping(self, header: dict, payload: bytes):
+        return {"pid": os.getpid(), "ready": self.registry.ready()}, b""
+
+    async def _op_load(self, header: dict, payload: bytes):
+        await self.registry.get(header["name"])
+        return {"status": self.registry.status()[header["name"]]}, b""
+
+    async def _op_transcribe(self, header: dict, payload: bytes):
+        audio = header["path"] if "path" in header else unpack_array(header["shape"], payload)
+        return {"result": await self.whisper_model.transcribe(audio)}, b""
+
+    async def _op_encode(self, header: dict, payload: bytes):
+        vectors = await self.embedding_service.encode_many(header["texts"])
+        shape, data = pack_array(np.stack([np.asarray(v, dtype=np.float32) for v in vectors]))
+        return {"shape": shape}, data
+
+    async def _op_memory_query(self, header: dict, payload: bytes):
+        embedding = unpack_array(header["shape"], payload)
+        return {"documents": await self.memory_store.query(header["namespace"], embedding, header["n_results"])}, b""
+
+    async def _op_memory_add(self, header: dict, payload: bytes):
+        embedding = unpack_array(header["shape"], payload)
+        await self.memory_store.add(header["namespace"], header["text"], embedding, header["importance"])
+        return {}, b""
+
+    async def _op_memory_forget(self, header: dict, payload: bytes):
+        await self.memory_store.forget(header["namespace"])
+        return {}, b""
+
+    async def _op_stats(self, header: dict, payload: bytes):
+        return {"stats": {
+            "asr": self.whisper_model.stats(),
+            "embeddings": self.embedding_service.stats(),
+            "memory": self.memory_store.stats(),
+            "models": self.registry.status(),
+            "host": {"pid": os.getpid(), "connections": self.connections, "requests": self.requests},
+        }}, b""
+
+
+# === Worker-side client ===
+# One multiplexed connection per web worker: requests carry ids, responses resolve futures by
+# id, so concurrent turns never wait on each other's round trips. `transcriber`, `embedder`
+# and `memory` mirror the in-process services' interfaces, so ws_routes uses either unchanged.
+class ModelHostClient:
+    def __init__(self, path: str = MODEL_HOST_SOCKET, timeout: float = MODEL_HOST_TIMEOUT_SECONDS,
+                 connect_timeout: float = MODEL_HOST_CONNECT_TIMEOUT_SECONDS):
+        self.path = path
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._reader = None
+        self._writer = None
+        self._read_task = None
+        self._connect_lock = None
+        self._pending = {}  # request id -> future
+        self._ids = itertools.count(1)
+
+        # Last stats snapshot from the host, refreshed in the background by stats() callers
+        self.host_stats = {}
+        self._stats_task = None
+        self._stats_at = 0.0
+
+        # Reporting counters
+        self.requests = 0
+        self.failures = 0
+        self.rpc_time = 0.0
+
+        self.transcriber = RemoteTranscriber(self)
+        self.embedder = RemoteEmbedder(self)
+        self.memory = RemoteMemoryStore(self)
+
+    async def _connect(self):
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._writer is not None:
+                return
+            # The host may still be starting (or restarting): keep trying for a while
+            deadline = time.monotonic() + self.connect_timeout
+            while True:
+                try:
+                    self._reader, self._writer = await asyncio.open_unix_connection(self.path)
+                    break
+                except (FileNotFoundError, ConnectionError) as e:
+                    if time.monotonic() > deadline:
+                        raise ModelHostError(f"model host not reachable at {self.path}: {e}")
+                    await asyncio.sleep(0.2)
+            self._read_task = asyncio.create_task(self._read_loop(self._reader))
+            print(f"[🧩 Model Host] Connected to {self.path}")
+
+    async def _read_loop(self, reader: asyncio.StreamReader):
+        error = ModelHostError("connection to the model host was lost")
+        try:
+            while True:
+                header, payload = await read_frame(reader)
+                future = self._pending.pop(header.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result((header, payload))
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            print("[⚠️ Model Host] Connection lost:", e)
+        finally:
+            # Fail whatever was in flight; the next request reconnects
+            self._writer, self._reader = None, None
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self._pending.clear()
+
+    async def call(self, op: str, payload: bytes = b"", **fields) -> tuple:
+        if self._writer is None:
+            await self._connect()
+        writer = self._writer
+        if writer is None:
+            raise ModelHostError("connection to the model host was lost")
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        started = time.perf_counter()
+        self.requests += 1
+        try:
+            writer.write(encode_frame({"id": request_id, "op": op, **fields}, payload))
+            await writer.drain()
+            header, reply_payload = await asyncio.wait_for(future, self.timeout)
+        except asyncio.CancelledError:
+            self._pending.pop(request_id, None)
+            self._cancel_remote(request_id)
+            raise
+        except asyncio.TimeoutError:
+            self._pending.pop(request_id, None)
+            self._cancel_remote(request_id)
+            self.failures += 1
+            raise ModelHostError(f"model host did not answer {op} within {self.timeout:g}s")
+        except (ModelHostError, ConnectionError) as e:
+            self._pending.pop(request_id, None)
+            self.failures += 1
+            if isinstance(e, ModelHostError):
+                raise
+            raise ModelHostError(f"model host connection failed: {e}")
+        finally:
+            self.rpc_time += time.perf_counter() - started
+
+        if "error" in header:
+            self.failures += 1
+            if header.get("stage") == "asr":
+                raise TranscriptionQueueFull("asr", header["error"])
+            if header.get("stage"):
+                raise Overloaded(header["stage"], header["error"])
+            raise ModelHostError(header["error"])
+        return header, reply_payload
+
+    def _cancel_remote(self, request_id: int):
+        if self._writer is not None:
+            try:
+                self._writer.write(encode_frame({"op": "cancel", "target": request_id}))
+            except Exception:
+                pass
+
+    async def load(self, name: str):
+        # Registry loader in the web worker: "loaded" once the host has the model loaded
+        await self.call("load", name=name)
+        return self
+
+    def component_stats(self, name: str, defaults: dict) -> dict:
+        # Sync, for /stats and /metrics: returns the latest snapshot and refreshes it in the background
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        stale = time.monotonic() - self._stats_at > MODEL_HOST_STATS_INTERVAL_SECONDS
+        if loop is not None and stale and (self._stats_task is None or self._stats_task.done()):
+            self._stats_task = loop.create_task(self._refresh_stats())
+        return {**defaults, **self.host_stats.get(name, {}), "model_host": self.path}
+
+    async def _refresh_stats(self):
+        try:
+            header, _ = await self.call("stats")
+            self.host_stats = header["stats"]
+        except Exception as e:
+            print("[⚠️ Model Host] Stats unavailable:", e)
+        self._stats_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "connected": self._writer is not None,
+            "requests": self.requests,
+            "failures": self.failures,
+            "avg_rpc_ms": self.rpc_time / self.requests * 1000 if self.requests else 0.0,
+        }
+
+    async def aclose(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._read_task is not None:
+            await asyncio.gather(self._read_task, return_exceptions=True)
+
+
+class RemoteTranscriber:
+    _DEFAULTS = {"backend": None, "workers": 0, "queue_depth": 0, "queue_size": 0, "completed": 0, "batches": 0, "rejected": 0,
+                 "cancelled": 0, "avg_wait_ms": 0.0, "max_wait_ms": 0.0, "load_error": None}
+
+    def __init__(self, client: ModelHostClient):
+        self.client = client
+
+    async def transcribe(self, audio) -> dict:
+        # A file path is only readable because the host runs on the same machine
+        if isinstance(audio, str):
+            header, _ = await self.client.call("transcribe", path=os.path.abspath(audio))
+        else:
+            shape, data = pack_array(audio)
+            header, _ = await self.client.call("transcribe", data, shape=shape)
+        return header["result"]
+
+    def stats(self) -> dict:
+        return self.client.component_stats("asr", self._DEFAULTS)
+
+
+class RemoteEmbedder:
+    _DEFAULTS = {"cache_hits": 0, "cache_misses": 0, "hit_rate": 0.0, "cache_entries": 0, "batches": 0,
+                 "avg_batch_size": 0.0, "queue_depth": 0}
+
+    def __init__(self, client: ModelHostClient):
+        self.client = client
+
+    async def encode(self, text: str):
+        return (await self.encode_many([text]))[0]
+
+    async def encode_many(self, texts: list) -> list:
+        header, payload = await self.client.call("encode", texts=list(texts))
+        return list(unpack_array(header["shape"], payload))
+
+    def stats(self) -> dict:
+        return self.client.component_stats("embeddings", self._DEFAULTS)
+
+
+class RemoteMemoryStore:
+    _DEFAULTS = {"namespaces_loaded": 0, "anonymous_loaded": 0, "entries_loaded": 0, "max_turns_per_namespace": 0,
+                 "max_namespaces_loaded": 0}
+
+    def __init__(self, client: ModelHostClient):
+        self.client = client
+
+    async def query(self, namespace: str, embedding, n_results: int = 3) -> list:
+        shape, data = pack_array(embedding)
+        header, _ = await self.client.call("memory_query", data, shape=shape, namespace=namespace,
+                                           n_results=n_results)
+        return header["documents"]
+
+    async def add(self, namespace: str, text: str, embedding, importance: float = 1.0):
+        shape, data = pack_array(embedding)
+        await self.client.call("memory_add", data, shape=shape, namespace=namespace, text=text,
+                               importance=importance)
+
+    async def forget(self, namespace: str):
+        await self.client.call("memory_forget", namespace=namespace)
+
+    def stats(self) -> dict:
+        return self.client.component_stats("memory", self._DEFAULTS)
+
+
+# === Entry point ===
+#   MODEL_HOST_SOCKET=/tmp/neuravoice-models.sock python -m backend.model_host
+#   MODEL_HOST_SOCKET=/tmp/neuravoice-models.sock uvicorn backend.main:app --workers 4
+if __name__ == "__main__":
+    load_dotenv()
+    from backend.models import registry
+
+    parser = argparse.ArgumentParser(description="Shared ASR / embedding / memory host for web workers")
+    parser.add_argument("--socket", default=MODEL_HOST_SOCKET or "/tmp/neuravoice-models.sock")
+    parser.add_argument("--warmup", default=",".join(WARMUP_MODELS),
+                        help="comma-separated models to load at startup (asr,embedder,memory)")
+    args = parser.parse_args()
+
+    host = ModelHost(registry, *create_model_services(registry))
+    try:
+        asyncio.run(host.serve(args.socket, warmup=[name for name in args.warmup.split(",") if name]))
+    except KeyboardInterrupt:
+        pass
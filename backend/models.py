@@ -0,0 +1,96 @@
+import os
+import time
+import asyncio
+import inspect
+
+# === Startup settings ===
+# Comma-separated registry entries to load in the background at startup (e.g. "asr,embedder,memory").
+# Anything not listed is loaded lazily on first use; an empty list means fully lazy startup.
+WARMUP_MODELS = [name.strip() for name in os.getenv("WARMUP_MODELS", "asr,embedder,memory").split(",") if name.strip()]
+
+
+# === Lazy model registry ===
+# Heavy resources (Whisper, the sentence encoder, the Chroma client) are registered with a loader
+# instead of being created at import time. The first get() -- from a request or from the startup
+# warmup task -- runs the loader off the event loop, then the optional warmup step (a dummy
+# inference so lazy kernel/JIT setup isn't paid by the first real request), and records timings.
+class ModelRegistry:
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._status = {}
+        self._locks = {}
+
+    def register(self, name: str, loader, warmup=None):
+        # loader: sync or async zero-arg callable returning the resource
+        # warmup: optional sync callable taking the resource
+        self._loaders[name] = (loader, warmup)
+        self._status[name] = {"loaded": False, "loading": False, "load_seconds": None,
+                              "warmup_seconds": None, "error": None}
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    async def get(self, name: str):
+        if name in self._models:
+            return self._models[name]
+
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            if name in self._models:
+                return self._models[name]
+
+            loader, warmup = self._loaders[name]
+            status = self._status[name]
+            status["loading"] = True
+            try:
+                started = time.perf_counter()
+                if inspect.iscoroutinefunction(loader):
+                    model = await loader()
+                else:
+                    model = await asyncio.to_thread(loader)
+                status["load_seconds"] = round(time.perf_counter() - started, 3)
+
+                if warmup is not None:
+                    started = time.perf_counter()
+                    await asyncio.to_thread(warmup, model)
+                    status["warmup_seconds"] = round(time.perf_counter() - started, 3)
+            except Exception as e:
+                status["error"] = str(e)
+                print(f"[❌ Model Load Error] {name}:", e)
+                raise
+            finally:
+                status["loading"] = False
+
+            self._models[name] = model
+            status["loaded"] = True
+            status["error"] = None
+            print(f"[📦 Model Loaded] {name} in {status['load_seconds']}s"
+                  + (f" (+{status['warmup_seconds']}s warmup)" if status["warmup_seconds"] is not None else ""))
+            return model
+
+    async def warmup(self, names=None):
+        # Loads the given entries one after another (they compete for the same CPU cores)
+        for name in names if names is not None else WARMUP_MODELS:
+            if name not in self._loaders:
+                print(f"[⚠️ Warmup] Unknown model '{name}', skipping")
+                continue
+            try:
+                await self.get(name)
+            except Exception:
+                pass  # already recorded in status
+
+    def ready(self, names=None) -> bool:
+        return all(self.is_loaded(name) for name in (names if names is not None else WARMUP_MODELS)
+                   if name in self._loaders)
+
+    def failed(self) -> list:
+        # Entries whose last load attempt raised (a later get() retries them)
+        return [name for name, status in self._status.items() if status["error"] and name not in self._models]
+
+    def status(self) -> dict:
+        return {name: dict(status) for name, status in self._status.items()}
+
+
+# Process-wide registry; resources register themselves where they are defined (see ws_routes.py)
+registry = ModelRegistry()
@@ -1,28 +1,36 @@
 import os
-import requests
 import json
-import smtplib
+import time
 import datetime
 from email.message import EmailMessage
 from dotenv import load_dotenv
 from pathlib import Path
 
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request
+import httpx
 
 # Load environment variables from a .env file in the current directory
 dotenv_path = Path(__file__).resolve().parent / ".env"
 load_dotenv(dotenv_path=dotenv_path, override=True)
 
+# Shared clients (imported after .env is loaded, since they read their settings at import)
+from backend.llm_client import llm_client
+from backend.calendar_client import calendar_client
+from backend.email_outbox import EmailOutbox, SMTP_AUTH
+from backend.tools import ToolRegistry
+from backend.reply_cache import reply_cache
+from backend.admission import Overloaded
+
 # Grab secrets from environment
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 EMAIL_ADDRESS = os.getenv("EMAIL_ADDRESS")
 EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
 
+# Background delivery queue: one reused SMTP connection, retries with backoff (see email_outbox.py)
+email_outbox = EmailOutbox(username=EMAIL_ADDRESS, password=EMAIL_PASSWORD)
+
 # === 1. Send Email Utility ===
-def send_email(to: str, subject: str, body: str) -> str:
+# Returns as soon as the message is queued; delivery status is available via /email/{id}
+async def send_email(to: str, subject: str, body: str) -> str:
     print(f"=== EMAIL SENDING ===")
     print("TO:", to)
     print("SUBJECT:", subject)
@@ -31,7 +39,7 @@ def send_email(to: str, subject: str, body: str) -> str:
     print("EMAIL_PASSWORD:", EMAIL_PASSWORD if EMAIL_PASSWORD else "Not Set")
 
     # Check if email credentials are present
-    if not EMAIL_ADDRESS or not EMAIL_PASSWORD:
+    if not EMAIL_ADDRESS or (SMTP_AUTH and not EMAIL_PASSWORD):
         return "[Email Config Error]: EMAIL_ADDRESS or EMAIL_PASSWORD not set."
 
     try:
@@ -42,19 +50,17 @@ def send_email(to: str, subject: str, body: str) -> str:
         msg['To'] = to
         msg.set_content(body)
 
-        # Send using Gmail SMTP server (SSL)
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as smtp:
-            smtp.ehlo()
-            smtp.login(EMAIL_ADDRESS, EMAIL_PASSWORD)
-            smtp.send_message(msg)
+        # Hand off to the outbox (SMTP_HOST/SMTP_PORT, Gmail SSL by default)
+        message_id = email_outbox.enqueue(msg)
 
-        return f"✅ Email sent to {to}."
+        # Fixed first sentence, so its audio comes from the (prewarmed) TTS cache; details follow
+        return f"📨 Email queued for delivery. To {to}, status id {message_id}."
     except Exception as e:
         print("[Email Error]:", e)
         return f"❌ Failed to send email: {str(e)}"
 
 # === 1.5. Google Calendar Integration ===
-def schedule_event(title: str, date: str, time: str, end_time: str = None, location: str = "", description: str = "") -> str:
+async def schedule_event(title: str, date: str, time: str, end_time: str = None, location: str = "", description: str = "") -> str:
     print(f"=== EVENT SCHEDULING ===")
     print("TITLE:", title)
     print("DATE:", date)
@@ -76,27 +82,9 @@ def schedule_event(title: str, date: str, time: str, end_time: str = None, locat
     except:
         pass  # Fallback to original if already correct or invalid
 
-    # Setup Google Calendar scopes and paths
-    SCOPES = ['https://www.googleapis.com/auth/calendar.events']
-    creds = None
-    token_path = Path(__file__).resolve().parent / "token.json"
-    credentials_path = Path(__file__).resolve().parent / "credentials.json"
     calendar_id = os.getenv("GOOGLE_CALENDAR_ID", "primary")  # Use 'primary' if not set
 
     try:
-        # Use saved credentials if available
-        if token_path.exists():
-            creds = Credentials.from_authorized_user_file(token_path)
-        else:
-            # Otherwise, launch auth flow
-            flow = InstalledAppFlow.from_client_secrets_file(str(credentials_path), SCOPES)
-            creds = flow.run_local_server(port=0)
-            with open(token_path, 'w') as token_file:
-                token_file.write(creds.to_json())
-
-        # Initialize Calendar service
-        service = build('calendar', 'v3', credentials=creds)
-
         # Format start and end times
         start_dt = datetime.datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
         if end_time:
@@ -119,11 +107,12 @@ def schedule_event(title: str, date: str, time: str, end_time: str = None, locat
             },
         }
 
-        # Push event to calendar
-        created_event = service.events().insert(calendarId=calendar_id, body=event).execute()
+        # Push event to calendar (cached, auto-refreshing client; batched with concurrent inserts)
+        created_event = await calendar_client.insert_event(calendar_id, event)
 
         return (
-            f"📅 Event '{title}' scheduled on {date} from {time} to {end_time or (start_dt + datetime.timedelta(minutes=30)).strftime('%H:%M')}.\n"
+            f"📅 Event scheduled. "
+            f"'{title}' on {date} from {time} to {end_time or (start_dt + datetime.timedelta(minutes=30)).strftime('%H:%M')}.\n"
         )
 
     except Exception as e:
@@ -164,44 +153,68 @@ function_definitions = [
     }
 ]
 
-# === 3. Core Agent Function ===
-# Accepts a user prompt and decides whether to reply normally or trigger a tool
-async def run_agent(user_input: str) -> str:
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
+# Open tool registry: new tools register a definition + handler here (or via @tools.tool)
+# and become available to the LLM and to run_agent without touching the agent code.
+tools = ToolRegistry()
+tools.register(function_definitions[0], send_email)
+tools.register(function_definitions[1], schedule_event)
 
+# === 3. Request Building + Tool Execution (shared by run_agent and run_agent_stream) ===
+SYSTEM_PROMPT = (
+    "You are Chatty, a friendly assistant. Only call tools when the user "
+    "explicitly asks you to send an email with recipient, subject, and body, "
+    "or schedule an event with title, date, and time. "
+    "If not, just continue chatting normally."
+)
+
+
+def build_payload(user_input: str, stream: bool = False) -> dict:
     # System prompt + user message
     messages = [
-        {
-            "role": "system",
-            "content": (
-                "You are Chatty, a friendly assistant. Only call tools when the user "
-                "explicitly asks you to send an email with recipient, subject, and body, "
-                "or schedule an event with title, date, and time. "
-                "If not, just continue chatting normally."
-            )
-        },
+        {"role": "system", "content": SYSTEM_PROMPT},
         {"role": "user", "content": user_input}
     ]
 
-    # LLM payload with tool definitions and tool auto-calling enabled
+    # LLM payload with tool definitions and tool auto-calling enabled; the `tools` format lets
+    # the model ask for several calls in one turn (e.g. an email plus two calendar events)
     payload = {
         "model": "llama3-8b-8192",
         "messages": messages,
-        "functions": function_definitions,
-        "function_call": "auto",
+        "tools": tools.tool_schemas(),
+        "tool_choice": "auto",
         "temperature": 0.7
     }
+    if stream:
+        payload["stream"] = True
+    return payload
+
+
+def collect_tool_calls(message: dict) -> list:
+    # [(name, raw_args)] for every tool call in a response message (legacy function_call included)
+    calls = [
+        (call.get("function", {}).get("name"), call.get("function", {}).get("arguments", "{}"))
+        for call in message.get("tool_calls") or []
+    ]
+    if not calls and message.get("function_call"):
+        calls.append((message["function_call"].get("name"), message["function_call"].get("arguments", "{}")))
+    return calls
+
+
+# === 4. Core Agent Function ===
+# Accepts a user prompt and decides whether to reply normally or trigger a tool.
+# `turn` (optional dict) is told whether the reply was plain model text, i.e. safe to cache,
+# or came from a tool call.
+# Overloaded (no LLM slot free) is raised to the caller, which decides how to say "busy".
+async def run_agent(user_input: str, turn: dict = None) -> str:
+    payload = build_payload(user_input)
 
     try:
-        # Call Groq's OpenAI-compatible endpoint
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers=headers,
-            json=payload
-        )
+        # Call Groq's OpenAI-compatible endpoint over the shared, pooled async client
+        try:
+            response = await llm_client.chat_completion(payload, api_key=GROQ_API_KEY)
+        except httpx.TimeoutException as e:
+            print("[Groq API Timeout]:", e)
+            return "⚠️ Groq took too long to respond. Please try again."
 
         try:
             data = response.json()
@@ -213,53 +226,127 @@ async def run_agent(user_input: str) -> str:
         choice = data.get("choices", [{}])[0]
         message = choice.get("message", {})
 
-        function_name = None
-        raw_args = "{}"
-
-        # === 4. Check if the LLM decided to use a tool ===
-        if "tool_calls" in message:
-            tool_call = message["tool_calls"][0]
-            function_name = tool_call.get("function", {}).get("name")
-            raw_args = tool_call.get("function", {}).get("arguments", "{}")
-
-        elif "function_call" in message:
-            function_call = message["function_call"]
-            function_name = function_call.get("name")
-            raw_args = function_call.get("arguments", "{}")
-
-        # === 5. Validate and Execute Tool Call ===
-        if function_name and function_name in {"send_email", "schedule_event"}:
-            try:
-                arguments = json.loads(raw_args)
-
-                # Double check that required args are present
-                if function_name == "send_email":
-                    if not all(k in arguments for k in ["to", "subject", "body"]):
-                        raise ValueError("Incomplete function args for send_email")
-                elif function_name == "schedule_event":
-                    if not all(k in arguments for k in ["title", "date", "time"]):
-                        raise ValueError("Incomplete function args for schedule_event")
-
-            except Exception as e:
-                print("[Invalid Function Call Blocked]:", raw_args)
-                return "⚠️ Groq attempted a broken or hallucinated function call. Ignored."
-
-            # Tool call is valid — go ahead and run the tool
-            if function_name == "send_email":
-                print("[Agent Debug] Calling send_email with:", arguments)
-                return send_email(**arguments)
-
-            elif function_name == "schedule_event":
-                print("[Agent Debug] Calling schedule_event with:", arguments)
-                return schedule_event(**arguments)
-
-        # === 6. Fallback: Regular Text Reply ===
+        # === 5. Check if the LLM decided to use tools ===
+        calls = collect_tool_calls(message)
+
+        # === 6. Validate and Execute every Tool Call (concurrently, one combined result) ===
+        if calls:
+            if turn is not None:
+                turn["tool"] = True
+            return await tools.execute(calls)
+
+        # === 7. Fallback: Regular Text Reply ===
         if "content" in message:
+            if turn is not None:
+                turn["cacheable"] = bool(message["content"])
             return message["content"]
 
         print("[Groq API Unknown Format]:", json.dumps(data, indent=2))
         return "🤖 Groq replied in an unknown format. Try again."
 
+    except Overloaded:
+        raise
     except Exception as e:
         print("[Agent Runtime Error]:", e)
         return "⚠️ Something went wrong during agent processing."
+
+
+# === 8. Streaming Agent Function ===
+# Same contract as run_agent, but yields the reply as text deltas while Groq generates it.
+# Tool-call fragments arrive spread over many chunks; they are stitched back together and
+# only executed once the stream has finished, then the tool's result is yielded.
+async def run_agent_stream(user_input: str, turn: dict = None):
+    payload = build_payload(user_input, stream=True)
+
+    tool_calls = {}  # index -> {"name": ..., "arguments": ...}
+    function_call = {"name": "", "arguments": ""}  # legacy single function_call deltas
+    received_any = False
+    received_content = False
+
+    try:
+        async for chunk in llm_client.stream_chat_completion(payload, api_key=GROQ_API_KEY):
+            received_any = True
+            choice = (chunk.get("choices") or [{}])[0]
+            delta = choice.get("delta") or {}
+
+            if delta.get("content"):
+                received_content = True
+                yield delta["content"]
+
+            for call in delta.get("tool_calls") or []:
+                slot = tool_calls.setdefault(call.get("index", 0), {"name": "", "arguments": ""})
+                fn = call.get("function") or {}
+                slot["name"] += fn.get("name") or ""
+                slot["arguments"] += fn.get("arguments") or ""
+
+            if delta.get("function_call"):
+                fn = delta["function_call"]
+                function_call["name"] += fn.get("name") or ""
+                function_call["arguments"] += fn.get("arguments") or ""
+
+    except httpx.TimeoutException as e:
+        print("[Groq API Timeout]:", e)
+        yield "⚠️ Groq took too long to respond. Please try again."
+        return
+    except Overloaded:
+        raise
+    except Exception as e:
+        print("[Agent Runtime Error]:", e)
+        yield "⚠️ Something went wrong during agent processing."
+        return
+
+    if not received_any:
+        yield "⚠️ Groq returned an invalid response. Check your API key or network connection."
+        return
+
+    # === Execute the reassembled tool calls (all of them, as in run_agent) ===
+    calls = [(tool_calls[i]["name"], tool_calls[i]["arguments"]) for i in sorted(tool_calls)]
+    if not calls and function_call["name"]:
+        calls.append((function_call["name"], function_call["arguments"]))
+
+    if calls:
+        if turn is not None:
+            turn["tool"] = True
+        yield await tools.execute(calls)
+    elif turn is not None:
+        turn["cacheable"] = received_content
+
+
+# === 9. Cached Agent Entry Points ===
+# Plain conversational replies are remembered per normalized question (and matched semantically
+# when an encoder is attached, see reply_cache.py). Tool turns and error replies are never cached,
+# so an email or calendar event is never "replayed"; a tool turn instead marks its question so
+# near-duplicates of it always reach the LLM. `question` is the user's own words used as the
+# cache key; `user_input` is what the LLM sees (possibly with memory context prepended), and
+# `scope` (reply_cache.context_scope) ties replies that depended on memory to that context.
+async def run_agent_cached(question: str, user_input: str = None, scope: str = None) -> str:
+    cached = await reply_cache.lookup(question, scope)
+    if cached is not None:
+        return cached
+
+    turn = {}
+    started = time.perf_counter()
+    reply = await run_agent(user_input or question, turn)
+    if turn.get("cacheable"):
+        await reply_cache.store(question, reply, time.perf_counter() - started, scope)
+    elif turn.get("tool"):
+        await reply_cache.store_tool_turn(question, scope)
+    return reply
+
+
+async def run_agent_stream_cached(question: str, user_input: str = None, scope: str = None):
+    cached = await reply_cache.lookup(question, scope)
+    if cached is not None:
+        yield cached
+        return
+
+    turn = {}
+    parts = []
+    started = time.perf_counter()
+    async for delta in run_agent_stream(user_input or question, turn):
+        parts.append(delta)
+        yield delta
+    if turn.get("cacheable"):
+        await reply_cache.store(question, "".join(parts), time.perf_counter() - started, scope)
+    elif turn.get("tool"):
+        await reply_cache.store_tool_turn(question, scope)
@@ -0,0 +1,183 @@
+import os
+import re
+import math
+import time
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+from backend.tts_cache import normalize_text
+
+# === Reply cache settings ===
+REPLY_CACHE_ENABLED = os.getenv("REPLY_CACHE", "1") == "1"
+REPLY_CACHE_SIZE = int(os.getenv("REPLY_CACHE_SIZE", "512"))
+REPLY_CACHE_TTL_SECONDS = float(os.getenv("REPLY_CACHE_TTL_SECONDS", "3600"))
+# Cosine similarity a paraphrase needs to reuse a cached reply; tune it with /stats
+REPLY_CACHE_SIMILARITY = float(os.getenv("REPLY_CACHE_SIMILARITY", "0.92"))
+REPLY_CACHE_MAX_QUERY_CHARS = 300  # long, specific prompts are unlikely to repeat
+
+_PUNCTUATION = re.compile(r"[^\w\s']+")
+
+
+def normalize_query(text: str) -> str:
+    # "What can you do?" and "what can you do" are the same question
+    return re.sub(r"\s+", " ", _PUNCTUATION.sub(" ", normalize_text(text))).strip()
+
+
+def context_scope(session_id: str, context: str):
+    # Scope for a reply generated with retrieved memory: the same session *and* the same context
+    if not context:
+        return None
+    return f"{session_id}:{hashlib.sha1(context.encode('utf-8')).hexdigest()[:16]}"
+
+
+# === Semantic reply cache in front of the agent ===
+# Lookups first try the normalized text exactly, then (when an encoder is attached) the cached
+# query with the highest cosine similarity. Entries expire after a TTL and the least recently
+# used ones are evicted beyond a size limit. Each entry belongs to a scope: None for replies
+# that didn't depend on anything but the question, or a context_scope() for replies generated
+# with a session's memory. A lookup only ever searches its own scope, so a follow-up such as
+# "yes" or "what's my name?" asked with memory context never gets a global (or another user's)
+# reply. Turns that ran a tool leave a reply-less marker entry: a lookup whose exact or nearest
+# match is a marker is a miss, so "...moves to eleven" never reuses anything near "...to ten".
+class ReplyCache:
+    def __init__(self, embed=None, threshold: float = REPLY_CACHE_SIMILARITY, ttl: float = REPLY_CACHE_TTL_SECONDS,
+                 max_entries: int = REPLY_CACHE_SIZE, enabled: bool = REPLY_CACHE_ENABLED):
+        self.embed = embed  # optional async text -> vector; without it only exact matches hit
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.enabled = enabled
+
+        self._entries = OrderedDict()  # (scope, normalized query) -> entry dict
+
+        # Reporting counters
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.tool_misses = 0  # lookups refused because they matched a tool turn
+        self.stores = 0
+        self.latency_saved = 0.0
+        # Best similarity seen on semantic lookups, bucketed by 0.02, hits and misses alike
+        self.similarity_histogram = {}
+
+    def _expired(self, entry: dict, now: float) -> bool:
+        return now - entry["created"] > self.ttl
+
+    def _evict(self, now: float):
+        for key in [key for key, entry in self._entries.items() if self._expired(entry, now)]:
+            del self._entries[key]
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _hit(self, key, entry: dict, kind: str):
+        if entry["reply"] is None:
+            self.tool_misses += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        entry["hits"] += 1
+        self.latency_saved += entry["latency"]
+        if kind == "exact":
+            self.exact_hits += 1
+        else:
+            self.semantic_hits += 1
+        print(f"[💾 Reply Cache] {kind} hit for {key[1]!r} (saved ~{entry['latency'] * 1000:.0f} ms)")
+        return entry["reply"]
+
+    async def _vector(self, query: str):
+        if self.embed is None:
+            return None
+        embedding = await self.embed(query)
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    async def lookup(self, text: str, scope: str = None):
+        # Returns a cached reply for `text` from `scope`'s entries only, or None
+        query = normalize_query(text)
+        if not self.enabled or not query or len(query) > REPLY_CACHE_MAX_QUERY_CHARS:
+            return None
+
+        now = time.time()
+        key = (scope, query)
+        entry = self._entries.get(key)
+        if entry is not None and not self._expired(entry, now):
+            return self._hit(key, entry, "exact")
+
+        try:
+            vector = await self._vector(query)
+        except Exception as e:
+            print("[⚠️ Reply Cache] Embedding failed, exact match only:", e)
+            vector = None
+        candidates = [(key, entry) for key, entry in self._entries.items()
+                      if key[0] == scope and entry["vector"] is not None and not self._expired(entry, now)]
+        if vector is not None and candidates:
+            similarities = np.stack([entry["vector"] for _, entry in candidates]) @ vector
+            best = int(np.argmax(similarities))
+            bucket = math.floor(float(similarities[best]) * 50 + 1e-6) / 50
+            self.similarity_histogram[bucket] = self.similarity_histogram.get(bucket, 0) + 1
+            if similarities[best] >= self.threshold:
+                key, entry = candidates[best]
+                return self._hit(key, entry, "semantic")
+
+        self.misses += 1
+        return None
+
+    async def store(self, text: str, reply: str, latency: float, scope: str = None):
+        # Callers only store plain conversational replies: never tool results or error messages
+        query = normalize_query(text)
+        if not self.enabled or not query or not reply or len(query) > REPLY_CACHE_MAX_QUERY_CHARS:
+            return
+        try:
+            vector = await self._vector(query)
+        except Exception as e:
+            print("[⚠️ Reply Cache] Embedding failed, storing for exact match only:", e)
+            vector = None
+
+        self._put(scope, query, reply, vector, latency)
+        self.stores += 1
+
+    async def store_tool_turn(self, text: str, scope: str = None):
+        # Marks `text` (and anything semantically close to it) as a request that runs a tool
+        query = normalize_query(text)
+        if not self.enabled or not query or len(query) > REPLY_CACHE_MAX_QUERY_CHARS:
+            return
+        try:
+            vector = await self._vector(query)
+        except Exception as e:
+            print("[⚠️ Reply Cache] Embedding failed, marking the tool turn for exact match only:", e)
+            vector = None
+        self._put(scope, query, None, vector, 0.0)
+
+    def _put(self, scope, query: str, reply, vector, latency: float):
+        now = time.time()
+        self._entries[(scope, query)] = {"reply": reply, "vector": vector, "latency": latency,
+                                         "created": now, "hits": 0}
+        self._entries.move_to_end((scope, query))
+        self._evict(now)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.semantic_hits
+        lookups = hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "lookups": lookups,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "tool_misses": self.tool_misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "latency_saved_seconds": round(self.latency_saved, 3),
+            "similarity_threshold": self.threshold,
+            "best_similarity_histogram": {f"{k:.2f}": v for k, v in sorted(self.similarity_histogram.items())},
+        }
+
+
+# Process-wide cache; ws_routes attaches the shared sentence encoder for semantic matching
+reply_cache = ReplyCache()
@@ -0,0 +1,127 @@
+import os
+import asyncio
+import importlib
+from math import gcd
+
+import numpy as np
+
+# === Streaming ASR / VAD settings ===
+STREAM_SAMPLE_RATE = 16000  # what Whisper expects; other client rates are resampled
+VAD_FRAME_MS = 30
+VAD_MIN_RMS = float(os.getenv("VAD_MIN_RMS", "0.01"))  # absolute floor for "speech" energy
+VAD_NOISE_MULTIPLIER = float(os.getenv("VAD_NOISE_MULTIPLIER", "3.0"))
+VAD_START_MS = int(os.getenv("VAD_START_MS", "90"))  # sustained energy needed to open an utterance
+VAD_SILENCE_MS = int(os.getenv("VAD_SILENCE_MS", "400"))  # trailing silence that closes it
+VAD_PREROLL_MS = int(os.getenv("VAD_PREROLL_MS", "300"))
+STREAM_MAX_UTTERANCE_S = float(os.getenv("STREAM_MAX_UTTERANCE_S", "30"))
+STREAM_PARTIAL_INTERVAL_MS = int(os.getenv("STREAM_PARTIAL_INTERVAL_MS", "800"))
+
+
+def pcm16_to_float32(data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def resample(audio: np.ndarray, src_rate: int, dst_rate: int = STREAM_SAMPLE_RATE) -> np.ndarray:
+    # Polyphase with an anti-aliasing low-pass, so content above the new Nyquist doesn't fold back
+    # into the speech band. "line" padding keeps edge transients small when streamed chunks are
+    # resampled one at a time.
+    from scipy.signal import resample_poly
+
+    if src_rate == dst_rate or len(audio) == 0:
+        return audio
+    g = gcd(src_rate, dst_rate)
+    return resample_poly(audio, dst_rate // g, src_rate // g, padtype="line").astype(np.float32)
+
+
+async def prewarm_resampler():
+    # scipy.signal takes about a second to import: do it off the event loop at startup rather than
+    # inside the first streamed frame that needs resampling
+    await asyncio.to_thread(importlib.import_module, "scipy.signal")
+
+
+# === Per-connection rolling buffer with energy-based voice-activity detection ===
+# feed() takes raw PCM16 frames as they arrive and returns a finished utterance (16 kHz float32)
+# as soon as enough trailing silence is seen; partial_audio() snapshots the utterance in progress.
+class StreamingRecognizer:
+    def __init__(self, sample_rate: int = STREAM_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.frame_len = STREAM_SAMPLE_RATE * VAD_FRAME_MS // 1000
+        self.start_frames = max(1, VAD_START_MS // VAD_FRAME_MS)
+        self.silence_frames = max(1, VAD_SILENCE_MS // VAD_FRAME_MS)
+        self.preroll_frames = max(0, VAD_PREROLL_MS // VAD_FRAME_MS)
+        self.max_frames = int(STREAM_MAX_UTTERANCE_S * 1000 / VAD_FRAME_MS)
+        self.partial_every = max(1, STREAM_PARTIAL_INTERVAL_MS // VAD_FRAME_MS)
+
+        self._pending = np.zeros(0, dtype=np.float32)  # samples not yet cut into VAD frames
+        self._preroll = []  # recent non-speech frames, kept so word onsets aren't clipped
+        self._utterance = []  # frames of the utterance in progress
+        self._speech_run = 0
+        self._silence_run = 0
+        self._frames_since_partial = 0
+        self.noise_floor = VAD_MIN_RMS / VAD_NOISE_MULTIPLIER
+        self.in_speech = False
+
+    def feed(self, data: bytes) -> list:
+        # Returns the list of utterances (usually zero or one) that ended inside this chunk
+        audio = resample(pcm16_to_float32(data), self.sample_rate)
+        self._pending = np.concatenate([self._pending, audio])
+
+        finished = []
+        n_frames = len(self._pending) // self.frame_len
+        for i in range(n_frames):
+            frame = self._pending[i * self.frame_len:(i + 1) * self.frame_len]
+            utterance = self._process_frame(frame)
+            if utterance is not None:
+                finished.append(utterance)
+        self._pending = self._pending[n_frames * self.frame_len:]
+        return finished
+
+    def _process_frame(self, frame: np.ndarray):
+        rms = float(np.sqrt(np.mean(frame * frame)))
+        is_speech = rms >= max(VAD_MIN_RMS, self.noise_floor * VAD_NOISE_MULTIPLIER)
+
+        if not self.in_speech:
+            # Track background noise slowly while nobody is talking
+            if not is_speech:
+                self.noise_floor = 0.95 * self.noise_floor + 0.05 * rms
+            self._preroll.append(frame)
+            self._speech_run = self._speech_run + 1 if is_speech else 0
+            if self._speech_run >= self.start_frames:
+                self.in_speech = True
+                self._utterance = self._preroll[-(self.preroll_frames + self._speech_run):]
+                self._silence_run = 0
+                self._frames_since_partial = 0
+            self._preroll = self._preroll[-(self.preroll_frames + self.start_frames):]
+            return None
+
+        self._utterance.append(frame)
+        self._frames_since_partial += 1
+        self._silence_run = 0 if is_speech else self._silence_run + 1
+
+        if self._silence_run >= self.silence_frames or len(self._utterance) >= self.max_frames:
+            return self._end_utterance()
+        return None
+
+    def _end_utterance(self) -> np.ndarray:
+        # Drop most of the trailing silence, keeping a little tail for the last word
+        keep = len(self._utterance) - max(0, self._silence_run - self.preroll_frames)
+        audio = np.concatenate(self._utterance[:keep]) if keep > 0 else np.zeros(0, dtype=np.float32)
+        self.in_speech = False
+        self._utterance = []
+        self._preroll = []
+        self._speech_run = 0
+        self._silence_run = 0
+        return audio
+
+    def partial_due(self) -> bool:
+        return self.in_speech and self._frames_since_partial >= self.partial_every
+
+    def partial_audio(self) -> np.ndarray:
+        self._frames_since_partial = 0
+        return np.concatenate(self._utterance) if self._utterance else np.zeros(0, dtype=np.float32)
+
+    def flush(self):
+        # Client stopped streaming: whatever speech is buffered becomes the final utterance
+        if self.in_speech and self._utterance:
+            return self._end_utterance()
+        return None
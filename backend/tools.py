@@ -0,0 +1,134 @@
+import os
+import json
+import time
+import asyncio
+import inspect
+
+from backend.metrics import observe_stage, tool_calls
+
+# === Tool engine settings ===
+TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "20"))  # default per-tool budget
+
+INVALID_CALL_REPLY = "⚠️ Groq attempted a broken or hallucinated function call. Ignored."
+
+_JSON_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+    "object": dict,
+    "array": list,
+}
+
+
+class ToolCallError(ValueError):
+    pass
+
+
+# === Tool registry + execution engine ===
+# A tool is a JSON-schema definition (the same shape as the LLM's function definitions) plus a
+# sync or async handler returning the user-facing result text. run_agent never names tools:
+# it hands every call from a response to execute(), which validates each one, runs the valid
+# calls concurrently under their own timeouts, and joins the results in the order requested.
+class ToolRegistry:
+    def __init__(self, default_timeout: float = TOOL_TIMEOUT_SECONDS):
+        self.default_timeout = default_timeout
+        self._tools = {}  # name -> (definition, handler, timeout)
+
+    def register(self, definition: dict, handler, timeout: float = None):
+        self._tools[definition["name"]] = (definition, handler, timeout or self.default_timeout)
+        return handler
+
+    def tool(self, definition: dict, timeout: float = None):
+        # Decorator form of register()
+        def decorator(handler):
+            return self.register(definition, handler, timeout)
+        return decorator
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def definitions(self) -> list:
+        return [definition for definition, _, _ in self._tools.values()]
+
+    def tool_schemas(self) -> list:
+        # OpenAI-style `tools` payload entries
+        return [{"type": "function", "function": definition} for definition in self.definitions()]
+
+    def validate(self, name: str, raw_args) -> dict:
+        # Returns the arguments to call the handler with, or raises ToolCallError
+        if name not in self._tools:
+            raise ToolCallError(f"unknown tool '{name}'")
+        try:
+            arguments = json.loads(raw_args or "{}") if isinstance(raw_args, str) else dict(raw_args or {})
+        except (TypeError, ValueError) as e:
+            raise ToolCallError(f"arguments for {name} are not valid JSON: {e}")
+        if not isinstance(arguments, dict):
+            raise ToolCallError(f"arguments for {name} must be an object")
+
+        schema = self._tools[name][0].get("parameters", {})
+        properties = schema.get("properties", {})
+
+        # Double check that required args are present and have the declared types
+        missing = [key for key in schema.get("required", []) if arguments.get(key) in (None, "")]
+        if missing:
+            raise ToolCallError(f"incomplete function args for {name}: missing {', '.join(missing)}")
+        for key, value in arguments.items():
+            expected = _JSON_TYPES.get(properties.get(key, {}).get("type"))
+            if expected is not None and value is not None and not isinstance(value, expected):
+                raise ToolCallError(f"argument '{key}' for {name} should be {properties[key]['type']}")
+
+        # Hallucinated extra arguments are dropped rather than crashing the handler
+        return {key: value for key, value in arguments.items() if key in properties}
+
+    async def _run(self, name: str, arguments: dict) -> str:
+        _, handler, timeout = self._tools[name]
+        print(f"[Agent Debug] Calling {name} with:", arguments)
+        started = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(handler):
+                result = await asyncio.wait_for(handler(**arguments), timeout)
+            else:
+                result = await asyncio.wait_for(asyncio.to_thread(handler, **arguments), timeout)
+        except asyncio.TimeoutError:
+            print(f"[Tool Timeout] {name} after {timeout}s")
+            self._observe(name, "timeout", started)
+            return f"⏱️ {name} took longer than {timeout:g}s and was abandoned."
+        except Exception as e:
+            print(f"[Tool Error] {name}:", e)
+            self._observe(name, "error", started, repr(e))
+            return f"❌ {name} failed: {e}"
+        self._observe(name, "ok", started)
+        print(f"[Agent Debug] {name} finished in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return str(result).strip()
+
+    def _observe(self, name: str, outcome: str, started: float, error: str = None):
+        tool_calls.inc(tool=name, outcome=outcome)
+        observe_stage("tool", time.perf_counter() - started, error or (outcome if outcome != "ok" else None),
+                      started=started)
+
+    async def execute(self, calls: list) -> str:
+        # calls: [(name, raw_args)] from one LLM response -> one combined result text.
+        # Calls within a turn are independent (the model emits them without seeing any result),
+        # so they run concurrently; identical repeated calls are only run once.
+        jobs = {}  # (name, canonical args) -> arguments
+        order = []  # per call: a job key, or the reply for an invalid call
+        for name, raw_args in calls:
+            try:
+                arguments = self.validate(name, raw_args)
+            except ToolCallError as e:
+                print("[Invalid Function Call Blocked]:", name, raw_args, f"({e})")
+                tool_calls.inc(tool=name if name in self._tools else "unknown", outcome="invalid")
+                if INVALID_CALL_REPLY not in order:
+                    order.append(INVALID_CALL_REPLY)
+                continue
+            key = (name, json.dumps(arguments, sort_keys=True))
+            if key not in jobs:
+                jobs[key] = arguments
+                order.append(key)
+
+        # Shielded: a turn cancelled by barge-in stops waiting, but never abandons a half-sent email
+        # or calendar insert
+        results = await asyncio.shield(asyncio.gather(*(self._run(name, args) for (name, _), args in jobs.items())))
+        finished = dict(zip(jobs, results))
+        return "\n".join(finished[item] if isinstance(item, tuple) else item for item in order)
@@ -0,0 +1,170 @@
+import os
+import re
+import time
+import asyncio
+
+from elevenlabs import generate
+
+from backend.tts_cache import TTSCache, CachedSynthesizer, DEFAULT_PREWARM_PHRASES, as_chunks
+from backend.metrics import observe_stage, current_trace
+from backend.admission import StageLimiter
+
+# === TTS settings ===
+TTS_VOICE = os.getenv("TTS_VOICE", "Sarah")
+TTS_MODEL = os.getenv("TTS_MODEL", "eleven_monolingual_v1")
+TTS_PREFETCH_SENTENCES = int(os.getenv("TTS_PREFETCH_SENTENCES", "2"))  # sentences synthesized ahead of playback
+TTS_MIN_SENTENCE_CHARS = int(os.getenv("TTS_MIN_SENTENCE_CHARS", "12"))  # shorter fragments are merged forward
+# Sentences synthesized at once across all connections, and how many more may wait for a slot
+TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", "8"))
+TTS_QUEUE_SIZE = int(os.getenv("TTS_QUEUE_SIZE", "32"))
+TTS_PREWARM = os.getenv("TTS_PREWARM", "1") == "1"
+# "|"-separated phrases to synthesize at startup; defaults to the fixed status/error replies
+TTS_PREWARM_PHRASES = [p for p in os.getenv("TTS_PREWARM_PHRASES", "").split("|") if p.strip()] or DEFAULT_PREWARM_PHRASES
+
+# Sentence end: terminal punctuation (plus closing quotes/brackets) followed by whitespace, or a newline
+_SENTENCE_END = re.compile(r"([.!?…]+[\"')\]]*\s+|\n+)")
+
+
+# === Default synthesizer: ElevenLabs in streaming mode ===
+# Any callable taking text and returning bytes or an iterator of byte chunks can be swapped in
+# (see backend/benchmarks/stubs.py for a local fake).
+def elevenlabs_synthesize(text: str):
+    return generate(text=text, voice=TTS_VOICE, model=TTS_MODEL, stream=True)
+
+
+# Per-sentence audio cache in front of ElevenLabs (memory LRU + on-disk tier, see tts_cache.py)
+tts_cache = TTSCache()
+cached_synthesize = CachedSynthesizer(elevenlabs_synthesize, tts_cache, voice=TTS_VOICE, model=TTS_MODEL)
+
+# Global cap on concurrent sentence syntheses (admission.py); over it, turns fail fast with Overloaded
+tts_limiter = StageLimiter("tts", TTS_MAX_CONCURRENCY, TTS_QUEUE_SIZE)
+
+
+async def prewarm_tts_cache(phrases=None):
+    if not TTS_PREWARM:
+        return
+    # Replies are cached per sentence, so warm the same sentences the pipeline will ask for
+    sentences = [s for phrase in (phrases or TTS_PREWARM_PHRASES) for s in split_sentences(phrase)]
+    warmed = await asyncio.to_thread(cached_synthesize.prewarm, sentences)
+    print(f"[🔊 TTS Cache] Prewarmed {warmed}/{len(sentences)} sentences")
+
+
+# === Incremental sentence splitter ===
+# feed() takes text deltas (e.g. LLM tokens) and returns the sentences completed so far.
+class SentenceSplitter:
+    def __init__(self, min_chars: int = TTS_MIN_SENTENCE_CHARS):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, text: str) -> list:
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()].strip()
+            if len(candidate) >= self.min_chars:
+                sentences.append(candidate)
+                start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> list:
+        rest = self._buffer.strip()
+        self._buffer = ""
+        return [rest] if rest else []
+
+
+def split_sentences(text: str) -> list:
+    splitter = SentenceSplitter()
+    return splitter.feed(text) + splitter.flush()
+
+
+async def sentences_from_deltas(deltas):
+    # Async iterator of text deltas -> async iterator of sentences
+    splitter = SentenceSplitter()
+    async for delta in deltas:
+        for sentence in splitter.feed(delta):
+            yield sentence
+    for sentence in splitter.flush():
+        yield sentence
+
+
+async def _iterate(items):
+    for item in items:
+        yield item
+
+
+# === Sentence-pipelined TTS stage ===
+# Synthesizes each sentence on a worker thread as soon as it's available (up to `prefetch`
+# sentences ahead of what's being sent), and yields encoded audio chunks strictly in sentence
+# order as they arrive. Time-to-first-audio is the first sentence's synthesis, not the whole reply.
+# Each sentence holds a `limiter` slot while its worker thread runs.
+async def synthesize_stream(sentences, synthesize=cached_synthesize, prefetch: int = TTS_PREFETCH_SENTENCES,
+                            limiter: StageLimiter = tts_limiter):
+    if isinstance(sentences, (list, tuple)):
+        sentences = _iterate(sentences)
+
+    loop = asyncio.get_running_loop()
+    order = asyncio.Queue(maxsize=max(1, prefetch))  # per-sentence chunk queues, in sentence order
+    stopped = False
+    end = object()
+    trace = current_trace()  # worker threads don't inherit the turn's context
+
+    def pump(text: str, chunks: asyncio.Queue):
+        # Runs on a thread: drives the blocking synthesizer and hands chunks back to the loop
+        started = time.perf_counter()
+        first = True
+        try:
+            for chunk in as_chunks(synthesize(text)):
+                if stopped:
+                    break
+                if first:
+                    first = False
+                    observe_stage("tts_first_byte", time.perf_counter() - started, trace=trace, started=started)
+                loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+            observe_stage("tts", time.perf_counter() - started, trace=trace, started=started)
+            loop.call_soon_threadsafe(chunks.put_nowait, end)
+        except Exception as e:
+            observe_stage("tts", time.perf_counter() - started, repr(e), trace=trace, started=started)
+            loop.call_soon_threadsafe(chunks.put_nowait, e)
+        finally:
+            loop.call_soon_threadsafe(limiter.release)
+
+    async def produce():
+        chunks = None
+        try:
+            async for sentence in sentences:
+                chunks = asyncio.Queue()
+                await order.put(chunks)  # blocks once `prefetch` sentences are in flight
+                await limiter.acquire()
+                loop.run_in_executor(None, pump, sentence, chunks)
+                chunks = None
+        except Exception as e:
+            # Upstream failure (e.g. the LLM stream) or no TTS slot: surface it in sentence order
+            if chunks is None:
+                chunks = asyncio.Queue()
+                await order.put(chunks)
+            chunks.put_nowait(e)
+        await order.put(end)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            chunks = await order.get()
+            if chunks is end:
+                break
+            while True:
+                chunk = await chunks.get()
+                if chunk is end:
+                    break
+                if isinstance(chunk, Exception):
+                    raise chunk
+                yield chunk
+    finally:
+        stopped = True
+        producer.cancel()
+
+
+async def synthesize_text(text: str, synthesize=cached_synthesize) -> bytes:
+    # Whole reply as one audio file (for clients that can't play progressively)
+    return b"".join([chunk async for chunk in synthesize_stream(split_sentences(text), synthesize)])
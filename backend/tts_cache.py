@@ -0,0 +1,217 @@
+import os
+import re
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+
+# === TTS cache settings ===
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", str(Path(__file__).resolve().parent / ".tts_cache"))
+TTS_CACHE_MEMORY_BYTES = int(os.getenv("TTS_CACHE_MEMORY_MB", "64")) * 1024 * 1024
+TTS_CACHE_DISK_BYTES = int(os.getenv("TTS_CACHE_DISK_MB", "512")) * 1024 * 1024
+TTS_CACHE_MAX_TEXT_CHARS = int(os.getenv("TTS_CACHE_MAX_TEXT_CHARS", "400"))  # long, one-off replies aren't worth keeping
+
+# Fixed agent replies that get spoken often enough to synthesize once at startup
+DEFAULT_PREWARM_PHRASES = [
+    # Tool confirmations open with a fixed sentence (backend/phiagent2_groq.py)
+    "📨 Email queued for delivery.",
+    "📅 Event scheduled.",
+    "⚠️ Something went wrong during agent processing.",
+    "⚠️ Groq took too long to respond. Please try again.",
+    "⚠️ Groq returned an invalid response. Check your API key or network connection.",
+    "⚠️ Groq attempted a broken or hallucinated function call. Ignored.",
+    "🤖 Groq replied in an unknown format. Try again.",
+]
+
+
+def normalize_text(text: str) -> str:
+    # Case, unicode form and whitespace differences shouldn't produce different audio entries
+    text = unicodedata.normalize("NFKC", text).strip().lower()
+    return re.sub(r"\s+", " ", text)
+
+
+def cache_key(text: str, voice: str, model: str) -> str:
+    return hashlib.sha256(f"{voice}\x00{model}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+# === Content-addressed audio cache: in-memory LRU (bounded by bytes) over a disk tier ===
+# Disk entries live at <dir>/<key[:2]>/<key>.mp3 and are written atomically, so they survive
+# restarts; a disk hit is read whole and promoted into memory. The disk tier is an LRU too,
+# bounded by max_disk_bytes: a hit bumps the file's mtime, and the index (rebuilt from mtimes
+# on first use after a restart) removes the least recently used files past the budget.
+class TTSCache:
+    def __init__(self, cache_dir: str = TTS_CACHE_DIR, max_memory_bytes: int = TTS_CACHE_MEMORY_BYTES,
+                 max_disk_bytes: int = TTS_CACHE_DISK_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk = None  # key -> file size, least recently used first; loaded lazily
+        self._disk_bytes = 0
+        self._lock = threading.Lock()  # used from TTS worker threads
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_evictions = 0
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.mp3"
+
+    def _remember(self, key: str, audio: bytes):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return
+            if len(audio) > self.max_memory_bytes:
+                return
+            self._memory[key] = audio
+            self._memory_bytes += len(audio)
+            while self._memory_bytes > self.max_memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def _disk_index(self) -> OrderedDict:
+        # Caller holds self._lock
+        if self._disk is None:
+            files = []
+            for path in self.cache_dir.glob("*/*.mp3"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, path.stem, stat.st_size))
+            self._disk = OrderedDict((key, size) for _, key, size in sorted(files))
+            self._disk_bytes = sum(self._disk.values())
+        return self._disk
+
+    def _prune_disk(self):
+        # Caller holds self._lock
+        index = self._disk_index()
+        while self._disk_bytes > self.max_disk_bytes and index:
+            key, size = index.popitem(last=False)
+            self._disk_bytes -= size
+            self.disk_evictions += 1
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+
+    def get(self, key: str):
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return audio
+
+        path = self._path(key)
+        try:
+            audio = path.read_bytes()
+        except FileNotFoundError:
+            audio = None
+        if not audio:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.disk_hits += 1
+            index = self._disk_index()
+            if key in index:
+                index.move_to_end(key)
+        try:
+            os.utime(path)  # recency for the index rebuilt after a restart
+        except OSError:
+            pass
+        self._remember(key, audio)
+        return audio
+
+    def put(self, key: str, audio: bytes):
+        if not audio:
+            return
+        self._remember(key, audio)
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print("[⚠️ TTS Cache Write Error]:", e)
+            return
+        with self._lock:
+            index = self._disk_index()
+            self._disk_bytes += len(audio) - index.pop(key, 0)
+            index[key] = len(audio)
+            self._prune_disk()
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "disk_entries": len(self._disk) if self._disk is not None else None,
+            "disk_bytes": self._disk_bytes if self._disk is not None else None,
+            "disk_evictions": self.disk_evictions,
+        }
+
+
+# === Caching synthesizer wrapper ===
+# Wraps any synthesize(text) callable (same contract as backend.tts.elevenlabs_synthesize).
+# Hits replay the stored audio as one chunk; misses stream through untouched and are stored
+# once the full clip has arrived, so a partially failed synthesis is never cached.
+class CachedSynthesizer:
+    def __init__(self, synthesize, cache: TTSCache, voice: str, model: str):
+        self.synthesize = synthesize
+        self.cache = cache
+        self.voice = voice
+        self.model = model
+
+    def __call__(self, text: str):
+        if len(text) > TTS_CACHE_MAX_TEXT_CHARS:
+            yield from as_chunks(self.synthesize(text))
+            return
+
+        key = cache_key(text, self.voice, self.model)
+        audio = self.cache.get(key)
+        if audio is not None:
+            yield audio
+            return
+
+        parts = []
+        for chunk in as_chunks(self.synthesize(text)):
+            parts.append(chunk)
+            yield chunk
+        self.cache.put(key, b"".join(parts))
+
+    def prewarm(self, phrases) -> int:
+        # Synthesizes (or loads from disk) each phrase so the first real request is a memory hit
+        warmed = 0
+        for phrase in phrases:
+            try:
+                for _ in self(phrase):
+                    pass
+                warmed += 1
+            except Exception as e:
+                print(f"[⚠️ TTS Prewarm Error] {phrase!r}:", e)
+        return warmed
+
+
+def as_chunks(audio):
+    # Synthesizers return either bytes or an iterator of chunks; iterating bytes would yield ints
+    if isinstance(audio, (bytes, bytearray)):
+        yield bytes(audio)
+        return
+    for chunk in audio:
+        if isinstance(chunk, int):
+            chunk = bytes((chunk,))
+        yield bytes(chunk)
@@ -0,0 +1,262 @@
+import os
+import json
+import uuid
+import asyncio
+from collections import deque
+
+from backend.framing import encode_frame, decode_frame
+from backend.metrics import metrics, span
+
+# === /ws/audio session protocol (v1) ===
+# A client opts in by making its first message {"type": "hello", "v": 1}; anything else gets the
+# legacy format (typed JSON frames mixed with plain-text replies and a "__AUDIO__" sentinel
+# before each MP3). In v1 one long-lived connection carries any number of concurrent turns:
+#
+#   client -> server  text:   hello {v, resume?, last_seq?, mode?, stream?} | ping {ack} | mode {payload, stream}
+#                             text {turn, payload, mode?, interrupt?} | cancel {turn?}
+#                             stream_start {stream, payload: {sample_rate}} | stream_end
+#                     binary: frame {type: "pcm"} + 16-bit PCM | frame {type: "clip", turn} + encoded clip
+#   server -> client  text:   welcome {v, session, resumed, replayed, gap, heartbeat} | pong {last_seq}
+#                             partial | transcript | delta | done | message | error | audio_start |
+#                             audio_end | cancelled | turn_end {outcome}     (all with turn + seq)
+#                     binary: frame {type: "audio", turn, seq} + MP3 chunk
+#
+# Binary frames use the same framing as the model host (backend/framing.py): two network-order uint32
+# lengths, a JSON header, then the payload. Every server frame except welcome/pong carries a
+# sequence number and is kept in a bounded buffer; the client acknowledges what it has seen in
+# its heartbeat. If the connection drops, the session's turns keep running for
+# WS_RESUME_SECONDS, and a client that reconnects with hello {resume: session, last_seq}
+# gets everything after last_seq replayed before new frames.
+WS_PROTOCOL_VERSION = 1
+WS_HEARTBEAT_SECONDS = float(os.getenv("WS_HEARTBEAT_SECONDS", "15"))  # ping interval asked of clients
+WS_IDLE_TIMEOUT_SECONDS = WS_HEARTBEAT_SECONDS * 3  # silent this long -> connection treated as dead
+WS_RESUME_SECONDS = float(os.getenv("WS_RESUME_SECONDS", "30"))
+WS_RESUME_BUFFER_BYTES = int(os.getenv("WS_RESUME_BUFFER_BYTES", str(8 * 2 ** 20)))  # unacknowledged frames kept
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+def parse_hello(message: dict):
+    # The v1 hello frame, or None for a legacy client
+    text = message.get("text")
+    if not text or not text.startswith("{"):
+        return None
+    try:
+        frame = json.loads(text)
+    except ValueError:
+        return None
+    return frame if isinstance(frame, dict) and frame.get("type") == "hello" else None
+
+
+def parse_client_frame(data: bytes):
+    try:
+        header, payload = decode_frame(data)
+    except ValueError as e:
+        raise ProtocolError(f"bad binary frame: {e}")
+    if header.get("type") not in ("pcm", "clip"):
+        raise ProtocolError(f"unknown binary frame type {header.get('type')!r}")
+    return header, payload
+
+
+# === Reply channels ===
+# Turn code talks to the client through a channel rather than the socket, so one pipeline
+# serves both formats: event() for typed JSON frames, message()/error() for chat text,
+# audio_chunk() inside audio_start/audio_end, audio_clip() for a whole MP3 reply, cancelled()
+# after a barge-in.
+class LegacyChannel:
+    def __init__(self, websocket):
+        self.websocket = websocket
+
+    async def _send(self, data):
+        with span("send"):
+            if isinstance(data, bytes):
+                await self.websocket.send_bytes(data)
+            else:
+                await self.websocket.send_text(data)
+
+    async def event(self, type: str, **fields):
+        await self._send(json.dumps({"type": type, **fields}))
+
+    async def message(self, text: str):
+        await self._send(text)
+
+    async def error(self, text: str, **fields):
+        await self._send(text)  # legacy clients show errors as ordinary replies
+
+    async def audio_chunk(self, chunk: bytes):
+        await self._send(chunk)
+
+    async def audio_clip(self, data: bytes, format: str = "audio/mpeg"):
+        await self._send("__AUDIO__")  # Signal to frontend
+        await self._send(data)
+
+    async def cancelled(self):
+        pass  # old clients render unknown frames as chat replies; the next reply just follows
+
+    async def end(self, outcome: str):
+        pass  # no turn_end frame in the legacy format
+
+
+class TurnChannel:
+    def __init__(self, session, turn: str):
+        self.session = session
+        self.turn = turn
+
+    async def event(self, type: str, **fields):
+        await self.session.send({"type": type, "turn": self.turn, **fields})
+
+    async def message(self, text: str):
+        await self.event("message", payload=text)
+
+    async def error(self, text: str, **fields):
+        await self.event("error", payload=text, **fields)
+
+    async def audio_chunk(self, chunk: bytes):
+        await self.session.send({"type": "audio", "turn": self.turn}, chunk)
+
+    async def audio_clip(self, data: bytes, format: str = "audio/mpeg"):
+        await self.event("audio_start", format=format)
+        await self.audio_chunk(data)
+        await self.event("audio_end")
+
+    async def cancelled(self):
+        await self.event("cancelled")
+
+    async def end(self, outcome: str):
+        await self.event("turn_end", outcome=outcome)
+
+
+# === Resumable session ===
+# Outlives its WebSocket: the turn manager, reply settings and the replay buffer stay here while
+# the client reconnects. Sends never raise on a dropped connection -- the frame is buffered and
+# goes out on resume -- so an in-flight reply is not lost to a brief disconnect.
+class ProtocolSession:
+    def __init__(self, session_id: str):
+        self.token = uuid.uuid4().hex
+        self.session_id = session_id  # memory namespace
+        self.websocket = None
+        self.turns = None  # TurnManager, attached by ws_routes
+        self.on_close = None  # async cleanup once the session expires, attached by ws_routes
+        self.stream = None  # live recording, if any (not resumable)
+        self.response_mode = "audio"
+        self.stream_reply = True
+
+        self.seq = 0
+        self._buffer = deque()  # (seq, wire data) not yet acknowledged
+        self._buffered_bytes = 0
+        self._lock = asyncio.Lock()
+        self._expiry = None
+
+    def channel(self, turn: str) -> TurnChannel:
+        return TurnChannel(self, turn)
+
+    async def send(self, frame: dict, payload: bytes = None):
+        async with self._lock:
+            self.seq += 1
+            frame["seq"] = self.seq
+            data = encode_frame(frame, payload) if payload is not None else json.dumps(frame)
+            self._buffer.append((self.seq, data))
+            self._buffered_bytes += len(data)
+            while self._buffered_bytes > WS_RESUME_BUFFER_BYTES and len(self._buffer) > 1:
+                self._buffered_bytes -= len(self._buffer.popleft()[1])
+            await self._write(data)
+
+    async def send_control(self, frame: dict):
+        # Connection-level frames (welcome, pong, protocol errors): not sequenced or replayed
+        async with self._lock:
+            await self._write(json.dumps(frame))
+
+    async def _write(self, data):
+        websocket = self.websocket
+        if websocket is None:
+            return
+        try:
+            with span("send"):
+                if isinstance(data, bytes):
+                    await websocket.send_bytes(data)
+                else:
+                    await websocket.send_text(data)
+        except Exception:
+            pass  # connection dropping; the receive loop detaches it and the frame waits in the buffer
+
+    def ack(self, seq: int):
+        while self._buffer and self._buffer[0][0] <= seq:
+            self._buffered_bytes -= len(self._buffer.popleft()[1])
+
+    async def attach(self, websocket, last_seq: int = None):
+        # Welcome first, then whatever the client missed since last_seq, then live frames
+        if self._expiry is not None:
+            self._expiry.cancel()
+            self._expiry = None
+        resumed = last_seq is not None
+        if resumed:
+            self.ack(last_seq)
+            totals["resumed"] += 1
+        async with self._lock:
+            self.websocket = websocket
+            gap = resumed and self.seq > last_seq and (not self._buffer or self._buffer[0][0] > last_seq + 1)
+            await self._write(json.dumps({
+                "type": "welcome", "v": WS_PROTOCOL_VERSION, "session": self.token, "resumed": resumed,
+                "replayed": len(self._buffer), "gap": gap, "heartbeat": WS_HEARTBEAT_SECONDS,
+            }))
+            for _, data in list(self._buffer):
+                await self._write(data)
+            totals["replayed_frames"] += len(self._buffer)
+
+    def detach(self, websocket):
+        if self.websocket is not websocket:
+            return  # already taken over by a resumed connection
+        self.websocket = None
+        if self.stream is not None:
+            self.stream.close()  # a live recording can't be resumed; the client starts a new one
+            self.stream = None
+        self._expiry = asyncio.create_task(self._expire())
+
+    async def _expire(self):
+        await asyncio.sleep(WS_RESUME_SECONDS)
+        sessions.pop(self.token, None)
+        totals["expired"] += 1
+        if self.turns is not None:
+            await self.turns.close()
+        if self.on_close is not None:
+            await self.on_close()
+        print(f"[🔌 Session {self.token[:8]}] Not resumed within {WS_RESUME_SECONDS:g}s, closed")
+
+
+# Resumable sessions by token (per process: a resume must reach the same worker)
+sessions = {}
+totals = {"opened": 0, "resumed": 0, "expired": 0, "replayed_frames": 0}
+
+
+def open_session(session_id: str) -> ProtocolSession:
+    session = ProtocolSession(session_id)
+    sessions[session.token] = session
+    totals["opened"] += 1
+    return session
+
+
+def protocol_stats() -> dict:
+    return {
+        "sessions": len(sessions),
+        "attached": sum(1 for session in sessions.values() if session.websocket is not None),
+        "buffered_bytes": sum(session._buffered_bytes for session in sessions.values()),
+        **totals,
+    }
+
+
+def collect_protocol_metrics() -> list:
+    stats = protocol_stats()
+    return [
+        ("ws_sessions", "gauge", "Protocol v1 sessions by connection state", {
+            (("state", "attached"),): stats["attached"],
+            (("state", "awaiting_resume"),): stats["sessions"] - stats["attached"],
+        }),
+        ("ws_resume_buffer_bytes", "gauge", "Unacknowledged reply frames kept for resume", {(): stats["buffered_bytes"]}),
+        ("ws_session_events_total", "counter", "Protocol v1 sessions opened, resumed and expired",
+         {(("event", event),): stats[event] for event in ("opened", "resumed", "expired")}),
+    ]
+
+
+metrics.register_collector(collect_protocol_metrics)
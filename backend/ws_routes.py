@@ -1,46 +1,442 @@
 from fastapi import APIRouter, WebSocket
 from starlette.websockets import WebSocketDisconnect
 import os
-import tempfile
 import json
-from io import BytesIO
+import asyncio
 import uuid
-
-from backend.phiagent2_groq import run_agent  # Your core logic handler (email/calendar)
-from elevenlabs import generate, set_api_key
-import whisper
+import itertools
+import functools
+
+from backend.phiagent2_groq import run_agent, run_agent_stream, run_agent_cached, run_agent_stream_cached  # Your core logic handler (email/calendar)
+from backend.reply_cache import reply_cache, context_scope
+from backend.asr import TranscriptionQueueFull
+from backend.models import registry
+from backend.memory_store import estimate_importance, anonymous_namespace, is_anonymous
+from backend.model_host import MODEL_HOST_SOCKET, ModelHostClient, create_model_services
+from backend.audio_ingest import audio_ingest, AudioDecodeError
+from backend.streaming_asr import StreamingRecognizer, STREAM_SAMPLE_RATE
+from backend.tts import synthesize_stream, synthesize_text, sentences_from_deltas, tts_cache
+from backend.metrics import metrics, span, observe_stage, Trace
+from backend.admission import Overloaded
+from backend.ws_protocol import (WS_PROTOCOL_VERSION, WS_IDLE_TIMEOUT_SECONDS, WS_RESUME_SECONDS, ProtocolError,
+                                 ProtocolSession, LegacyChannel, sessions, open_session, parse_hello, parse_client_frame)
+from elevenlabs import set_api_key
 from dotenv import load_dotenv
 
-import chromadb
-from sentence_transformers import SentenceTransformer
-
 # === Load environment variables from .env ===
 load_dotenv()
 
+# When a new turn interrupts the one in flight on a connection:
+#   "speech"    - as soon as the VAD hears the user start talking (or a new recording starts)
+#   "utterance" - only once the new utterance/text is complete
+#   "off"       - never; turns wait for each other in order
+BARGE_IN = os.getenv("BARGE_IN", "speech")
+
+BUSY_REPLIES = {
+    "asr": "⏳ Server is busy transcribing, please try again in a moment.",
+    "llm": "⏳ Server is busy thinking, please try again in a moment.",
+    "tts": "⏳ Server is busy speaking, please try again in a moment.",
+}
+
 # === Setup FastAPI WebSocket router ===
 router = APIRouter()
 
 # === ElevenLabs + Whisper setup ===
 set_api_key(os.getenv("ELEVENLABS_API_KEY"))
-whisper_model = whisper.load_model("base")
+if MODEL_HOST_SOCKET:
+    # Whisper, the sentence encoder and the memory store live in a shared model host process
+    # (see backend/model_host.py); this worker only holds a socket to it. The registry entries
+    # report "loaded" once the host has loaded them, so /readyz keeps working.
+    model_host = ModelHostClient(MODEL_HOST_SOCKET)
+    whisper_model, embedding_service, memory_store = model_host.transcriber, model_host.embedder, model_host.memory
+    for name in ("asr", "embedder", "memory"):
+        registry.register(name, functools.partial(model_host.load, name))
+else:
+    # Whisper runs in a pool of off-loop workers (see backend/asr.py), sized via ASR_* env vars.
+    # Nothing heavy is loaded at import: models come from the registry on first use or startup warmup.
+    # All connections share one batched, cached encoder and one Chroma memory store.
+    model_host = None
+    whisper_model, embedding_service, memory_store = create_model_services(registry)
+# The encoder also lets the reply cache match paraphrased questions, not just identical ones
+reply_cache.embed = embedding_service.encode
+
+
+# === Scrape-time metrics for the voice stack (see backend/metrics.py) ===
+def collect_voice_metrics() -> list:
+    asr = whisper_model.stats()
+    embeddings = embedding_service.stats()
+    tts = tts_cache.stats()
+    ingest = audio_ingest.stats()
+    return [
+        ("asr_queue_depth", "gauge", "Clips waiting for a Whisper worker", {(): asr["queue_depth"]}),
+        ("asr_rejected_total", "counter", "Clips rejected because the ASR queue was full", {(): asr["rejected"]}),
+        ("asr_batches_total", "counter", "Whisper dispatches (a batch may hold several clips)", {(): asr["batches"]}),
+        ("audio_decoded_total", "counter", "Uploaded clips decoded in memory, by decoder",
+         {(("decoder", name),): count for name, count in ingest["decoded"].items()}),
+        ("audio_rejected_total", "counter", "Uploaded clips that never reached ASR, by reason", {
+            **{(("reason", reason),): count for reason, count in ingest["rejected"].items()},
+            (("reason", "decode_failed"),): ingest["failed"],
+        }),
+        ("embedding_queue_depth", "gauge", "Texts waiting for the sentence encoder", {(): embeddings["queue_depth"]}),
+        ("cache_lookups_total", "counter", "Cache lookups by cache and result", {
+            (("cache", "embedding"), ("result", "hit")): embeddings["cache_hits"],
+            (("cache", "embedding"), ("result", "miss")): embeddings["cache_misses"],
+            (("cache", "tts"), ("result", "memory_hit")): tts["memory_hits"],
+            (("cache", "tts"), ("result", "disk_hit")): tts["disk_hits"],
+            (("cache", "tts"), ("result", "miss")): tts["misses"],
+        }),
+        ("tts_cache_disk_bytes", "gauge", "Synthesized audio kept in the on-disk TTS cache",
+         {(): tts["disk_bytes"] or 0}),
+        ("memory_entries_loaded", "gauge", "Conversation memory entries in loaded namespaces",
+         {(): memory_store.stats()["entries_loaded"]}),
+        ("model_loaded", "gauge", "Whether a registry model is loaded",
+         {(("model", name),): int(status["loaded"]) for name, status in registry.status().items()}),
+    ]
+
+
+metrics.register_collector(collect_voice_metrics)
+
+
+# === Shared turn pipeline: memory lookup -> LLM -> reply (text or audio) -> memory store ===
+# Used by the text path, the whole-clip audio path and the streaming audio path. Typed text turns
+# go through the reply cache; transcripts don't, since a mis-heard word could match the wrong entry.
+async def handle_user_turn(channel, session_id: str, user_input: str, response_mode: str,
+                           stream_reply: bool = False, use_cache: bool = False):
+    # === Step 1: Retrieve related past memory from this session's namespace ===
+    with span("embedding"):
+        embedding = await embedding_service.encode(user_input)
+    try:
+        with span("chroma_query"):
+            past_context = "\n".join(await memory_store.query(session_id, embedding, n_results=3))
+    except Exception as e:
+        print("[⚠️ Chroma Retrieval Error]:", e)
+        past_context = ""
+
+    # Combine retrieved memory with user input
+    full_input = f"Prior context:\n{past_context}\n\nUser: {user_input}" if past_context else user_input
+    # A reply that saw this session's memory may only be replayed to this session, with this context
+    cache_scope = context_scope(session_id, past_context)
+
+    # === Step 2: Get reply from LLM agent and send it (text or audio) ===
+    if stream_reply:
+        parts = []
+
+        async def reply_deltas():
+            deltas = (run_agent_stream_cached(user_input, full_input, cache_scope) if use_cache
+                      else run_agent_stream(full_input))
+            async for delta in deltas:
+                parts.append(delta)
+                if response_mode == "text":
+                    await channel.event("delta", payload=delta)
+                yield delta
+
+        if response_mode == "text":
+            # Forward deltas as Groq generates them, then a final frame with the whole reply
+            async for _ in reply_deltas():
+                pass
+            reply_text = "".join(parts)
+            await channel.event("done", payload=reply_text)
+        else:
+            # Sentences are synthesized as soon as the LLM finishes them, audio chunks sent as they arrive
+            await send_audio_stream(channel, synthesize_stream(sentences_from_deltas(reply_deltas())))
+            reply_text = "".join(parts)
+    else:
+        if use_cache:
+            reply_text = await run_agent_cached(user_input, full_input, cache_scope)
+        else:
+            reply_text = await run_agent(full_input)
+        if response_mode == "text":
+            await channel.message(reply_text)
+        else:
+            await channel.audio_clip(await synthesize_text(reply_text))
+    print("[🤖 AI Reply]:", reply_text)
+
+    # === Step 3: Store the new interaction in memory ===
+    # Shielded: the reply has gone out, so a barge-in from here on must not drop it from memory
+    write = asyncio.ensure_future(remember_turn(session_id, user_input, reply_text))
+    if is_anonymous(session_id):
+        pending = memory_writes.setdefault(session_id, set())
+        pending.add(write)
+        write.add_done_callback(pending.discard)
+    await asyncio.shield(write)
+
+
+# Shielded memory writes still running for throwaway namespaces, finished before they are forgotten
+memory_writes = {}
+
+
+async def remember_turn(session_id: str, user_input: str, reply_text: str):
+    try:
+        combined = f"User: {user_input}\nAI: {reply_text}"
+        with span("embedding"):
+            memory_embedding = await embedding_service.encode(combined)
+        with span("chroma_add"):
+            await memory_store.add(session_id, combined, memory_embedding, estimate_importance(user_input, reply_text))
+    except Exception as e:
+        print("[⚠️ Chroma Store Error]:", e)
+
+
+# === Progressive audio framing ===
+# {type: audio_start} -> binary MP3 chunks as they're synthesized -> {type: audio_end}
+async def send_audio_stream(channel, chunks):
+    await channel.event("audio_start", format="audio/mpeg")
+    try:
+        async for chunk in chunks:
+            await channel.audio_chunk(chunk)
+    finally:
+        await channel.event("audio_end")
+
+
+# === Streaming input: partial transcripts while the user is still talking ===
+async def send_partial_transcript(channel, recognizer: StreamingRecognizer, audio):
+    # Runs as a detached task, so every failure is logged and the partial dropped here
+    try:
+        with span("asr_partial"):
+            result = await whisper_model.transcribe(audio)
+        text = result["text"].strip()
+        # Only show it if the utterance is still open (the final transcript supersedes it)
+        if text and recognizer.in_speech:
+            await channel.event("partial", payload=text)
+    except TranscriptionQueueFull:
+        pass  # partials are best-effort; the final transcript still gets its turn
+    except Exception as e:
+        print("[⚠️ Partial Transcript Error]:", e)
+
+
+async def finish_streamed_utterance(channel, session_id: str, audio, response_mode: str,
+                                    stream_reply: bool = False):
+    duration = len(audio) / STREAM_SAMPLE_RATE
+    try:
+        with span("asr"):
+            result = await whisper_model.transcribe(audio)
+        observe_stage("asr_queue", result["queue_wait"])
+    except TranscriptionQueueFull as e:
+        print("[⚠️ ASR Overloaded]:", e)
+        await channel.error(BUSY_REPLIES["asr"], code="busy", stage="asr")
+        return
+    user_input = result["text"].strip()
+    print(f"[🧠 Streamed Utterance] {duration:.1f}s, final ASR {result['inference_time'] * 1000:.0f} ms:", user_input)
+
+    if not user_input:
+        return  # VAD fired on noise; nothing to answer
+
+    # Final transcript first, then start the LLM right away
+    await channel.event("transcript", payload=user_input)
+    await handle_user_turn(channel, session_id, user_input, response_mode, stream_reply)
+
+
+async def transcribe_clip_turn(channel, session_id: str, binary_data: bytes, response_mode: str,
+                              stream_reply: bool = False):
+    print(f"[🎤 Audio Received] Bytes: {len(binary_data)}")
+
+    # Decode to 16 kHz float32 in memory; silent or too-short clips never reach Whisper
+    try:
+        with span("audio_decode"):
+            clip = await audio_ingest.decode(binary_data)
+    except AudioDecodeError as e:
+        print("[⚠️ Audio Decode Error]:", e)
+        await channel.error("❌ Could not decode audio.")
+        return
+    if clip["rejected"]:
+        print(f"[🔇 Audio Rejected] {clip['duration']:.1f}s clip, {clip['rejected']}")
+        await channel.error("❌ Could not understand audio.")
+        return
+
+    # Transcribe using Whisper (queued to the worker pool, off the event loop)
+    try:
+        with span("asr"):
+            result = await whisper_model.transcribe(clip["audio"])
+        observe_stage("asr_queue", result["queue_wait"])
+    except TranscriptionQueueFull as e:
+        print("[⚠️ ASR Overloaded]:", e)
+        await channel.error(BUSY_REPLIES["asr"], code="busy", stage="asr")
+        return
+    except Exception as e:
+        print("[Whisper Transcription Error]:", e)
+        await channel.error("❌ Whisper failed to transcribe audio.")
+        return
+
+    user_input = result["text"]
+    print(f"[🧠 Transcribed] {clip['duration']:.1f}s {clip['decoder']} clip, decode {clip['decode_time'] * 1000:.0f} ms, "
+          f"ASR {result['inference_time'] * 1000:.0f} ms (queued {result['queue_wait'] * 1000:.0f} ms, "
+          f"batch of {result['batch_size']}):", user_input)
+
+    if not user_input.strip():
+        await channel.error("❌ Could not understand audio.")
+        return
+
+    await handle_user_turn(channel, session_id, user_input, response_mode, stream_reply)
+
+
+# === Per-connection turn management ===
+# Each turn runs as its own task so the receive loop keeps reading while a reply is generated;
+# that is what lets a new utterance interrupt a stale one (barge-in) instead of queueing behind
+# it. Turns started with interrupt=True cancel whatever is in flight (or, with BARGE_IN=off,
+# queue behind it: the new turn's task waits for the ones in flight before starting, so the
+# receive loop -- and a v1 client's heartbeat -- is never blocked by a long reply). Legacy
+# connections thus run at most one turn at a time; protocol v1 text turns may run side by side
+# under their own ids. Every turn is traced as <connection id>:<number>.
+class TurnManager:
+    def __init__(self, connection_id: str):
+        self.connection_id = connection_id
+        self._numbers = itertools.count(1)
+        self._turns = {}  # turn id -> (task, channel)
+
+    @property
+    def busy(self) -> bool:
+        return any(not task.done() for task, _ in self._turns.values())
+
+    async def start(self, channel, path: str, work, error_reply: str, turn: str = None, interrupt: bool = True):
+        # `work` is a coroutine function running the whole turn; replies go out through `channel`
+        number = next(self._numbers)
+        turn = turn or str(number)
+        if turn in self._turns:
+            await self.interrupt(turn)  # a client reusing a turn id replaces that turn
+        after = []
+        if interrupt:
+            if BARGE_IN == "off":
+                after = [task for task, _ in self._turns.values() if not task.done()]
+            else:
+                await self.interrupt()
+        task = asyncio.create_task(self._run(number, path, channel, work, error_reply, after))
+        self._turns[turn] = (task, channel)
+        task.add_done_callback(functools.partial(self._forget, turn))
+
+    def _forget(self, turn: str, task):
+        if self._turns.get(turn, (None,))[0] is task:
+            del self._turns[turn]
+
+    async def interrupt(self, turn: str = None) -> bool:
+        # Cancels the turn(s) in flight and tells the client to drop what it was playing
+        targets = [(task, channel) for key, (task, channel) in list(self._turns.items())
+                   if (turn is None or key == turn) and not task.done()]
+        if not targets:
+            return False
+        print(f"[✋ Barge-in] Cancelling {len(targets)} turn(s) of {self.connection_id} in flight")
+        for task, _ in targets:
+            task.cancel()
+        await asyncio.wait([task for task, _ in targets])
+        for _, channel in targets:
+            await channel.cancelled()
+        return True
+
+    async def _run(self, number: int, path: str, channel, work, error_reply: str, after=()):
+        if after:
+            await asyncio.wait(after)  # queued behind the turns in flight (BARGE_IN=off)
+        trace = Trace(path, self.connection_id, number)
+        try:
+            with trace:
+                await work()
+            outcome = "ok"
+        except Overloaded as e:
+            print(f"[⚠️ Overloaded] {e.stage}:", e)
+            await self._reply(channel, BUSY_REPLIES.get(e.stage, "⏳ Server is busy, please try again in a moment."),
+                              code="busy", stage=e.stage)
+            outcome = "busy"
+        except WebSocketDisconnect:
+            return  # the receive loop sees the disconnect too
+        except Exception as e:
+            print(f"[⚠️ Turn Error] {trace.path}:", e)
+            await self._reply(channel, error_reply)
+            outcome = "error"
+        try:
+            await channel.end(outcome)
+        except Exception:
+            pass  # connection already gone
 
-# === ChromaDB Memory Store ===
-client = chromadb.Client()
-collection = client.get_or_create_collection("neura_memory")
-embedder = SentenceTransformer("all-MiniLM-L6-v2")  # Lightweight and fast sentence encoder
+    async def _reply(self, channel, text: str, **fields):
+        try:
+            await channel.error(text, **fields)
+        except Exception:
+            pass  # connection already gone
+
+    async def close(self):
+        if self.busy:
+            tasks = [task for task, _ in self._turns.values()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.wait(tasks)
+
+
+# === Streamed microphone input, shared by both protocols ===
+# Feeds PCM to the VAD, interrupts the reply in flight when the user starts talking, starts a
+# turn per finished utterance and schedules partial transcripts when ASR is idle.
+class AudioStream:
+    def __init__(self, sample_rate: int, stream_id: str = "stream"):
+        self.recognizer = StreamingRecognizer(sample_rate)
+        self.stream_id = stream_id
+        self.utterances = 0
+        self.partial_task = None
+
+    def next_turn(self) -> str:
+        return f"{self.stream_id}-{self.utterances + 1}"
+
+    async def feed(self, data: bytes, turns: TurnManager, start_utterance, channel_for):
+        # start_utterance(audio) starts a turn; channel_for(turn id) is where partials for it go
+        was_speaking = self.recognizer.in_speech
+        utterances = self.recognizer.feed(data)
+        if BARGE_IN == "speech" and not was_speaking and (self.recognizer.in_speech or utterances):
+            await turns.interrupt()  # the user started talking over the reply
+        for audio in utterances:
+            await start_utterance(audio)
+
+        # Partial transcript, only when nothing else is queued for ASR
+        if (self.recognizer.partial_due() and (self.partial_task is None or self.partial_task.done())
+                and whisper_model.stats()["queue_depth"] == 0):
+            self.partial_task = asyncio.create_task(
+                send_partial_transcript(channel_for(self.next_turn()), self.recognizer, self.recognizer.partial_audio())
+            )
+
+    def close(self):
+        if self.partial_task is not None:
+            self.partial_task.cancel()
 
 
 @router.websocket("/ws/audio")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
-    print("✅ WebSocket connected")
+    # Memory namespace: the client's persistent ?session= id, or a throwaway in-memory one for this connection
+    session_id = websocket.query_params.get("session") or anonymous_namespace()
+    print(f"✅ WebSocket connected (session {session_id})")
+
+    # The first message decides the protocol: a v1 hello, or anything a legacy client sends
+    try:
+        first = await websocket.receive()
+    except WebSocketDisconnect:
+        return
+    hello = parse_hello(first)
+    if hello is not None:
+        await serve_protocol(websocket, session_id, hello)
+    else:
+        await serve_legacy(websocket, session_id, first)
+
+
+async def forget_anonymous(session_id: str):
+    # A throwaway namespace can never be reached again once its connection/session is gone
+    if is_anonymous(session_id):
+        try:
+            await asyncio.gather(*memory_writes.pop(session_id, ()))
+            await memory_store.forget(session_id)
+        except Exception as e:
+            print("[⚠️ Memory Cleanup Error]:", e)
+
+
+# === Legacy format: one socket per conversation, "__AUDIO__" sentinel before MP3 replies ===
+async def serve_legacy(websocket: WebSocket, session_id: str, first: dict):
+    turns = TurnManager(uuid.uuid4().hex[:8])
+    channel = LegacyChannel(websocket)
 
     response_mode = "audio"  # Default to audio response unless changed
+    stream_reply = False  # Clients opt in to delta / progressive audio frames via the mode frame
+    stream = None  # Set while the client is streaming PCM frames
+    pending = first
 
     try:
         while True:
             # Wait for either text or binary (audio) message from frontend
-            data = await websocket.receive()
+            data, pending = pending or await websocket.receive(), None
+            if data.get("type") == "websocket.disconnect":
+                raise WebSocketDisconnect(data.get("code", 1000))
             text_data = data.get("text", None)
             binary_data = data.get("bytes", None)
 
@@ -52,140 +448,59 @@ async def websocket_endpoint(websocket: WebSocket):
                     if payload.get("type") == "mode":
                         # Switch between 'text' and 'audio' output mode
                         response_mode = payload["payload"]
-                        print(f"[📍 Mode Switched]: {response_mode}")
+                        stream_reply = bool(payload.get("stream", False))
+                        print(f"[📍 Mode Switched]: {response_mode}{' (streaming)' if stream_reply else ''}")
+
+                    elif payload.get("type") == "stream_start":
+                        # Client will now send small 16-bit PCM frames while recording
+                        if BARGE_IN == "speech":
+                            await turns.interrupt()
+                        options = payload.get("payload") or {}
+                        stream = AudioStream(int(options.get("sample_rate", STREAM_SAMPLE_RATE)))
+                        print(f"[🎙️ Stream Started] {stream.recognizer.sample_rate} Hz")
+
+                    elif payload.get("type") == "stream_end":
+                        if stream is not None:
+                            audio = stream.recognizer.flush()
+                            stream.close()
+                            stream = None
+                            if audio is not None:
+                                await turns.start(channel, "ws_audio", functools.partial(
+                                    finish_streamed_utterance, channel, session_id, audio, response_mode, stream_reply
+                                ), "Error processing audio input.")
+                        print("[🎙️ Stream Ended]")
 
                     elif payload.get("type") == "text":
                         user_input = payload["payload"]
                         print("[📝 User Text]:", user_input)
-
-                        # === Step 1: Retrieve related past memory from Chroma ===
-                        embedding = embedder.encode([user_input])[0]
-                        try:
-                            results = collection.query(query_embeddings=[embedding], n_results=3)
-                            past_context = "\n".join(results["documents"][0])
-                        except Exception as e:
-                            print("[⚠️ Chroma Retrieval Error]:", e)
-                            past_context = ""
-
-                        # Combine retrieved memory with user input
-                        full_input = f"Prior context:\n{past_context}\n\nUser: {user_input}" if past_context else user_input
-
-                        # === Step 2: Get reply from LLM agent ===
-                        reply_text = await run_agent(full_input)
-                        print("[🤖 AI Reply]:", reply_text)
-
-                        # === Step 3: Store the new interaction in memory ===
-                        try:
-                            combined = f"User: {user_input}\nAI: {reply_text}"
-                            memory_id = str(uuid.uuid4())
-                            memory_embedding = embedder.encode([combined])[0]
-                            collection.add(documents=[combined], embeddings=[memory_embedding], ids=[memory_id])
-                        except Exception as e:
-                            print("[⚠️ Chroma Store Error]:", e)
-
-                        # === Step 4: Send reply (text or audio) ===
-                        if response_mode == "text":
-                            await websocket.send_text(reply_text)
-                        else:
-                            audio_output = generate(
-                                text=reply_text,
-                                voice="Sarah",
-                                model="eleven_monolingual_v1"
-                            )
-
-                            # Convert audio generator into bytes
-                            audio_bytes = BytesIO()
-                            for chunk in audio_output:
-                                if isinstance(chunk, bytes):
-                                    audio_bytes.write(chunk)
-                                elif isinstance(chunk, int):
-                                    audio_bytes.write(bytes([chunk]))
-
-                            await websocket.send_text("__AUDIO__")  # Signal to frontend
-                            await websocket.send_bytes(audio_bytes.getvalue())
+                        await turns.start(channel, "ws_text", functools.partial(
+                            handle_user_turn, channel, session_id, user_input, response_mode, stream_reply,
+                            use_cache=True
+                        ), "Error handling text message.")
 
                 except Exception as e:
                     print("[⚠️ Text Handling Error]:", e)
                     await websocket.send_text("Error handling text message.")
 
-            # === Handle AUDIO input ===
-            elif binary_data is not None:
-                try:
-                    print(f"[🎤 Audio Received] Bytes: {len(binary_data)}")
-
-                    # Save incoming audio to a temporary WAV file
-                    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as tmp:
-                        tmp.write(binary_data)
-                        tmp_path = tmp.name
-
-                    print("[DEBUG] Temp file size:", os.path.getsize(tmp_path))
-
-                    # Transcribe using Whisper
-                    try:
-                        result = whisper_model.transcribe(tmp_path)
-                    except Exception as e:
-                        print("[Whisper Transcription Error]:", e)
-                        os.remove(tmp_path)
-                        await websocket.send_text("❌ Whisper failed to transcribe audio.")
-                        continue
-
-                    os.remove(tmp_path)  # Clean up temp file
-
-                    user_input = result["text"]
-                    print("[🧠 Transcribed]:", user_input)
-
-                    if not user_input.strip():
-                        await websocket.send_text("❌ Could not understand audio.")
-                        continue
-
-                    # === Step 1: Retrieve relevant memory from Chroma ===
-                    embedding = embedder.encode([user_input])[0]
-                    try:
-                        results = collection.query(query_embeddings=[embedding], n_results=3)
-                        past_context = "\n".join(results["documents"][0])
-                    except Exception as e:
-                        print("[⚠️ Chroma Retrieval Error]:", e)
-                        past_context = ""
-
-                    full_input = f"Prior context:\n{past_context}\n\nUser: {user_input}" if past_context else user_input
-
-                    # === Step 2: Get AI reply from agent ===
-                    reply_text = await run_agent(full_input)
-                    print("[🤖 AI Reply]:", reply_text)
-
-                    # === Step 3: Store memory ===
-                    try:
-                        combined = f"User: {user_input}\nAI: {reply_text}"
-                        memory_id = str(uuid.uuid4())
-                        memory_embedding = embedder.encode([combined])[0]
-                        collection.add(documents=[combined], embeddings=[memory_embedding], ids=[memory_id])
-                    except Exception as e:
-                        print("[⚠️ Chroma Store Error]:", e)
-
-                    # === Step 4: Reply in requested format ===
-                    if response_mode == "text":
-                        await websocket.send_text(reply_text)
-                    else:
-                        audio_output = generate(
-                            text=reply_text,
-                            voice="Sarah",
-                            model="eleven_monolingual_v1"
-                        )
-
-                        audio_bytes = BytesIO()
-                        for chunk in audio_output:
-                            if isinstance(chunk, bytes):
-                                audio_bytes.write(chunk)
-                            elif isinstance(chunk, int):
-                                audio_bytes.write(bytes([chunk]))
-
-                        await websocket.send_text("__AUDIO__")
-                        await websocket.send_bytes(audio_bytes.getvalue())
+            # === Handle streamed AUDIO frames ===
+            elif binary_data is not None and stream is not None:
+                async def start_utterance(audio):
+                    await turns.start(channel, "ws_audio", functools.partial(
+                        finish_streamed_utterance, channel, session_id, audio, response_mode, stream_reply
+                    ), "Error processing audio input.")
 
+                try:
+                    await stream.feed(binary_data, turns, start_utterance, lambda turn: channel)
                 except Exception as e:
-                    print("[⚠️ Audio Processing Error]:", e)
+                    print("[⚠️ Audio Stream Error]:", e)
                     await websocket.send_text("Error processing audio input.")
 
+            # === Handle whole-clip AUDIO input ===
+            elif binary_data is not None:
+                await turns.start(channel, "ws_audio_clip", functools.partial(
+                    transcribe_clip_turn, channel, session_id, binary_data, response_mode, stream_reply
+                ), "Error processing audio input.")
+
             else:
                 print("[⚠️ Unexpected WebSocket message format]:", data)
 
@@ -202,4 +517,125 @@ async def websocket_endpoint(websocket: WebSocket):
             pass
 
     finally:
+        if stream is not None:
+            stream.close()
+        await turns.close()
+        await forget_anonymous(session_id)
         print("🛑 WebSocket connection closed")
+
+
+# === Protocol v1: one long-lived, resumable connection multiplexing many turns ===
+# (frame reference in backend/ws_protocol.py)
+async def serve_protocol(websocket: WebSocket, session_id: str, hello: dict):
+    session = sessions.get(hello.get("resume") or "")
+    resumed = session is not None
+    if not resumed:
+        session = open_session(session_id)
+        session.turns = TurnManager(session.token[:8])
+        session.on_close = functools.partial(forget_anonymous, session_id)
+    if "mode" in hello:
+        session.response_mode = hello["mode"]
+    session.stream_reply = bool(hello.get("stream", session.stream_reply))
+    await session.attach(websocket, int(hello.get("last_seq") or 0) if resumed else None)
+    print(f"[🔗 Session {session.token[:8]}] {'Resumed' if resumed else 'Opened'} (protocol v{WS_PROTOCOL_VERSION})")
+
+    try:
+        while True:
+            try:
+                data = await asyncio.wait_for(websocket.receive(), WS_IDLE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                print(f"[💤 Session {session.token[:8]}] No heartbeat for {WS_IDLE_TIMEOUT_SECONDS:g}s, dropping connection")
+                await websocket.close(code=1001)
+                break
+            if data.get("type") == "websocket.disconnect":
+                break
+            try:
+                if data.get("text") is not None:
+                    frame = json.loads(data["text"])
+                    if not isinstance(frame, dict):
+                        raise ProtocolError("control frames must be JSON objects")
+                    await handle_protocol_message(session, frame)
+                elif data.get("bytes") is not None:
+                    header, payload = parse_client_frame(data["bytes"])
+                    await handle_protocol_audio(session, header, payload)
+            except (ProtocolError, ValueError, KeyError) as e:
+                print("[⚠️ Protocol Error]:", e)
+                await session.send_control({"type": "error", "payload": f"Bad frame: {e}"})
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print("[❌ Unexpected Server Error]:", e)
+    finally:
+        # Turns keep running (and buffering their replies) until the client resumes or the grace period ends
+        session.detach(websocket)
+        print(f"[🔌 Session {session.token[:8]}] Connection closed, resumable for {WS_RESUME_SECONDS:g}s")
+
+
+def _start_utterance(session: ProtocolSession, stream: AudioStream):
+    async def start(audio):
+        turn = stream.next_turn()
+        stream.utterances += 1
+        channel = session.channel(turn)
+        await session.turns.start(channel, "ws_audio", functools.partial(
+            finish_streamed_utterance, channel, session.session_id, audio, session.response_mode, session.stream_reply
+        ), "Error processing audio input.", turn=turn)
+    return start
+
+
+async def handle_protocol_message(session: ProtocolSession, frame: dict):
+    kind = frame.get("type")
+    if kind == "ping":
+        session.ack(int(frame.get("ack") or 0))
+        await session.send_control({"type": "pong", "last_seq": session.seq})
+
+    elif kind == "mode":
+        session.response_mode = frame["payload"]
+        session.stream_reply = bool(frame.get("stream", session.stream_reply))
+
+    elif kind == "text":
+        turn = str(frame.get("turn") or uuid.uuid4().hex[:8])
+        channel = session.channel(turn)
+        print(f"[📝 User Text] ({turn}):", frame["payload"])
+        await session.turns.start(channel, "ws_text", functools.partial(
+            handle_user_turn, channel, session.session_id, frame["payload"],
+            frame.get("mode", session.response_mode), bool(frame.get("stream", session.stream_reply)), use_cache=True
+        ), "Error handling text message.", turn=turn, interrupt=bool(frame.get("interrupt", False)))
+
+    elif kind == "cancel":
+        await session.turns.interrupt(frame.get("turn"))
+
+    elif kind == "stream_start":
+        if BARGE_IN == "speech":
+            await session.turns.interrupt()
+        if session.stream is not None:
+            session.stream.close()
+        options = frame.get("payload") or {}
+        session.stream = AudioStream(int(options.get("sample_rate", STREAM_SAMPLE_RATE)),
+                                     str(frame.get("stream") or uuid.uuid4().hex[:8]))
+        print(f"[🎙️ Stream Started] {session.stream.recognizer.sample_rate} Hz")
+
+    elif kind == "stream_end":
+        stream, session.stream = session.stream, None
+        if stream is not None:
+            stream.close()
+            audio = stream.recognizer.flush()
+            if audio is not None:
+                await _start_utterance(session, stream)(audio)
+        print("[🎙️ Stream Ended]")
+
+    else:
+        raise ProtocolError(f"unknown frame type {kind!r}")
+
+
+async def handle_protocol_audio(session: ProtocolSession, header: dict, payload: bytes):
+    if header["type"] == "pcm":
+        stream = session.stream
+        if stream is None:
+            raise ProtocolError("pcm frame outside stream_start/stream_end")
+        await stream.feed(payload, session.turns, _start_utterance(session, stream), session.channel)
+    else:
+        turn = str(header.get("turn") or uuid.uuid4().hex[:8])
+        channel = session.channel(turn)
+        await session.turns.start(channel, "ws_audio_clip", functools.partial(
+            transcribe_clip_turn, channel, session.session_id, payload, session.response_mode, session.stream_reply
+        ), "Error processing audio input.", turn=turn)
@@ -1,6 +1,91 @@
 import React, { useState, useRef, useEffect } from "react";
 import "./AudioRecorder.css";
 
+// Persistent per-browser id: the server keeps each session's conversation memory separate
+const getSessionId = () => {
+  let id = localStorage.getItem("neuravoice-session");
+  if (!id) {
+    id = crypto.randomUUID();
+    localStorage.setItem("neuravoice-session", id);
+  }
+  return id;
+};
+
+const socketUrl = () => `ws://localhost:8000/ws/audio?session=${encodeURIComponent(getSessionId())}`;
+
+// /ws/audio protocol v1 (see backend/ws_protocol.py): one long-lived connection, every reply
+// frame tagged with the turn it belongs to and a sequence number used to resume after a drop
+const PROTOCOL_VERSION = 1;
+const RECONNECT_DELAYS_MS = [250, 1000, 2000, 5000];
+
+const newId = () => crypto.randomUUID().slice(0, 8);
+
+// Binary frame: [header length][payload length] (big-endian uint32) + JSON header + payload
+const encodeFrame = (header, payload) => {
+  const headerBytes = new TextEncoder().encode(JSON.stringify(header));
+  const body = new Uint8Array(payload);
+  const frame = new Uint8Array(8 + headerBytes.length + body.length);
+  const view = new DataView(frame.buffer);
+  view.setUint32(0, headerBytes.length);
+  view.setUint32(4, body.length);
+  frame.set(headerBytes, 8);
+  frame.set(body, 8 + headerBytes.length);
+  return frame.buffer;
+};
+
+const decodeFrame = (buffer) => {
+  const view = new DataView(buffer);
+  const headerLength = view.getUint32(0);
+  const payloadLength = view.getUint32(4);
+  const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength)));
+  return { ...header, payload: buffer.slice(8 + headerLength, 8 + headerLength + payloadLength) };
+};
+
+// Replaces the latest bubble of the same turn and sender while it is live, otherwise appends
+const upsertTurnBubble = (prev, bubble, append = false) => {
+  for (let i = prev.length - 1; i >= 0; i--) {
+    const msg = prev[i];
+    if (msg.turn === bubble.turn && msg.sender === bubble.sender) {
+      if (!msg.live) break;
+      const text = append ? msg.text + bubble.text : bubble.text;
+      return [...prev.slice(0, i), { ...bubble, text }, ...prev.slice(i + 1)];
+    }
+  }
+  return [...prev, bubble];
+};
+
+// Closes the live bubbles of one turn (or of every turn)
+const settleTurn = (prev, turn) =>
+  prev.map((msg) => (msg.live && (turn === undefined || msg.turn === turn) ? { ...msg, live: false } : msg));
+
+// Appends queued MP3 chunks to a streaming player's SourceBuffer one at a time
+const feedSourceBuffer = (player) => {
+  const sourceBuffer = player.sourceBuffer;
+  if (!sourceBuffer || sourceBuffer.updating) return;
+  if (player.pending.length) {
+    sourceBuffer.appendBuffer(player.pending.shift());
+  } else if (player.ended && player.mediaSource.readyState === "open") {
+    player.mediaSource.endOfStream();
+  }
+};
+
+// Starts progressive playback of a streamed reply (MediaSource when the browser supports it)
+const createStreamingPlayer = (format) => {
+  const player = { format, chunks: [], pending: [], sourceBuffer: null, ended: false };
+  if (window.MediaSource && MediaSource.isTypeSupported(format)) {
+    const mediaSource = new MediaSource();
+    mediaSource.addEventListener("sourceopen", () => {
+      player.sourceBuffer = mediaSource.addSourceBuffer(format);
+      player.sourceBuffer.addEventListener("updateend", () => feedSourceBuffer(player));
+      feedSourceBuffer(player);
+    });
+    player.mediaSource = mediaSource;
+    player.audio = new Audio(URL.createObjectURL(mediaSource));
+    player.audio.play().catch((err) => console.error("Streaming playback failed:", err));
+  }
+  return player;
+};
+
 // Main Component
 export default function AudioRecorder() {
   // UI State
@@ -11,13 +96,151 @@ export default function AudioRecorder() {
 
   // Refs
   const mediaRecorder = useRef(null); // MediaRecorder instance for audio capture
-  const ws = useRef(null); // WebSocket connection reference
-  const nextIsAudio = useRef(false); // Flag to expect incoming binary audio blob
+  const ws = useRef(null); // The session's WebSocket (replaced on reconnect)
+  const session = useRef({ token: null, lastSeq: 0 }); // What the server needs to resume us
+  const reconnectAttempt = useRef(0);
+  const heartbeat = useRef(null);
+  const players = useRef({}); // Turn id -> player for a reply streamed as audio_start/chunks/audio_end
+  const playingAudio = useRef(null); // Audio element of the latest streamed reply, stopped on barge-in
+  const audioContext = useRef(null); // AudioContext used to stream raw PCM frames while recording
+  const pcmProcessor = useRef(null); // ScriptProcessorNode that forwards mic frames to the socket
+  const micStream = useRef(null); // Stream id of the current recording, if any
+  const responseMode = useRef(aiResponseMode); // Latest mode, for (re)connect handlers
+
+  const send = (data) => {
+    if (ws.current?.readyState !== WebSocket.OPEN) return false;
+    ws.current.send(typeof data === "string" || data instanceof ArrayBuffer ? data : JSON.stringify(data));
+    return true;
+  };
+
+  const startMicStream = (sampleRate) => {
+    micStream.current = newId();
+    send({ type: "stream_start", stream: micStream.current, payload: { sample_rate: sampleRate } });
+  };
+
+  // Handle incoming frames (AI replies, live transcripts, streamed deltas), all tagged with a turn id
+  const handleFrame = (frame) => {
+    // Replayed after a resume: skip anything already handled
+    if (frame.seq !== undefined) {
+      if (frame.seq <= session.current.lastSeq) return;
+      session.current.lastSeq = frame.seq;
+    }
+    const { turn } = frame;
+
+    if (frame.type === "welcome") {
+      if (!frame.resumed) {
+        // New server-side session: turns in flight on the old one are gone
+        session.current.lastSeq = 0;
+        players.current = {};
+        setChat((prev) => settleTurn(prev));
+      }
+      session.current.token = frame.session;
+      if (audioContext.current) startMicStream(audioContext.current.sampleRate); // live audio doesn't resume
+    } else if (frame.type === "partial" || frame.type === "transcript") {
+      // Live transcript of what the user is saying, refined in place
+      setChat((prev) =>
+        upsertTurnBubble(prev, { turn, sender: "user", text: frame.payload, live: frame.type === "partial" })
+      );
+    } else if (frame.type === "delta") {
+      // Next piece of the AI's reply as it is generated
+      setChat((prev) => upsertTurnBubble(prev, { turn, sender: "ai", text: frame.payload, live: true }, true));
+    } else if (frame.type === "done") {
+      setChat((prev) => upsertTurnBubble(prev, { turn, sender: "ai", text: frame.payload, live: false }));
+    } else if (frame.type === "message" || frame.type === "error") {
+      setChat((prev) => [...prev, { turn, sender: "ai", text: frame.payload }]);
+    } else if (frame.type === "audio_start") {
+      players.current[turn] = createStreamingPlayer(frame.format);
+      playingAudio.current = players.current[turn].audio;
+    } else if (frame.type === "audio" && players.current[turn]) {
+      // Chunk of a progressively streamed audio reply
+      const player = players.current[turn];
+      player.chunks.push(frame.payload);
+      player.pending.push(frame.payload);
+      feedSourceBuffer(player);
+    } else if (frame.type === "audio_end" && players.current[turn]) {
+      const player = players.current[turn];
+      delete players.current[turn];
+      player.ended = true;
+      feedSourceBuffer(player);
+
+      // Keep the full reply in the chat for replay; play it now if streaming wasn't possible
+      const audioUrl = URL.createObjectURL(new Blob(player.chunks, { type: player.format }));
+      if (!player.audio) {
+        playingAudio.current = new Audio(audioUrl);
+        playingAudio.current.play().catch(() => {});
+      }
+      setChat((prev) => [...prev, { turn, sender: "ai", audioUrl }]);
+    } else if (frame.type === "cancelled") {
+      // The user interrupted: stop the stale reply and close its live bubbles
+      const player = players.current[turn];
+      delete players.current[turn];
+      (player?.audio || playingAudio.current)?.pause();
+      setChat((prev) => settleTurn(prev, turn));
+    } else if (frame.type === "turn_end") {
+      setChat((prev) => settleTurn(prev, turn));
+    }
+  };
+
+  // One long-lived connection; after a drop, reconnect and resume where the server left off
+  const connect = () => {
+    const socket = new WebSocket(socketUrl());
+    socket.binaryType = "arraybuffer";
+    ws.current = socket;
+
+    socket.onopen = () => {
+      reconnectAttempt.current = 0;
+      const { token, lastSeq } = session.current;
+      socket.send(JSON.stringify({
+        type: "hello", v: PROTOCOL_VERSION, mode: responseMode.current, stream: true,
+        ...(token ? { resume: token, last_seq: lastSeq } : {}),
+      }));
+    };
+
+    socket.onmessage = (event) => {
+      const frame = event.data instanceof ArrayBuffer ? decodeFrame(event.data) : JSON.parse(event.data);
+      if (frame.type === "pong") return;
+      if (frame.type === "welcome") {
+        clearInterval(heartbeat.current);
+        heartbeat.current = setInterval(() => send({ type: "ping", ack: session.current.lastSeq }), frame.heartbeat * 1000);
+      }
+      handleFrame(frame);
+    };
+
+    socket.onclose = () => {
+      clearInterval(heartbeat.current);
+      if (ws.current !== socket) return; // closed on purpose (unmount)
+      const delay = RECONNECT_DELAYS_MS[Math.min(reconnectAttempt.current, RECONNECT_DELAYS_MS.length - 1)];
+      reconnectAttempt.current += 1;
+      setTimeout(connect, delay);
+    };
+  };
+
+  useEffect(() => {
+    connect();
+    return () => {
+      const socket = ws.current;
+      ws.current = null;
+      clearInterval(heartbeat.current);
+      socket?.close();
+    };
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, []);
+
+  // Replies to new turns use the selected mode
+  useEffect(() => {
+    responseMode.current = aiResponseMode;
+    send({ type: "mode", payload: aiResponseMode, stream: true });
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [aiResponseMode]);
 
   // Function to start or stop voice recording
   const startRecording = async () => {
     if (recording) {
-      // Stop if already recording
+      // Stop if already recording; tell the server so it can finalize the last utterance
+      pcmProcessor.current?.disconnect();
+      audioContext.current?.close();
+      audioContext.current = null;
+      send({ type: "stream_end" });
       mediaRecorder.current?.stop();
       setRecording(false);
       return;
@@ -31,48 +254,37 @@ export default function AudioRecorder() {
 
       const audioChunks = []; // Buffer to hold recorded audio chunks
 
-      // Open WebSocket connection
-      ws.current = new WebSocket("ws://localhost:8000/ws/audio");
-
-      // On WS connection open, send selected response mode
-      ws.current.onopen = () => {
-        ws.current.send(JSON.stringify({ type: "mode", payload: aiResponseMode }));
-      };
-
-      // Handle incoming WebSocket messages (AI replies)
-      ws.current.onmessage = async (event) => {
-        // Server indicates next message is audio
-        if (typeof event.data === "string" && event.data === "__AUDIO__") {
-          nextIsAudio.current = true;
-          return;
-        }
-
-        // If next message is binary audio blob
-        if (event.data instanceof Blob && nextIsAudio.current) {
-          const blob = new Blob([event.data], { type: "audio/mpeg" });
-          const audioUrl = URL.createObjectURL(blob);
-          setChat((prev) => [...prev, { sender: "ai", audioUrl }]);
-          nextIsAudio.current = false;
-          return;
-        }
-
-        // Otherwise treat it as plain text message
-        if (typeof event.data === "string") {
-          setChat((prev) => [...prev, { sender: "ai", text: event.data }]);
+      // Stream 16 kHz, 16-bit PCM frames to the server while recording so it can
+      // transcribe incrementally and detect the end of each utterance itself
+      const context = new AudioContext({ sampleRate: 16000 });
+      const source = context.createMediaStreamSource(stream);
+      const processor = context.createScriptProcessor(2048, 1, 1);
+      processor.onaudioprocess = (e) => {
+        const input = e.inputBuffer.getChannelData(0);
+        const pcm = new Int16Array(input.length);
+        for (let i = 0; i < input.length; i++) {
+          const s = Math.max(-1, Math.min(1, input[i]));
+          pcm[i] = s < 0 ? s * 0x8000 : s * 0x7fff;
         }
+        send(encodeFrame({ type: "pcm" }, pcm.buffer));
       };
+      source.connect(processor);
+      processor.connect(context.destination);
+      audioContext.current = context;
+      pcmProcessor.current = processor;
+      startMicStream(context.sampleRate);
 
       // Capture audio chunks while recording
       recorder.ondataavailable = (e) => {
         audioChunks.push(e.data);
       };
 
-      // On recording stop, send audio to backend and store locally
+      // On recording stop, keep a local copy of what was said (the server already has the PCM stream)
       recorder.onstop = () => {
-        const blob = new Blob(audioChunks, { type: "audio/wav" });
-        ws.current.send(blob); // Send audio to backend
+        const blob = new Blob(audioChunks, { type: recorder.mimeType });
         const userAudioUrl = URL.createObjectURL(blob);
         setChat((prev) => [...prev, { sender: "user", audioUrl: userAudioUrl }]);
+        stream.getTracks().forEach((track) => track.stop());
       };
 
       recorder.start();
@@ -82,41 +294,17 @@ export default function AudioRecorder() {
     }
   };
 
-  // Function to send text input to the AI backend
+  // Function to send text input to the AI backend, as a new turn on the open connection
   const sendTextMessage = () => {
     if (!inputText.trim()) return;
 
-    setChat((prev) => [...prev, { sender: "user", text: inputText }]);
-    const prompt = inputText;
+    const turn = newId();
+    if (!send({ type: "text", turn, payload: inputText, mode: aiResponseMode, interrupt: true })) {
+      setChat((prev) => [...prev, { sender: "ai", text: "⏳ Reconnecting to the server, please try again." }]);
+      return;
+    }
+    setChat((prev) => [...prev, { turn, sender: "user", text: inputText }]);
     setInputText(""); // Clear input box
-
-    // Open a new WebSocket connection
-    ws.current = new WebSocket("ws://localhost:8000/ws/audio");
-
-    ws.current.onopen = () => {
-      ws.current.send(JSON.stringify({ type: "mode", payload: aiResponseMode }));
-      ws.current.send(JSON.stringify({ type: "text", payload: prompt }));
-    };
-
-    // Handle AI's reply (text or audio)
-    ws.current.onmessage = async (event) => {
-      if (typeof event.data === "string" && event.data === "__AUDIO__") {
-        nextIsAudio.current = true;
-        return;
-      }
-
-      if (event.data instanceof Blob && nextIsAudio.current) {
-        const blob = new Blob([event.data], { type: "audio/mpeg" });
-        const audioUrl = URL.createObjectURL(blob);
-        setChat((prev) => [...prev, { sender: "ai", audioUrl }]);
-        nextIsAudio.current = false;
-        return;
-      }
-
-      if (typeof event.data === "string") {
-        setChat((prev) => [...prev, { sender: "ai", text: event.data }]);
-      }
-    };
   };
 
   // Auto-scroll chat box to bottom when chat updates
@@ -140,7 +328,7 @@ export default function AudioRecorder() {
           {chat.map((msg, idx) => (
             <div
               key={idx}
-              className={`chat-bubble ${msg.sender === "user" ? "user" : "ai"}`}
+              className={`chat-bubble ${msg.sender === "user" ? "user" : "ai"}${msg.live ? " live" : ""}`}
             >
               {/* Audio or Text output */}
               {msg.audioUrl ? (